@@ -0,0 +1,77 @@
+# app/clients.py
+"""Process-wide registry of lazily constructed clients.
+
+Nothing here runs at import time. Clients are built on first use or in the
+FastAPI lifespan, which runs after uvicorn forks its workers, so no sockets are
+inherited across a fork and tests can import app.main without secrets.
+"""
+import httpx
+from app.config import settings
+
+_openai_http_clients: tuple[httpx.Client, httpx.AsyncClient] | None = None
+_chat_models: dict = {}
+
+def get_openai_http_clients() -> tuple[httpx.Client, httpx.AsyncClient]:
+    # One keep-alive pool (sync and async) shared by every ChatOpenAI instance.
+    global _openai_http_clients
+    if _openai_http_clients is None:
+        limits = httpx.Limits(
+            max_connections=settings.OPENAI_POOL_SIZE,
+            max_keepalive_connections=settings.OPENAI_POOL_KEEPALIVE,
+        )
+        timeout = httpx.Timeout(settings.OPENAI_TIMEOUT, connect=5.0)
+        _openai_http_clients = (
+            httpx.Client(limits=limits, timeout=timeout),
+            httpx.AsyncClient(limits=limits, timeout=timeout),
+        )
+    return _openai_http_clients
+
+def get_chat_model(model: str = "gpt-4o", temperature: float = 0, max_retries: int | None = None):
+    # max_retries=None keeps the OpenAI client's default retry policy.
+    key = (model, temperature, max_retries)
+    if key not in _chat_models and settings.LLM_BACKEND == "fake":
+        from app.services.fake_llm import FakeChatModel
+
+        _chat_models[key] = FakeChatModel(
+            model_name=model,
+            latency=settings.FAKE_LLM_LATENCY,
+            jitter=settings.FAKE_LLM_JITTER,
+            tail_probability=settings.FAKE_LLM_TAIL_PROBABILITY,
+            tail_latency=settings.FAKE_LLM_TAIL_LATENCY,
+            failure_rate=settings.FAKE_LLM_FAILURE_RATE,
+        )
+    if key not in _chat_models:
+        # Imported here: langchain_openai/openai dominate import time.
+        from langchain_openai import ChatOpenAI
+
+        http_client, http_async_client = get_openai_http_clients()
+        _chat_models[key] = ChatOpenAI(
+            model=model,
+            temperature=temperature,
+            max_retries=max_retries,
+            openai_api_key=settings.OPENAI_API_KEY,
+            http_client=http_client,
+            http_async_client=http_async_client,
+        )
+    return _chat_models[key]
+
+def warm_up():
+    """Build the shared models and the agent graph ahead of the first request."""
+    from app.services import agent, chat, donation_parser
+
+    for tier in settings.MODEL_TIERS:
+        chat.get_chat_model(tier)
+        donation_parser.get_donation_chain(tier)
+    agent.get_agent_executor()
+
+async def aclose():
+    global _openai_http_clients
+    from app.db.connection import close_async_supabase
+
+    if _openai_http_clients is not None:
+        http_client, http_async_client = _openai_http_clients
+        http_client.close()
+        await http_async_client.aclose()
+        _openai_http_clients = None
+    _chat_models.clear()
+    await close_async_supabase()
@@ -1,14 +1,190 @@
 # app/config.py
+from functools import lru_cache
+from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
-    OPENAI_API_KEY: str
-    SUPABASE_URL: str
-    SUPABASE_ANON_KEY: str
-    SUPABASE_SERVICE_ROLE_KEY: str
+    # Required by the "openai" LLM backend and the "supabase" DB backend respectively (see below).
+    OPENAI_API_KEY: str | None = None
+    SUPABASE_URL: str | None = None
+    SUPABASE_ANON_KEY: str | None = None
+    SUPABASE_SERVICE_ROLE_KEY: str | None = None
+
+    # Connection pool for the async Supabase (PostgREST) client.
+    SUPABASE_POOL_SIZE: int = 20
+    SUPABASE_POOL_KEEPALIVE: int = 10
+    SUPABASE_KEEPALIVE_EXPIRY: float = 30.0
+    SUPABASE_CONNECT_TIMEOUT: float = 5.0
+    SUPABASE_TIMEOUT: float = 10.0
+
+    # Shared connection pool for every OpenAI chat model.
+    OPENAI_POOL_SIZE: int = 50
+    OPENAI_POOL_KEEPALIVE: int = 20
+    OPENAI_TIMEOUT: float = 60.0
+    # Backends: "openai"/"supabase" in production, "fake"/"memory" for offline tests and benchmarks.
+    LLM_BACKEND: str = "openai"
+    DB_BACKEND: str = "supabase"
+    FAKE_LLM_LATENCY: float = 0.0
+    FAKE_LLM_JITTER: float = 0.0
+    FAKE_LLM_TAIL_PROBABILITY: float = 0.0
+    FAKE_LLM_TAIL_LATENCY: float = 0.0
+    FAKE_LLM_FAILURE_RATE: float = 0.0
+    FAKE_DB_LATENCY: float = 0.0
+    # Build models and the agent graph in the FastAPI lifespan instead of on first request.
+    WARM_CLIENTS_ON_STARTUP: bool = True
+    # Log each request's trace (endpoint, prompt, llm, tool and db spans) as a JSON line.
+    TRACE_LOG_ENABLED: bool = False
+
+    # Default page size for paged table reads (queries.fetch_page / iter_rows).
+    QUERY_PAGE_SIZE: int = 100
+
+    # Model tiers: small-tier tasks use the small model unless the input is long or
+    # low-confidence; failed structured output is retried on the large model.
+    MODEL_ROUTING_ENABLED: bool = True
+    MODEL_TIERS: dict[str, str] = {"small": "gpt-4o-mini", "large": "gpt-4o"}
+    MODEL_TASK_TIERS: dict[str, str] = {"chat": "small", "donation": "small", "agent": "large"}
+    MODEL_SMALL_MAX_INPUT_TOKENS: int = 300
+    MODEL_MIN_CONFIDENCE: float = 0.6
+    # USD per million (input, output) tokens, for per-tier cost reporting.
+    MODEL_PRICES: dict[str, tuple[float, float]] = {"gpt-4o-mini": (0.15, 0.60), "gpt-4o": (2.50, 10.00)}
+    # Share of the input price saved on prompt tokens served from the provider's prefix cache.
+    MODEL_CACHED_PROMPT_DISCOUNT: float = 0.5
+
+    # Admission control for model calls. Budgets are per worker; the scheduler
+    # retries upstream 429s itself, so ChatOpenAI's own retries are disabled.
+    LLM_RATE_LIMIT_ENABLED: bool = True
+    LLM_REQUESTS_PER_MINUTE: int = 5000
+    LLM_TOKENS_PER_MINUTE: int = 450000
+    LLM_MAX_QUEUE: int = 200
+    LLM_COMPLETION_TOKEN_ESTIMATE: int = 300
+    LLM_MAX_RETRIES: int = 3
+    LLM_RETRY_BASE_DELAY: float = 0.5
+    LLM_RETRY_MAX_DELAY: float = 8.0
+
+    # Tail latency: seconds each task may take end to end (queueing, retries and
+    # escalation included) before the endpoint gives up with a 504. With hedging on,
+    # a chat/donation call still running after the HEDGE_PERCENTILE of its recent
+    # latencies gets a second attempt; at most HEDGE_MAX_RATE of calls are hedged.
+    LLM_DEADLINES: dict[str, float] = {"chat": 30.0, "donation": 20.0, "agent": 60.0}
+    HEDGING_ENABLED: bool = False
+    HEDGE_PERCENTILE: float = 95.0
+    HEDGE_MIN_SAMPLES: int = 20
+    HEDGE_MAX_RATE: float = 0.1
+
+    # Circuit breaker per model: opens once BREAKER_FAILURE_RATE of the last BREAKER_WINDOW
+    # calls (at least BREAKER_MIN_CALLS) errored or took over BREAKER_SLOW_CALL_SECONDS, fails
+    # fast for BREAKER_OPEN_SECONDS, then lets BREAKER_HALF_OPEN_CALLS probe calls through.
+    BREAKER_ENABLED: bool = True
+    BREAKER_WINDOW: int = 20
+    BREAKER_MIN_CALLS: int = 10
+    BREAKER_FAILURE_RATE: float = 0.5
+    BREAKER_SLOW_CALL_SECONDS: float = 15.0
+    BREAKER_OPEN_SECONDS: float = 30.0
+    BREAKER_HALF_OPEN_CALLS: int = 1
+
+    # Opt-in semantic cache for first-turn chat and tool-free agent answers, scoped by
+    # user role: a query within SEMANTIC_CACHE_THRESHOLD cosine similarity of a stored
+    # one gets its answer. From SEMANTIC_CACHE_APPROX_MIN_ENTRIES on, searches probe the
+    # SEMANTIC_CACHE_NPROBE nearest of SEMANTIC_CACHE_NLIST clusters instead of every entry.
+    # SEMANTIC_CACHE_EMBEDDER is "hashing" (local, lexical) or, opt-in, "openai"
+    # (SEMANTIC_CACHE_EMBEDDING_MODEL); LLM_BACKEND=fake always uses "hashing". An embedding
+    # slower than SEMANTIC_CACHE_EMBED_TIMEOUT_SECONDS counts as a miss.
+    SEMANTIC_CACHE_ENABLED: bool = False
+    SEMANTIC_CACHE_EMBEDDER: str = "hashing"
+    SEMANTIC_CACHE_EMBEDDING_MODEL: str = "text-embedding-3-small"
+    SEMANTIC_CACHE_EMBED_TIMEOUT_SECONDS: float = 0.25
+    SEMANTIC_CACHE_THRESHOLD: float = 0.9
+    SEMANTIC_CACHE_TTL_SECONDS: float = 3600.0
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 100_000
+    SEMANTIC_CACHE_DIMENSIONS: int = 256
+    SEMANTIC_CACHE_APPROX_MIN_ENTRIES: int = 20_000
+    SEMANTIC_CACHE_NLIST: int = 64
+    SEMANTIC_CACHE_NPROBE: int = 4
+
+    # Identical concurrent donation/chat model calls share one upstream request.
+    LLM_COALESCING_ENABLED: bool = True
+
+    # Answer unambiguous navigation / partner-listing requests without the agent LLM.
+    INTENT_ROUTER_ENABLED: bool = True
+
+    # Tool results fed back to the agent: compact tables cut off at a token budget,
+    # overridable per tool name (e.g. {"crud_tool": 800}).
+    TOOL_OUTPUT_COMPACTION_ENABLED: bool = True
+    TOOL_OUTPUT_TOKEN_BUDGET: int = 400
+    TOOL_OUTPUT_TOKEN_BUDGETS: dict[str, int] = {}
+
+    # Roles of verified bearer tokens (they scope the semantic cache) are cached this long.
+    AUTH_ROLE_CACHE_TTL_SECONDS: float = 60.0
+
+    # Reference tables (partners, food_types, locations) cached in memory for this long.
+    REFERENCE_CACHE_TTL_SECONDS: float = 300.0
+
+    # Volunteer matching indexes (availability, zones, skills) are rebuilt after this long.
+    MATCHING_INDEX_TTL_SECONDS: float = 300.0
+
+    # Location grid for nearest-partner/volunteer queries. Bulk loads size cells for about
+    # SPATIAL_POINTS_PER_CELL points each; SPATIAL_CELL_DEGREES is used for an index built empty.
+    SPATIAL_CELL_DEGREES: float = 0.05
+    SPATIAL_POINTS_PER_CELL: int = 8
+
+    # Ticket dispatch order: an Urgent ticket is dispatched as if it had been submitted this much
+    # earlier, so it beats Routine tickets unless they have waited longer than this.
+    DISPATCH_URGENT_HEAD_START_SECONDS: float = 4 * 3600.0
+
+    # Per-session chat history: "memory" (LRU with idle TTL) or "sqlite".
+    CHAT_HISTORY_BACKEND: str = "memory"
+    CHAT_HISTORY_SQLITE_PATH: str = "chat_history.db"
+    CHAT_HISTORY_MAX_SESSIONS: int = 1000
+    CHAT_HISTORY_TTL_SECONDS: float = 3600.0
+    CHAT_HISTORY_TOKEN_BUDGET: int = 4000
+
+    # Agent checkpointer: LRU over thread_ids with per-thread retention.
+    # Set AGENT_CHECKPOINT_SQLITE_PATH to write checkpoints through to SQLite.
+    AGENT_MAX_THREADS: int = 1000
+    AGENT_MAX_CHECKPOINTS_PER_THREAD: int = 10
+    AGENT_CHECKPOINT_SQLITE_PATH: str | None = None
+
+    # /donation/parse result cache. Set DONATION_CACHE_SQLITE_PATH to share it across workers.
+    DONATION_CACHE_ENABLED: bool = True
+    DONATION_CACHE_MAX_ENTRIES: int = 2048
+    DONATION_CACHE_TTL_SECONDS: float = 86400.0
+    DONATION_CACHE_SQLITE_PATH: str | None = None
+    # Parse formulaic donations with local rules before calling the LLM.
+    DONATION_FAST_PATH_ENABLED: bool = True
+    # POST /donation/parse/batch limits.
+    DONATION_BATCH_MAX_ITEMS: int = 500
+    DONATION_BATCH_CONCURRENCY: int = 10
+    DONATION_BATCH_ITEM_TIMEOUT: float = 30.0
 
     model_config = SettingsConfigDict(
         env_file=".env"
     )
 
-settings = Settings()
+    @model_validator(mode="after")
+    def _require_backend_secrets(self):
+        required = []
+        if self.LLM_BACKEND != "fake":
+            required.append("OPENAI_API_KEY")
+        if self.DB_BACKEND != "memory":
+            required += ["SUPABASE_URL", "SUPABASE_ANON_KEY", "SUPABASE_SERVICE_ROLE_KEY"]
+        missing = [name for name in required if not getattr(self, name)]
+        if missing:
+            raise ValueError(
+                f"Missing settings {missing} (LLM_BACKEND={self.LLM_BACKEND}, DB_BACKEND={self.DB_BACKEND})"
+            )
+        return self
+
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
+
+class _LazySettings:
+    """Reads the environment on first use, so importing the app needs no secrets."""
+
+    def __getattr__(self, name):
+        return getattr(get_settings(), name)
+
+    def __setattr__(self, name, value):
+        setattr(get_settings(), name, value)
+
+settings = _LazySettings()
@@ -1,7 +1,55 @@
 # app/db/connection.py
-from supabase import create_client, Client
+import httpx
 from app.config import settings
 
-# Initialize the Supabase client using the settings.
-# Using the anon key for regular operations. Use service role key for admin operations.
-supabase: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_ROLE_KEY)
+# Both clients are created on first use; importing this module opens no connections.
+# The supabase package itself is also imported lazily because it is slow to load.
+_supabase = None
+_async_supabase = None
+
+def get_supabase():
+    # Initialize the Supabase client using the settings.
+    # Using the anon key for regular operations. Use service role key for admin operations.
+    global _supabase
+    if _supabase is None:
+        from supabase import create_client
+
+        _supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_ROLE_KEY)
+    return _supabase
+
+def __getattr__(name):
+    # Keep `from app.db.connection import supabase` working.
+    if name == "supabase":
+        return get_supabase()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Async client used by app/db/queries.py. All queries share one pooled, keep-alive
+# httpx.AsyncClient, so a slow PostgREST round-trip only suspends the awaiting
+# request instead of blocking the event loop.
+def create_http_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.SUPABASE_POOL_SIZE,
+        max_keepalive_connections=settings.SUPABASE_POOL_KEEPALIVE,
+        keepalive_expiry=settings.SUPABASE_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(settings.SUPABASE_TIMEOUT, connect=settings.SUPABASE_CONNECT_TIMEOUT)
+    return httpx.AsyncClient(limits=limits, timeout=timeout, follow_redirects=True)
+
+def get_async_supabase():
+    global _async_supabase
+    if _async_supabase is None and settings.DB_BACKEND == "memory":
+        from app.db.memory import MemorySupabase
+
+        _async_supabase = MemorySupabase(latency=settings.FAKE_DB_LATENCY)
+    if _async_supabase is None:
+        from supabase import AsyncClient, AsyncClientOptions
+
+        options = AsyncClientOptions(httpx_client=create_http_client())
+        _async_supabase = AsyncClient(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_ROLE_KEY, options)
+    return _async_supabase
+
+async def close_async_supabase():
+    global _async_supabase
+    if _async_supabase is not None and hasattr(_async_supabase, "options"):
+        await _async_supabase.options.httpx_client.aclose()
+        _async_supabase = None
@@ -0,0 +1,236 @@
+# app/db/memory.py
+"""In-memory stand-in for the Supabase tables used by app/db/queries.py.
+
+Selected with DB_BACKEND=memory. It mimics the subset of the async postgrest
+query builder the service uses (select/insert/update/delete, comparison
+filters, order, limit, execute) and auth.get_user, with
+an optional artificial latency per query, so the service can run and be
+benchmarked offline.
+"""
+import asyncio
+import copy
+import random
+import re
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+FOOD_TYPES = ["Baked Goods", "Fresh Produce", "Other", "Pantry Items", "Prepared Foods"]
+
+def seed_tables(users: int = 50, partners: int = 20) -> dict[str, list[dict]]:
+    now = datetime(2025, 1, 1, tzinfo=timezone.utc).isoformat()
+    roles = ["Admin", "Donor", "Volunteer", "Partner"]
+    return {
+        "users": [
+            {"id": f"user-{i}", "display_name": f"User {i}", "role": roles[i % len(roles)],
+             "created_at": now, "updated_at": now}
+            for i in range(users)
+        ],
+        "partners": [
+            {"id": f"partner-{i}", "name": f"Partner Org {i}", "contact_email": f"partner{i}@example.org",
+             "contact_phone": f"555-01{i:02d}", "capacity": float(10 * i), "max_capacity": 500.0,
+             "location_id": f"location-{i}", "user_id": None, "created_at": now, "updated_at": now}
+            for i in range(partners)
+        ],
+        "food_types": [
+            {"id": f"food-type-{i}", "name": name, "created_at": now, "updated_at": now}
+            for i, name in enumerate(FOOD_TYPES)
+        ],
+        "locations": [
+            {"id": f"location-{i}", "street": f"{100 + i} Main St", "city": "Austin", "state": "TX", "zip": "78701",
+             "latitude": 30.25 + i * 0.01, "longitude": -97.75 - i * 0.01, "created_at": now, "updated_at": now}
+            for i in range(partners)
+        ],
+    }
+
+ZONES = ["Central", "Downtown", "East", "North", "South", "West"]
+SKILLS = ["cold chain", "food safety", "fragile handling", "heavy lifting", "refrigeration", "spanish"]
+VEHICLE_TYPES = ["car", "suv", "van", "truck", "refrigerated van"]
+
+def seed_volunteer_tables(volunteers: int, seed: int = 0) -> dict[str, list[dict]]:
+    """Synthetic volunteers with 1-3 weekly availability slots, 1-2 zones and 0-2 skills each."""
+    rng = random.Random(seed)
+    now = datetime(2025, 1, 1, tzinfo=timezone.utc).isoformat()
+    tables = {"volunteers": [], "volunteer_availability_time": [], "volunteer_availability_zones": [], "volunteer_skills": []}
+    for i in range(volunteers):
+        volunteer_id = f"volunteer-{i}"
+        tables["volunteers"].append(
+            {"id": volunteer_id, "phone": f"555-{i:07d}", "vehicle_type": rng.choice(VEHICLE_TYPES),
+             "location_id": None, "user_id": None, "created_at": now, "updated_at": now}
+        )
+        for j, day in enumerate(rng.sample(range(7), rng.randint(1, 3))):
+            start = rng.randint(7, 17)
+            tables["volunteer_availability_time"].append(
+                {"id": f"{volunteer_id}-time-{j}", "volunteer_id": volunteer_id, "day_of_week": day,
+                 "start_time": f"2025-01-05T{start:02d}:00:00+00:00",
+                 "end_time": f"2025-01-05T{min(start + rng.randint(2, 6), 23):02d}:00:00+00:00",
+                 "created_at": now, "updated_at": now}
+            )
+        for j, zone in enumerate(rng.sample(ZONES, rng.randint(1, 2))):
+            tables["volunteer_availability_zones"].append(
+                {"id": f"{volunteer_id}-zone-{j}", "volunteer_id": volunteer_id, "zone": zone,
+                 "created_at": now, "updated_at": now}
+            )
+        for j, skill in enumerate(rng.sample(SKILLS, rng.randint(0, 2))):
+            tables["volunteer_skills"].append(
+                {"id": f"{volunteer_id}-skill-{j}", "volunteer_id": volunteer_id, "skill": skill,
+                 "created_at": now, "updated_at": now}
+            )
+    return tables
+
+def seed_inventory(items: int, partners: int = 20, seed: int = 0, now: datetime | None = None) -> list[dict]:
+    """Synthetic inventory rows expiring up to two weeks from `now`, a few already expired."""
+    rng = random.Random(seed)
+    now = now or datetime.now(timezone.utc)
+    statuses = ["Available"] * 6 + ["Reserved", "Distributed"]
+    return [
+        {"id": f"inventory-{i}", "donation_id": None, "food_type_id": f"food-type-{rng.randrange(len(FOOD_TYPES))}",
+         "partner_org_id": f"partner-{rng.randrange(partners)}", "quantity": float(rng.randint(1, 200)), "unit": "lbs",
+         "expiration_date": (now + timedelta(hours=rng.uniform(-12, 14 * 24))).isoformat(), "status": rng.choice(statuses),
+         "created_at": now.isoformat(), "updated_at": now.isoformat()}
+        for i in range(items)
+    ]
+
+def seed_tickets(tickets: int, locations: int = 20, seed: int = 0, now: datetime | None = None) -> list[dict]:
+    """Synthetic Submitted tickets created up to a day before `now`, a quarter of them Urgent."""
+    rng = random.Random(seed)
+    now = now or datetime.now(timezone.utc)
+    rows = []
+    for i in range(tickets):
+        created = (now - timedelta(seconds=rng.uniform(0, 24 * 3600))).isoformat()
+        rows.append(
+            {"id": f"ticket-{i}", "donation_id": None, "partner_org_id": None,
+             "pickup_location_id": f"location-{rng.randrange(locations)}",
+             "dropoff_location_id": f"location-{rng.randrange(locations)}",
+             "priority": "Urgent" if rng.random() < 0.25 else "Routine", "status": "Submitted",
+             "volunteer_id": None, "completed_at": None, "created_at": created, "updated_at": created}
+        )
+    return rows
+
+class MemoryQuery:
+    def __init__(self, db: "MemorySupabase", table: str):
+        self.db = db
+        self.table = table
+        self.action = "select"
+        self.columns: list[str] | None = None
+        self.payload: dict | list | None = None
+        self.filters: list = []
+        self.ordering: tuple[str, bool] | None = None
+        self.max_rows: int | None = None
+
+    def select(self, *columns: str):
+        self.action = "select"
+        self.columns = None if not columns or columns == ("*",) else [c.strip() for c in ",".join(columns).split(",")]
+        return self
+
+    def insert(self, payload: dict | list):
+        self.action, self.payload = "insert", payload
+        return self
+
+    def update(self, payload: dict):
+        self.action, self.payload = "update", payload
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    def eq(self, column: str, value):
+        self.filters.append(lambda row: str(row.get(column)) == str(value))
+        return self
+
+    def neq(self, column: str, value):
+        self.filters.append(lambda row: str(row.get(column)) != str(value))
+        return self
+
+    def _compare(self, column: str, test):
+        self.filters.append(lambda row: row.get(column) is not None and test(row.get(column)))
+        return self
+
+    def gt(self, column: str, value):
+        return self._compare(column, lambda v: v > value)
+
+    def gte(self, column: str, value):
+        return self._compare(column, lambda v: v >= value)
+
+    def lt(self, column: str, value):
+        return self._compare(column, lambda v: v < value)
+
+    def lte(self, column: str, value):
+        return self._compare(column, lambda v: v <= value)
+
+    def in_(self, column: str, values):
+        allowed = {str(v) for v in values}
+        self.filters.append(lambda row: str(row.get(column)) in allowed)
+        return self
+
+    def is_(self, column: str, value):
+        self.filters.append(lambda row: row.get(column) is None if value in (None, "null") else row.get(column) == value)
+        return self
+
+    def like(self, column: str, pattern: str, flags: int = 0):
+        regex = re.compile(re.escape(pattern).replace("%", ".*").replace("_", "."), re.DOTALL | flags)
+        return self._compare(column, lambda v: bool(regex.fullmatch(str(v))))
+
+    def ilike(self, column: str, pattern: str):
+        return self.like(column, pattern, re.IGNORECASE)
+
+    def order(self, column: str, desc: bool = False):
+        self.ordering = (column, desc)
+        return self
+
+    def limit(self, size: int):
+        self.max_rows = size
+        return self
+
+    def _matches(self, row: dict) -> bool:
+        return all(f(row) for f in self.filters)
+
+    async def execute(self):
+        if self.db.latency:
+            await asyncio.sleep(self.db.latency)
+        rows = self.db.tables.setdefault(self.table, [])
+        if self.action == "insert":
+            new = self.payload if isinstance(self.payload, list) else [self.payload]
+            rows.extend(copy.deepcopy(new))
+            data = new
+        elif self.action == "update":
+            data = []
+            for row in rows:
+                if self._matches(row):
+                    row.update(self.payload)
+                    data.append(row)
+        elif self.action == "delete":
+            data = [row for row in rows if self._matches(row)]
+            self.db.tables[self.table] = [row for row in rows if not self._matches(row)]
+        else:
+            data = [row for row in rows if self._matches(row)]
+            if self.ordering is not None:
+                column, desc = self.ordering
+                data.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+            if self.max_rows is not None:
+                data = data[:self.max_rows]
+            if self.columns is not None:
+                data = [{c: row.get(c) for c in self.columns} for row in data]
+        return SimpleNamespace(data=copy.deepcopy(data), count=None)
+
+class MemoryAuth:
+    """Stand-in for supabase.auth: access tokens mapped to the user ids they were issued to."""
+
+    def __init__(self, sessions: dict[str, str] | None = None):
+        self.sessions = sessions if sessions is not None else {}
+
+    async def get_user(self, jwt: str):
+        if jwt not in self.sessions:
+            raise ValueError("Invalid JWT")
+        return SimpleNamespace(user=SimpleNamespace(id=self.sessions[jwt]))
+
+class MemorySupabase:
+    def __init__(
+        self, tables: dict[str, list[dict]] | None = None, latency: float = 0.0, sessions: dict[str, str] | None = None
+    ):
+        self.tables = tables if tables is not None else seed_tables()
+        self.latency = latency
+        self.auth = MemoryAuth(sessions)
+
+    def table(self, table_name: str) -> MemoryQuery:
+        return MemoryQuery(self, table_name)
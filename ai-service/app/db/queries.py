@@ -1,19 +1,136 @@
 # app/db/queries.py
-from app.db.connection import supabase
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, AsyncIterator, Generic, Sequence, TypeVar
+from pydantic import BaseModel, create_model
+from app.config import settings
+from app.db.connection import get_async_supabase
+from app.models import schemas
+from app.telemetry import span, traced
 
-def get_user(user_id: str):
-    response = supabase.table("users").select("*").eq("id", user_id).execute()
+@traced("db.query", table="users", op="select")
+async def get_user(user_id: str):
+    response = await get_async_supabase().table("users").select("*").eq("id", user_id).execute()
     return response.data
 
-def update_user(user_id: str, user_data: dict):
-    response = supabase.table("users").update(user_data).eq("id", user_id).execute()
+@traced("db.query", table="users", op="update")
+async def update_user(user_id: str, user_data: dict):
+    response = await get_async_supabase().table("users").update(user_data).eq("id", user_id).execute()
     return response.data
 
-def delete_user(user_id: str):
-    response = supabase.table("users").delete().eq("id", user_id).execute()
+@traced("db.query", table="users", op="delete")
+async def delete_user(user_id: str):
+    response = await get_async_supabase().table("users").delete().eq("id", user_id).execute()
     return response.data
 
-def get_partners():
-    response = supabase.table("partners").select("*").execute()
+@traced("db.query", table="tickets", op="update")
+async def update_ticket(ticket_id: str, ticket_data: dict, expected_status: str | None = None):
+    """Update a ticket; with expected_status, only while it still has that status (no rows otherwise)."""
+    query = get_async_supabase().table("tickets").update(ticket_data).eq("id", ticket_id)
+    if expected_status is not None:
+        query = query.eq("status", expected_status)
+    response = await query.execute()
     return response.data
 
+# -------------------------
+# Generic paged reads
+# -------------------------
+TABLE_MODELS: dict[str, type[BaseModel]] = {
+    "activity_logs": schemas.ActivityLogRow,
+    "donations": schemas.DonationsRow,
+    "donors": schemas.DonorsRow,
+    "food_types": schemas.FoodTypesRow,
+    "inventory": schemas.InventoryRow,
+    "locations": schemas.LocationsRow,
+    "partners": schemas.PartnersRow,
+    "shifts": schemas.ShiftsRow,
+    "ticket_attachments": schemas.TicketAttachmentsRow,
+    "ticket_notes": schemas.TicketNotesRow,
+    "ticket_tags": schemas.TicketTagsRow,
+    "tickets": schemas.TicketsRow,
+    "users": schemas.UsersRow,
+    "volunteer_availability_time": schemas.VolunteerAvailabilityTimeRow,
+    "volunteer_availability_zones": schemas.VolunteerAvailabilityZonesRow,
+    "volunteer_skills": schemas.VolunteerSkillsRow,
+    "volunteers": schemas.VolunteersRow,
+}
+
+# Filter operators, named after the postgrest query builder methods they call.
+FILTER_OPS = {"eq", "neq", "gt", "gte", "lt", "lte", "like", "ilike", "in_", "is_"}
+
+RowT = TypeVar("RowT", bound=BaseModel)
+
+@dataclass
+class Page(Generic[RowT]):
+    rows: list[RowT]
+    # Pass as `after` to fetch the next page; None once the table is exhausted.
+    next_cursor: Any = None
+
+@lru_cache(maxsize=256)
+def row_model(table: str, columns: tuple[str, ...] | None = None) -> type[BaseModel]:
+    """The *Row model for a table, narrowed to the projected columns."""
+    model = TABLE_MODELS[table]
+    if columns is None:
+        return model
+    unknown = set(columns) - set(model.model_fields)
+    if unknown:
+        raise ValueError(f"Unknown columns for {table}: {sorted(unknown)}")
+    fields = {name: (model.model_fields[name].annotation, model.model_fields[name]) for name in columns}
+    return create_model(f"{model.__name__}Projection", **fields)
+
+def _normalize_filters(filters) -> list[tuple[str, str, Any]]:
+    # Accept {"column": value} for equality or (column, op, value) triples.
+    if isinstance(filters, dict):
+        filters = [(column, "eq", value) for column, value in filters.items()]
+    normalized = []
+    for column, op, value in filters or ():
+        if op not in FILTER_OPS:
+            raise ValueError(f"Unsupported filter operator: {op}")
+        normalized.append((column, op, value))
+    return normalized
+
+async def fetch_page(
+    table: str,
+    columns: Sequence[str] | None = None,
+    filters=None,
+    order_by: str = "id",
+    after: Any = None,
+    limit: int | None = None,
+) -> Page:
+    """Read one page of `table`, ordered by `order_by`, starting after the cursor.
+
+    Keyset pagination: the cursor is the last `order_by` value seen, so each
+    page is a bounded index range scan however deep the caller has paged.
+    """
+    limit = limit or settings.QUERY_PAGE_SIZE
+    projection = tuple(columns) if columns else None
+    model = row_model(table, projection)
+    selected = list(projection) if projection else ["*"]
+    if projection and order_by not in projection:
+        selected.append(order_by)
+    with span("db.query", table=table, op="page"):
+        query = get_async_supabase().table(table).select(",".join(selected))
+        for column, op, value in _normalize_filters(filters):
+            query = getattr(query, op)(column, value)
+        if after is not None:
+            query = query.gt(order_by, after)
+        response = await query.order(order_by).limit(limit).execute()
+    rows = response.data
+    next_cursor = rows[-1][order_by] if len(rows) == limit else None
+    return Page(rows=[model.model_validate(row) for row in rows], next_cursor=next_cursor)
+
+async def iter_pages(table: str, columns=None, filters=None, order_by: str = "id", page_size: int | None = None) -> AsyncIterator[Page]:
+    after = None
+    while True:
+        page = await fetch_page(table, columns, filters, order_by, after, page_size)
+        if page.rows:
+            yield page
+        if page.next_cursor is None:
+            return
+        after = page.next_cursor
+
+async def iter_rows(table: str, columns=None, filters=None, order_by: str = "id", page_size: int | None = None) -> AsyncIterator[BaseModel]:
+    """Stream every matching row; only one page is held in memory at a time."""
+    async for page in iter_pages(table, columns, filters, order_by, page_size):
+        for row in page.rows:
+            yield row
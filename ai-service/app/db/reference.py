@@ -0,0 +1,104 @@
+# app/db/reference.py
+"""Read-through cache for small, hot, rarely changing reference tables.
+
+partners, food_types and locations are loaded once, a page at a time
+(queries.iter_rows), and served from in-memory indexes by id and
+(case-insensitive) name. A table is reloaded when its TTL
+expires or after invalidate() is called, e.g. from the Supabase database
+webhook wired to POST /reference/invalidate.
+"""
+import asyncio
+import time
+from typing import Generic, Type, TypeVar
+from pydantic import BaseModel
+from app import telemetry
+from app.config import settings
+from app.db import queries
+from app.models.schemas import FoodTypesRow, LocationsRow, PartnersRow
+
+RowT = TypeVar("RowT", bound=BaseModel)
+
+class ReferenceTable(Generic[RowT]):
+    def __init__(self, table: str, model: Type[RowT], name_field: str | None = None):
+        self.table = table
+        self.model = model
+        self.name_field = name_field
+        self.rows: list[RowT] = []
+        self.by_id: dict[str, RowT] = {}
+        self.by_name: dict[str, RowT] = {}
+        self.loaded_at: float | None = None
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self._lock = asyncio.Lock()
+
+    def _fresh(self) -> bool:
+        return self.loaded_at is not None and time.monotonic() - self.loaded_at < settings.REFERENCE_CACHE_TTL_SECONDS
+
+    async def _ensure_loaded(self):
+        if self._fresh():
+            self.hits += 1
+            return
+        self.misses += 1
+        async with self._lock:
+            # Another request may have reloaded the table while we waited.
+            if self._fresh():
+                return
+            rows = [row async for row in queries.iter_rows(self.table)]
+            self.rows = rows
+            self.by_id = {row.id: row for row in rows}
+            if self.name_field:
+                self.by_name = {getattr(row, self.name_field).casefold(): row for row in rows}
+            self.loaded_at = time.monotonic()
+            self.loads += 1
+
+    async def all(self) -> list[RowT]:
+        await self._ensure_loaded()
+        return self.rows
+
+    async def get(self, row_id: str) -> RowT | None:
+        await self._ensure_loaded()
+        return self.by_id.get(row_id)
+
+    async def get_by_name(self, name: str) -> RowT | None:
+        await self._ensure_loaded()
+        return self.by_name.get(name.casefold())
+
+    def invalidate(self):
+        self.loaded_at = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "rows": len(self.rows),
+            "hits": self.hits,
+            "misses": self.misses,
+            "loads": self.loads,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+partners = ReferenceTable("partners", PartnersRow, "name")
+food_types = ReferenceTable("food_types", FoodTypesRow, "name")
+locations = ReferenceTable("locations", LocationsRow)
+
+tables: dict[str, ReferenceTable] = {t.table: t for t in (partners, food_types, locations)}
+
+async def resolve_food_type_id(name: str) -> str | None:
+    food_type = await food_types.get_by_name(name)
+    return food_type.id if food_type else None
+
+def invalidate(table: str | None = None):
+    """Drop one cached table (or all of them) so the next lookup reloads it."""
+    for name, ref in tables.items():
+        if table is None or name == table:
+            ref.invalidate()
+
+def stats() -> dict:
+    return {name: ref.stats() for name, ref in tables.items()}
+
+@telemetry.register_collector
+def _reference_metrics() -> dict:
+    return {
+        "helphut_reference_cache_hits": {(("table", name),): ref.hits for name, ref in tables.items()},
+        "helphut_reference_cache_misses": {(("table", name),): ref.misses for name, ref in tables.items()},
+    }
@@ -1,7 +1,13 @@
 # app/endpoints/agent.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from app.services.agent import get_agent_response
+from app.services.agent import get_agent_response, get_checkpointer_stats, stream_agent_response
+from app.services.intent_router import get_router_stats
+from app.services.breaker import CircuitOpen
+from app.services.hedging import DeadlineExceeded
+from app.services.scheduler import Overloaded, check_admission
+from app.endpoints.auth import bearer_token
+from app.endpoints.streaming import sse_response
 
 class AgentRequest(BaseModel):
     message: str
@@ -10,9 +16,24 @@ class AgentRequest(BaseModel):
 router = APIRouter(prefix="/agent", tags=["agent"])
 
 @router.post("/send")
-async def send_agent(request: AgentRequest):
+async def send_agent(request: AgentRequest, access_token: str | None = Depends(bearer_token)):
     try:
-        response = await get_agent_response(request.message, request.config)
+        response = await get_agent_response(request.message, request.config, access_token)
         return {"response": response}
+    except (Overloaded, DeadlineExceeded, CircuitOpen):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/stream")
+async def stream_agent(request: AgentRequest, access_token: str | None = Depends(bearer_token)):
+    check_admission()
+    return sse_response(stream_agent_response(request.message, request.config, access_token))
+
+@router.get("/checkpointer/stats")
+def checkpointer_stats():
+    return get_checkpointer_stats()
+
+@router.get("/router/stats")
+def router_stats():
+    return get_router_stats()
@@ -0,0 +1,8 @@
+# File: app/endpoints/auth.py
+
+from fastapi import Header
+
+def bearer_token(authorization: str | None = Header(None)) -> str | None:
+    """The caller's Supabase access token, unverified; app.services.auth verifies it when needed."""
+    scheme, _, token = (authorization or "").partition(" ")
+    return token.strip() or None if scheme.lower() == "bearer" else None
@@ -1,18 +1,35 @@
 # File: app/endpoints/chat.py
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from app.services import chat
+from app.services.breaker import CircuitOpen
+from app.services.hedging import DeadlineExceeded
+from app.services.scheduler import Overloaded, check_admission
+from app.endpoints.auth import bearer_token
+from app.endpoints.streaming import sse_response
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
 @router.post("/send")
-async def send_chat(message: str):
+async def send_chat(session_id: str, message: str, access_token: str | None = Depends(bearer_token)):
     try:
-        response = await chat.get_chat_response(message)
+        response = await chat.get_chat_response(session_id, message, access_token)
         return {"response": response}
+    except (Overloaded, DeadlineExceeded, CircuitOpen):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/stream")
+async def stream_chat(session_id: str, message: str, access_token: str | None = Depends(bearer_token)):
+    # Reject before the stream starts; afterwards errors can only be SSE events.
+    check_admission()
+    async def events():
+        async for token in chat.stream_chat_response(session_id, message, access_token):
+            yield "token", token
+        yield "done", ""
+    return sse_response(events())
+
 @router.get("/history")
-def chat_history():
-    return {"history": chat.get_history()}
+def chat_history(session_id: str):
+    return {"history": chat.get_history(session_id)}
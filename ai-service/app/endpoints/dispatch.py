@@ -0,0 +1,61 @@
+# File: app/endpoints/dispatch.py
+
+from typing import Literal
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from app.models.schemas import TicketStatus
+from app.services import dispatch
+
+router = APIRouter(prefix="/dispatch", tags=["dispatch"])
+
+class ChangeInput(BaseModel):
+    # A Supabase database webhook payload.
+    type: Literal["INSERT", "UPDATE", "DELETE"]
+    table: str
+    record: dict | None = None
+    old_record: dict | None = None
+
+class AssignRequest(BaseModel):
+    volunteer_ids: list[str] = Field(min_length=1)
+
+class StatusRequest(BaseModel):
+    status: TicketStatus
+    volunteer_id: str | None = None  # required when scheduling
+
+@router.get("/next")
+async def next_tickets(limit: int = 10):
+    try:
+        return {"tickets": await dispatch.next_tickets(limit)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/assign")
+async def assign(request: AssignRequest):
+    try:
+        return await dispatch.assign_volunteers(request.volunteer_ids)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/tickets/{ticket_id}/status")
+async def update_status(ticket_id: str, request: StatusRequest):
+    try:
+        return {"ticket": await dispatch.update_status(ticket_id, request.status, request.volunteer_id)}
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No open ticket {ticket_id}")
+    except (dispatch.InvalidTransition, dispatch.TicketConflict) as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/events")
+async def apply_events(events: list[ChangeInput]):
+    # Ticket changes in stream order; webhooks for other tables are acknowledged and ignored.
+    tickets = [(e.type, e.record, e.old_record) for e in events if e.table == "tickets"]
+    rejected = await dispatch.engine.apply_events(tickets)
+    return {"applied": len(tickets) - len(rejected), "ignored": len(events) - len(tickets), "rejected": rejected}
+
+@router.get("/stats")
+def stats():
+    return dispatch.get_dispatch_stats()
@@ -2,17 +2,48 @@
 
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
+from app.config import settings
 from app.services import donation_parser
+from app.services.breaker import CircuitOpen
+from app.services.hedging import DeadlineExceeded
+from app.services.scheduler import Overloaded
 
 router = APIRouter(prefix="/donation", tags=["donation"])
 
 class DonationInput(BaseModel):
     text: str
+    bypass_cache: bool = False
+
+class DonationBatchInput(BaseModel):
+    texts: list[str]
+    bypass_cache: bool = False
 
 @router.post("/parse")
 async def parse_donation(input: DonationInput):
     try:
-        parsed = await donation_parser.parse_donation(input.text)
+        parsed = await donation_parser.parse_donation(input.text, use_cache=not input.bypass_cache)
         return parsed
+    except (Overloaded, DeadlineExceeded, CircuitOpen):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/parse/batch")
+async def parse_donation_batch(input: DonationBatchInput):
+    if len(input.texts) > settings.DONATION_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {settings.DONATION_BATCH_MAX_ITEMS} items")
+    try:
+        results = await donation_parser.parse_donations(input.texts, use_cache=not input.bypass_cache)
+        return {"results": results}
+    except (Overloaded, DeadlineExceeded, CircuitOpen):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/cache/stats")
+def cache_stats():
+    return donation_parser.get_cache_stats()
+
+@router.get("/fast-path/stats")
+def fast_path_stats():
+    return donation_parser.get_fast_path_stats()
@@ -0,0 +1,54 @@
+# File: app/endpoints/inventory.py
+
+from typing import Literal
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from app.services import inventory
+
+router = APIRouter(prefix="/inventory", tags=["inventory"])
+
+class ChangeInput(BaseModel):
+    # A Supabase database webhook payload.
+    type: Literal["INSERT", "UPDATE", "DELETE"]
+    table: str
+    record: dict | None = None
+    old_record: dict | None = None
+
+@router.get("/expiring")
+async def expiring(
+    hours: float = 48,
+    limit: int = 20,
+    partner_id: str | None = None,
+    food_type: str | None = None,
+    include_expired: bool = False,
+):
+    try:
+        food_type_id = await inventory.resolve_food_type(food_type) if food_type else None
+        if food_type and food_type_id is None:
+            raise HTTPException(status_code=404, detail=f"Unknown food type: {food_type}")
+        items = await inventory.expiring_inventory(hours, limit, partner_id, food_type_id, include_expired)
+        return {"items": items}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/changes")
+async def apply_change(change: ChangeInput):
+    if change.table != "inventory":
+        # Webhooks for other tables are acknowledged and ignored.
+        return {"applied": False}
+    try:
+        await inventory.engine.apply_change(change.type, change.record, change.old_record)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"applied": True}
+
+@router.post("/rebuild")
+def rebuild():
+    inventory.engine.rebuild()
+    return {"rebuilt": True}
+
+@router.get("/stats")
+def stats():
+    return inventory.get_inventory_stats()
@@ -0,0 +1,48 @@
+# File: app/endpoints/matching.py
+
+from datetime import datetime
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from app.services import matching
+
+router = APIRouter(prefix="/matching", tags=["matching"])
+
+class MatchInput(BaseModel):
+    # Either a donation to match (its pickup window and handling flags) or an explicit window.
+    donation_id: str | None = None
+    pickup_window_start: datetime | None = None
+    pickup_window_end: datetime | None = None
+    zone: str | None = None
+    skills: list[str] = []
+    handling: list[str] = []
+    limit: int = 50
+
+@router.post("/volunteers")
+async def match_volunteers(input: MatchInput):
+    unknown = set(input.handling) - set(matching.HANDLING)
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown handling requirements: {sorted(unknown)}")
+    try:
+        if input.donation_id is not None:
+            donation = await matching.get_donation(input.donation_id)
+            if donation is None:
+                raise HTTPException(status_code=404, detail=f"Unknown donation: {input.donation_id}")
+            query = matching.MatchQuery.for_donation(donation, input.zone, input.skills)
+            query.handling = sorted(set(query.handling) | set(input.handling))
+        elif input.pickup_window_start is not None and input.pickup_window_end is not None:
+            query = matching.MatchQuery(
+                input.pickup_window_start, input.pickup_window_end, input.zone, input.skills, input.handling
+            )
+        else:
+            raise HTTPException(status_code=422, detail="Provide donation_id or pickup_window_start and pickup_window_end")
+        return await matching.eligible_volunteers(query, input.limit)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/stats")
+def stats():
+    return matching.get_matching_stats()
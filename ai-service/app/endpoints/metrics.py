@@ -0,0 +1,46 @@
+# File: app/endpoints/metrics.py
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app import telemetry
+
+router = APIRouter(tags=["metrics"])
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return telemetry.render_metrics()
+
+@router.get("/metrics/models")
+def model_tier_stats():
+    # Per-task, per-tier request counts, latency, token usage and estimated cost.
+    from app.services.model_router import get_tier_stats
+
+    return get_tier_stats()
+
+@router.get("/metrics/hedging")
+def hedging_stats():
+    # Per-call hedge rate, hedge win rate and the current hedge threshold.
+    from app.services.hedging import get_hedge_stats
+
+    return get_hedge_stats()
+
+@router.get("/metrics/prompts")
+def prompt_stats():
+    # Locally counted prompt sizes (static prefix vs total) and provider-reported cached tokens.
+    from app.services.prompts import get_prompt_stats
+
+    return get_prompt_stats()
+
+@router.get("/metrics/breakers")
+def breaker_stats():
+    # Circuit state per model and responses served in degraded mode per task.
+    from app.services.breaker import get_breaker_stats
+
+    return get_breaker_stats()
+
+@router.get("/metrics/semantic-cache")
+def semantic_cache_stats():
+    # Hit rate, lookup latency and index size of the semantic response cache.
+    from app.services.semantic_cache import get_semantic_cache_stats
+
+    return get_semantic_cache_stats()
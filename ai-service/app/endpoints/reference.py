@@ -0,0 +1,28 @@
+# File: app/endpoints/reference.py
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from app.db import reference
+from app.services import matching
+
+router = APIRouter(prefix="/reference", tags=["reference"])
+
+class InvalidationInput(BaseModel):
+    # Matches the "table" field of Supabase database webhook payloads.
+    table: str | None = None
+
+@router.post("/invalidate")
+def invalidate(input: InvalidationInput):
+    if input.table is not None and input.table not in reference.tables and input.table not in matching.TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown reference table: {input.table}")
+    if input.table is None or input.table in matching.TABLES:
+        # The volunteer matching indexes are built from these tables.
+        matching.invalidate()
+    if input.table in matching.TABLES:
+        return {"invalidated": ["volunteer_matching"]}
+    reference.invalidate(input.table)
+    return {"invalidated": [input.table] if input.table else list(reference.tables) + ["volunteer_matching"]}
+
+@router.get("/stats")
+def stats():
+    return reference.stats()
@@ -0,0 +1,82 @@
+# File: app/endpoints/spatial.py
+
+from typing import Literal
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from app.services import spatial
+
+router = APIRouter(prefix="/spatial", tags=["spatial"])
+
+class SpatialQuery(BaseModel):
+    kind: Literal["partners", "volunteers", "donors"] = "partners"
+    # Either coordinates or a donation, whose donor's location is used.
+    latitude: float | None = None
+    longitude: float | None = None
+    donation_id: str | None = None
+    # Partners only: minimum spare capacity (max_capacity - capacity).
+    min_spare_capacity: float | None = None
+
+class NearestQuery(SpatialQuery):
+    k: int = 10
+
+class WithinQuery(SpatialQuery):
+    radius_km: float
+
+class ChangeInput(BaseModel):
+    # A Supabase database webhook payload.
+    type: Literal["INSERT", "UPDATE", "DELETE"]
+    table: str
+    record: dict | None = None
+    old_record: dict | None = None
+
+async def _origin(query: SpatialQuery) -> tuple[float, float]:
+    await spatial.engine.ensure_loaded()
+    if query.donation_id is not None:
+        origin = await spatial.donation_location(query.donation_id)
+        if origin is None:
+            raise HTTPException(status_code=404, detail=f"No location known for donation {query.donation_id}")
+        return origin
+    if query.latitude is None or query.longitude is None:
+        raise HTTPException(status_code=422, detail="Provide latitude and longitude, or donation_id")
+    return query.latitude, query.longitude
+
+def _rows(query: SpatialQuery, results: list[dict]) -> dict:
+    if query.kind == "partners":
+        return {"results": [{"id": r["id"], "distance_km": r["distance_km"], "spare_capacity": r["value"]} for r in results]}
+    return {"results": [{"id": r["id"], "distance_km": r["distance_km"]} for r in results]}
+
+@router.post("/nearest")
+async def nearest(query: NearestQuery):
+    try:
+        lat, lon = await _origin(query)
+        return _rows(query, spatial.engine.nearest(query.kind, lat, lon, query.k, query.min_spare_capacity))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/within")
+async def within(query: WithinQuery):
+    try:
+        lat, lon = await _origin(query)
+        return _rows(query, spatial.engine.within(query.kind, lat, lon, query.radius_km, query.min_spare_capacity))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/changes")
+async def apply_change(change: ChangeInput):
+    if change.table not in spatial.TABLES:
+        # Webhooks for other tables are acknowledged and ignored.
+        return {"applied": False}
+    await spatial.engine.ensure_loaded()
+    try:
+        spatial.engine.apply_change(change.table, change.type, change.record, change.old_record)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"applied": True}
+
+@router.get("/stats")
+def stats():
+    return spatial.get_spatial_stats()
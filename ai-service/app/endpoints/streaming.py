@@ -0,0 +1,27 @@
+# File: app/endpoints/streaming.py
+
+import json
+from typing import AsyncIterator
+from fastapi.responses import StreamingResponse
+
+def format_sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def sse_response(events: AsyncIterator[tuple[str, object]]) -> StreamingResponse:
+    """Wrap (event, data) pairs as a Server-Sent-Events response.
+
+    Errors raised mid-stream can no longer become an HTTP status, so they are
+    sent as a final "error" event instead.
+    """
+    async def body():
+        try:
+            async for event, data in events:
+                yield format_sse(event, data)
+        except Exception as e:
+            yield format_sse("error", str(e))
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
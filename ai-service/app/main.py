@@ -1,12 +1,72 @@
 # app/main.py
-from fastapi import FastAPI
-from app.endpoints import chat, donation, agent
+import math
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from app import clients, telemetry
+from app.config import settings
+from app.endpoints import chat, dispatch, donation, agent, inventory, matching, metrics, reference, spatial
+from app.services.breaker import CircuitOpen
+from app.services.hedging import DeadlineExceeded
+from app.services.scheduler import Overloaded
 
-app = FastAPI(title="AI Service")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs in each worker after the fork; nothing opens sockets before this point.
+    if settings.WARM_CLIENTS_ON_STARTUP:
+        clients.warm_up()
+    yield
+    # Release pooled OpenAI and Supabase connections on shutdown.
+    await clients.aclose()
+
+app = FastAPI(title="AI Service", lifespan=lifespan)
 
 app.include_router(chat.router)
 app.include_router(donation.router)
 app.include_router(agent.router)
+app.include_router(metrics.router)
+app.include_router(reference.router)
+app.include_router(matching.router)
+app.include_router(spatial.router)
+app.include_router(inventory.router)
+app.include_router(dispatch.router)
+
+@app.exception_handler(Overloaded)
+async def overloaded(request: Request, exc: Overloaded):
+    # Backpressure: the model request queue is full.
+    return JSONResponse(
+        status_code=429, content={"detail": str(exc)}, headers={"Retry-After": str(math.ceil(exc.retry_after))}
+    )
+
+@app.exception_handler(CircuitOpen)
+async def circuit_open(request: Request, exc: CircuitOpen):
+    # The model is failing and no degraded answer applies; fail fast instead of hanging.
+    return JSONResponse(
+        status_code=503, content={"detail": str(exc)}, headers={"Retry-After": str(math.ceil(exc.retry_after))}
+    )
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded(request: Request, exc: DeadlineExceeded):
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    with telemetry.trace("http", method=request.method, path=request.url.path) as current:
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            duration = time.perf_counter() - start
+            # Label by route template rather than raw path to keep cardinality bounded.
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            current["status"] = status
+            telemetry.record_span("endpoint", duration, route=route)
+            telemetry.http_requests.inc(method=request.method, route=route, status=status)
+            telemetry.http_duration.observe(duration, method=request.method, route=route)
 
 if __name__ == "__main__":
     import uvicorn
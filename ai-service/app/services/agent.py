@@ -1,21 +1,181 @@
 # app/services/agent.py
-from langchain_openai import ChatOpenAI
+import logging
+from typing import AsyncIterator
 from langgraph.prebuilt import create_react_agent
-from langchain.schema import HumanMessage
-from langgraph.checkpoint.memory import MemorySaver
+from langchain.schema import AIMessage, HumanMessage
+from langchain_core.messages import ToolMessage
+from app import clients, telemetry
 from app.config import settings
-from app.services.tools import crud_tool, navigation_tool, synthesis_tool
+from app.services import auth, breaker, hedging, intent_router, model_router, prompts, scheduler
+from app.services.checkpointer import create_checkpointer
+from app.services.history import count_tokens
+from app.services.semantic_cache import get_semantic_cache
+from app.services.tools import crud_tool, inventory_tool, matching_tool, navigation_tool, synthesis_tool
 
-llm = ChatOpenAI(model="gpt-4o", temperature=0, openai_api_key=settings.OPENAI_API_KEY)
-tools = [crud_tool, navigation_tool, synthesis_tool]
-memory = MemorySaver()
-agent_executor = create_react_agent(llm, tools, checkpointer=memory)
+logger = logging.getLogger(__name__)
 
-async def get_agent_response(query: str, config: dict) -> str:
+tools = [crud_tool, navigation_tool, synthesis_tool, matching_tool, inventory_tool]
+# Tool schemas and the system prompt: the invariant prefix of every agent model call.
+prefix_tokens = prompts.tool_schema_tokens(tools) + count_tokens(prompts.AGENT_SYSTEM_PROMPT)
+# The checkpointer and the compiled graph are built on first use (see app.clients).
+memory = None
+agent_executor = None
+
+def get_checkpointer():
+    global memory
+    if memory is None:
+        memory = create_checkpointer()
+    return memory
+
+def get_agent_executor():
+    global agent_executor
+    if agent_executor is None:
+        model = clients.get_chat_model(model_router.model_name(model_router.task_tier("agent")))
+        agent_executor = create_react_agent(
+            model, tools, prompt=prompts.AGENT_SYSTEM_PROMPT, checkpointer=get_checkpointer()
+        )
+    return agent_executor
+
+def _record_prompt(query: str):
+    # Counts the new turn only; earlier turns on the thread sit between prefix and query.
+    prompts.record("agent", prefix_tokens, prefix_tokens + count_tokens(query))
+
+async def _record_exchange(query: str, answer: str, config: dict):
+    # Later agent turns on this thread still see the request and its answer.
+    await get_agent_executor().aupdate_state(
+        config, {"messages": [HumanMessage(content=query), AIMessage(content=answer)]}, as_node="agent"
+    )
+
+async def _dispatch(route: intent_router.Route, query: str, config: dict) -> str:
+    """Run a routed tool call directly and record the exchange on the thread."""
+    tool = next(t for t in tools if t.name == route.tool)
+    with telemetry.span("intent.dispatch", intent=route.intent):
+        result = await tool.ainvoke(route.args)
+        await _record_exchange(query, result, config)
+    return result
+
+async def _cacheable(config: dict) -> bool:
+    # Only the opening question of a thread: later turns depend on the conversation so far.
+    if not settings.SEMANTIC_CACHE_ENABLED:
+        return False
+    state = await get_agent_executor().aget_state(config)
+    return not state.values.get("messages")
+
+async def _cached_answer(query: str, config: dict, role: str | None) -> str | None:
+    """A cached answer to the query, recorded on the thread, or None."""
+    answer = await get_semantic_cache().lookup("agent", role, query)
+    if answer is not None:
+        await _record_exchange(query, answer, config)
+    return answer
+
+async def _store_answer(query: str, messages: list, role: str | None):
+    # Answers built from tool results reflect data at that moment; only cache the rest.
+    if messages and not any(isinstance(m, ToolMessage) for m in messages):
+        await get_semantic_cache().store("agent", role, query, messages[-1].content)
+
+def _degraded_route(query: str) -> intent_router.Route | None:
+    """The tool to answer with while the agent model's circuit is open, if any fits."""
+    route = intent_router.match_loose(query)
+    if route is not None:
+        breaker.record_degraded("agent")
+        logger.warning("agent model unavailable; dispatching %s directly", route.tool)
+    return route
+
+async def _stream_dispatch(route: intent_router.Route, query: str, config: dict):
+    yield "tool_start", {"tool": route.tool, "input": route.args}
+    result = await _dispatch(route, query, config)
+    yield "tool_end", {"tool": route.tool, "output": result}
+    yield "done", result
+
+async def get_agent_response(query: str, config: dict, access_token: str | None = None) -> str:
+    if settings.INTENT_ROUTER_ENABLED and (route := intent_router.route(query)):
+        return await _dispatch(route, query, config)
+    cacheable = await _cacheable(config)
+    role = await auth.resolve_role(access_token) if cacheable else None
+    if cacheable and (answer := await _cached_answer(query, config, role)) is not None:
+        return answer
     messages = [HumanMessage(content=query)]
-    result = await agent_executor.ainvoke({"messages": messages}, config=config)
-    print("DEBUG: raw agent result:", result)
+    _record_prompt(query)
+    tier = model_router.task_tier("agent")
+    # Admitted once per turn; replaying a failed turn would duplicate it on the thread,
+    # so upstream 429s are left to the OpenAI client's own retries here.
+    # Not hedged: a second attempt would run the tools and write the thread twice.
+    # The breaker sees each model call, not the turn: tool and database time are not model failures.
+    try:
+        async with scheduler.slot(scheduler.INTERACTIVE, count_tokens(query)):
+            with model_router.track("agent", tier, per_llm_call=True) as usage:
+                run_config = {**config, "callbacks": telemetry.callbacks() + [usage]}
+                result = await hedging.with_deadline(
+                    "agent", get_agent_executor().ainvoke({"messages": messages}, config=run_config)
+                )
+    except breaker.CircuitOpen:
+        # Degraded mode: answer directly with a tool where the request allows it.
+        if (route := _degraded_route(query)) is None:
+            raise
+        return await _dispatch(route, query, config)
+    logger.debug("raw agent result: %s", result)
+    if cacheable:
+        await _store_answer(query, result.get("messages", []), role)
     # Now, since the output contains a top-level "messages" list, extract the final message.
     if "messages" in result and result["messages"]:
         return result["messages"][-1].content
     return f"No final agent message; raw result: {result}"
+
+async def stream_agent_response(
+    query: str, config: dict, access_token: str | None = None
+) -> AsyncIterator[tuple[str, object]]:
+    """Yield (event, data) pairs while the agent runs.
+
+    "token" events carry model output as it streams, "tool_start"/"tool_end" report
+    tool-call progress, and a final "done" event carries the last message. The
+    checkpointer records the thread exactly as it does for get_agent_response.
+    """
+    if settings.INTENT_ROUTER_ENABLED and (route := intent_router.route(query)):
+        async for item in _stream_dispatch(route, query, config):
+            yield item
+        return
+    cacheable = await _cacheable(config)
+    role = await auth.resolve_role(access_token) if cacheable else None
+    if cacheable and (answer := await _cached_answer(query, config, role)) is not None:
+        yield "done", answer
+        return
+    messages = [HumanMessage(content=query)]
+    _record_prompt(query)
+    executor = get_agent_executor()
+    tier = model_router.task_tier("agent")
+    # Degraded mode, as in get_agent_response (checked up front: events may already be out on failure).
+    if not breaker.get_breaker(model_router.model_name(tier)).available() and (route := _degraded_route(query)):
+        async for item in _stream_dispatch(route, query, config):
+            yield item
+        return
+    async with scheduler.slot(scheduler.INTERACTIVE, count_tokens(query)):
+        with model_router.track("agent", tier, per_llm_call=True) as usage:
+            config = {**config, "callbacks": telemetry.callbacks() + [usage]}
+            async for event in executor.astream_events({"messages": messages}, config=config, version="v2"):
+                kind = event["event"]
+                if kind == "on_chat_model_stream":
+                    if content := event["data"]["chunk"].content:
+                        yield "token", content
+                elif kind == "on_tool_start":
+                    yield "tool_start", {"tool": event["name"], "input": event["data"].get("input")}
+                elif kind == "on_tool_end":
+                    output = event["data"].get("output")
+                    yield "tool_end", {"tool": event["name"], "output": str(getattr(output, "content", output))}
+    state = await executor.aget_state(config)
+    final_messages = state.values.get("messages", [])
+    if cacheable:
+        await _store_answer(query, final_messages, role)
+    yield "done", final_messages[-1].content if final_messages else ""
+
+def get_checkpointer_stats() -> dict:
+    return get_checkpointer().stats()
+
+@telemetry.register_collector
+def _checkpointer_metrics() -> dict:
+    stats = get_checkpointer_stats()
+    return {
+        "helphut_agent_threads": stats["threads"],
+        "helphut_agent_checkpoints": stats["checkpoints"],
+        "helphut_agent_checkpoint_bytes": stats["stored_bytes"],
+        "helphut_agent_thread_evictions": stats["evictions"],
+    }
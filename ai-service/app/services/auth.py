@@ -0,0 +1,45 @@
+# app/services/auth.py
+"""Caller roles for the semantic cache scope, resolved as the web server's requireAuth does.
+
+The Supabase access token is verified with Supabase Auth and the role read from
+the users table. Only the semantic cache reads the role, so it is resolved there
+and only for cacheable turns; no other request pays for the round trips. A
+missing, invalid or unknown token resolves to None (the anonymous scope), never
+to a role the caller claimed.
+"""
+import logging
+from app.config import settings
+from app.db import queries
+from app.db.connection import get_async_supabase
+from app.services.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Built on first use: the TTL comes from settings. Anonymous results are kept as "".
+_roles: LRUCache | None = None
+
+def _role_cache() -> LRUCache:
+    global _roles
+    if _roles is None:
+        _roles = LRUCache(max_entries=10_000, ttl_seconds=settings.AUTH_ROLE_CACHE_TTL_SECONDS)
+    return _roles
+
+async def _lookup_role(token: str) -> str | None:
+    try:
+        response = await get_async_supabase().auth.get_user(token)
+    except Exception:
+        logger.info("Access token did not verify; using the anonymous cache scope")
+        return None
+    user = response.user if response else None
+    if user is None:
+        return None
+    rows = await queries.get_user(user.id)
+    return rows[0]["role"] if rows else None
+
+async def resolve_role(token: str | None) -> str | None:
+    if not token:
+        return None
+    if (role := _role_cache().get(token)) is None:
+        role = await _lookup_role(token) or ""
+        _role_cache().set(token, role)
+    return role or None
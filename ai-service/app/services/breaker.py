@@ -0,0 +1,148 @@
+# app/services/breaker.py
+"""Circuit breakers around model calls, one per model.
+
+A breaker watches the outcome of the last BREAKER_WINDOW calls to its model.
+Once at least BREAKER_MIN_CALLS have been seen and BREAKER_FAILURE_RATE of
+them failed -- raised a provider error, or took longer than
+BREAKER_SLOW_CALL_SECONDS -- it opens: calls fail at once with CircuitOpen
+instead of waiting on a stalled provider. After BREAKER_OPEN_SECONDS it goes
+half-open and lets BREAKER_HALF_OPEN_CALLS probe calls through; a successful
+probe closes it, a failed one opens it again.
+
+Rate limiting (429), invalid model output (ValueError) and cancellation are
+not provider failures and are not counted, except that a cancelled call which
+had already run past the slow-call limit counts as slow.
+"""
+import time
+from collections import deque
+from app import telemetry
+from app.config import settings
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+transitions = telemetry.register_metric(
+    telemetry.Counter("helphut_circuit_transitions_total", "Circuit breaker state changes by model and new state.")
+)
+short_circuited = telemetry.register_metric(
+    telemetry.Counter("helphut_circuit_rejections_total", "Model calls failed fast by an open circuit, by model.")
+)
+degraded_responses = telemetry.register_metric(
+    telemetry.Counter("helphut_degraded_responses_total", "Responses served without the model while its circuit was open, by task.")
+)
+
+class CircuitOpen(Exception):
+    """The model's circuit is open; retry after `retry_after` seconds."""
+
+    def __init__(self, model: str, retry_after: float):
+        super().__init__(f"Model {model} is unavailable; retry after {retry_after:.0f}s")
+        self.model = model
+        self.retry_after = retry_after
+
+def is_provider_failure(exc: BaseException) -> bool:
+    if not isinstance(exc, Exception) or isinstance(exc, (ValueError, CircuitOpen)):
+        return False
+    return getattr(exc, "status_code", None) != 429
+
+class CircuitBreaker:
+    def __init__(self, name: str):
+        self.name = name
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probes = 0
+        self.outcomes: deque[bool] = deque(maxlen=settings.BREAKER_WINDOW)  # True = failure
+        self.rejected = 0
+
+    def _transition(self, state: str):
+        self.state = state
+        transitions.inc(model=self.name, state=state)
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+        if state != HALF_OPEN:
+            self.probes = 0
+        if state == CLOSED:
+            self.outcomes.clear()
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + settings.BREAKER_OPEN_SECONDS - time.monotonic())
+
+    def available(self) -> bool:
+        """Whether check() would currently let a call through (without admitting it)."""
+        if not settings.BREAKER_ENABLED or self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return self.retry_after() == 0
+        return self.probes < settings.BREAKER_HALF_OPEN_CALLS
+
+    def check(self):
+        """Raise CircuitOpen unless a call may go through now (admitting a probe when half-open)."""
+        if not settings.BREAKER_ENABLED:
+            return
+        if self.state == OPEN and self.retry_after() == 0:
+            self._transition(HALF_OPEN)
+        if self.state == OPEN or (self.state == HALF_OPEN and self.probes >= settings.BREAKER_HALF_OPEN_CALLS):
+            self.rejected += 1
+            short_circuited.inc(model=self.name)
+            raise CircuitOpen(self.name, self.retry_after() or settings.BREAKER_OPEN_SECONDS)
+        if self.state == HALF_OPEN:
+            self.probes += 1
+
+    def release(self):
+        """Give back a half-open probe admitted by check() that never reached the model."""
+        if self.state == HALF_OPEN:
+            self.probes = max(0, self.probes - 1)
+
+    def record(self, elapsed: float, error: BaseException | None = None):
+        slow = elapsed > settings.BREAKER_SLOW_CALL_SECONDS
+        if error is not None and not slow and not is_provider_failure(error):
+            if self.state == HALF_OPEN:
+                # The probe proved nothing either way; let another one through.
+                self.probes = max(0, self.probes - 1)
+            return
+        failed = slow or error is not None
+        if self.state == HALF_OPEN:
+            self._transition(OPEN if failed else CLOSED)
+            return
+        self.outcomes.append(failed)
+        if (
+            self.state == CLOSED
+            and len(self.outcomes) >= settings.BREAKER_MIN_CALLS
+            and sum(self.outcomes) / len(self.outcomes) >= settings.BREAKER_FAILURE_RATE
+        ):
+            self._transition(OPEN)
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "failure_rate": sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0,
+            "window_calls": len(self.outcomes),
+            "rejected": self.rejected,
+            "retry_after": self.retry_after() if self.state == OPEN else 0.0,
+        }
+
+breakers: dict[str, CircuitBreaker] = {}
+degraded: dict[str, int] = {}
+
+def get_breaker(model: str) -> CircuitBreaker:
+    if model not in breakers:
+        breakers[model] = CircuitBreaker(model)
+    return breakers[model]
+
+def reset():
+    breakers.clear()
+
+def record_degraded(task: str):
+    degraded_responses.inc(task=task)
+    degraded[task] = degraded.get(task, 0) + 1
+
+def get_breaker_stats() -> dict:
+    return {
+        "breakers": {model: breaker.stats() for model, breaker in sorted(breakers.items())},
+        "degraded_responses": dict(degraded),
+    }
+
+@telemetry.register_collector
+def _breaker_metrics() -> dict:
+    return {
+        "helphut_circuit_state": {(("model", m),): STATE_VALUES[b.state] for m, b in breakers.items()},
+    }
@@ -1,26 +1,127 @@
 # File: app/services/chat.py
 
+import hashlib
+import json
 from app.config import settings
-from langchain_openai import ChatOpenAI 
+from typing import AsyncIterator
 from langchain.schema import HumanMessage, AIMessage
+from langchain_core.messages import message_chunk_to_message
+from app import clients, telemetry
+from app.services import auth, hedging, model_router, prompts, scheduler
+from app.services.history import create_history_store, estimate_tokens, trim_to_budget
+from app.services.semantic_cache import get_semantic_cache
+from app.services.singleflight import SingleFlight
 
-# Initialize the chat model using your OpenAI API key.
-chat_model = ChatOpenAI(model="gpt-4o", temperature=0, openai_api_key=settings.OPENAI_API_KEY)
+# Chat models per tier (shared via app.clients) and the history store are created on first use.
+chat_models: dict = {}
 
-# Global conversation history (in memory)
-conversation_history = []
+# Conversation history keyed by session id (bounded LRU/TTL or SQLite, see Settings).
+history_store = None
 
-async def get_chat_response(message: str) -> str:
-    global conversation_history
-    # Append the user's message.
-    conversation_history.append(HumanMessage(content=message))
-    # Get the AI response asynchronously.
-    response = await chat_model.ainvoke(conversation_history)
-    conversation_history.append(response)
+# Identical concurrent prompts (e.g. a retried /chat/send) share one model call.
+chat_flights = SingleFlight("chat")
+
+def get_chat_model(tier: str = model_router.LARGE):
+    if tier not in chat_models:
+        # Upstream 429s are retried by the scheduler rather than the OpenAI client.
+        max_retries = 0 if settings.LLM_RATE_LIMIT_ENABLED else None
+        chat_models[tier] = clients.get_chat_model(model_router.model_name(tier), max_retries=max_retries)
+    return chat_models[tier]
+
+def get_history_store():
+    global history_store
+    if history_store is None:
+        history_store = create_history_store()
+    return history_store
+
+def _prompt_key(tier: str, history) -> str:
+    payload = json.dumps([tier] + [(m.type, m.content) for m in history], default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def _messages(history):
+    # The fixed system prompt leads every turn; the (trimmed) conversation follows it.
+    messages = prompts.with_system_prompt(prompts.CHAT_SYSTEM_PROMPT, history)
+    prompts.record("chat", estimate_tokens(messages[0]), prompts.message_tokens(messages))
+    return messages
+
+async def _call(tier: str, history):
+    with model_router.track("chat", tier) as usage:
+        return await get_chat_model(tier).ainvoke(
+            _messages(history), config={"callbacks": telemetry.callbacks() + [usage]}
+        )
+
+async def _invoke(tier: str, history):
+    tokens = sum(estimate_tokens(m) for m in history)
+    # Each attempt (a hedge included) is admitted and rate limited on its own.
+    return await hedging.hedged(
+        f"chat:{tier}", lambda: scheduler.run(scheduler.INTERACTIVE, tokens, lambda: _call(tier, history))
+    )
+
+def _cacheable(history) -> bool:
+    # Only opening questions: later turns depend on the conversation so far.
+    return settings.SEMANTIC_CACHE_ENABLED and len(history) == 1
+
+async def _cached_turn(session_id: str, history, role: str | None) -> str | None:
+    """Answer from the semantic cache and record the turn, or None on a miss."""
+    if not _cacheable(history):
+        return None
+    answer = await get_semantic_cache().lookup("chat", role, history[-1].content)
+    if answer is not None:
+        history.append(AIMessage(content=answer))
+        get_history_store().set(session_id, history)
+    return answer
+
+async def get_chat_response(session_id: str, message: str, access_token: str | None = None) -> str:
+    # Append the user's message, keeping the prompt within the per-session token budget.
+    with telemetry.span("prompt.assemble", endpoint="chat"):
+        history = get_history_store().get(session_id)
+        history.append(HumanMessage(content=message))
+        history = trim_to_budget(history, settings.CHAT_HISTORY_TOKEN_BUDGET)
+    # The caller's role scopes cache entries; it is only looked up when the cache is consulted.
+    role = await auth.resolve_role(access_token) if _cacheable(history) else None
+    if (answer := await _cached_turn(session_id, history, role)) is not None:
+        return answer
+    # Get the AI response asynchronously, from the cheapest tier that fits the message.
+    tier = model_router.select_tier("chat", message)
+    if settings.LLM_COALESCING_ENABLED:
+        call = chat_flights.do(_prompt_key(tier, history), lambda: _invoke(tier, history))
+    else:
+        call = _invoke(tier, history)
+    response = await hedging.with_deadline("chat", call)
+    if _cacheable(history):
+        await get_semantic_cache().store("chat", role, message, response.content)
+    history.append(response)
+    get_history_store().set(session_id, history)
     return response.content
 
-def get_history():
+async def stream_chat_response(session_id: str, message: str, access_token: str | None = None) -> AsyncIterator[str]:
+    # Same as get_chat_response, but yields content tokens as the model produces them.
+    with telemetry.span("prompt.assemble", endpoint="chat"):
+        history = get_history_store().get(session_id)
+        history.append(HumanMessage(content=message))
+        history = trim_to_budget(history, settings.CHAT_HISTORY_TOKEN_BUDGET)
+    # The caller's role scopes cache entries; it is only looked up when the cache is consulted.
+    role = await auth.resolve_role(access_token) if _cacheable(history) else None
+    if (answer := await _cached_turn(session_id, history, role)) is not None:
+        yield answer
+        return
+    response = None
+    tier = model_router.select_tier("chat", message)
+    tokens = sum(estimate_tokens(m) for m in history)
+    async with scheduler.slot(scheduler.INTERACTIVE, tokens):
+        with model_router.track("chat", tier) as usage:
+            async for chunk in get_chat_model(tier).astream(_messages(history), config={"callbacks": telemetry.callbacks() + [usage]}):
+                response = chunk if response is None else response + chunk
+                if chunk.content:
+                    yield chunk.content
+    # Record the turn only once the full response has been received.
+    if response is not None and _cacheable(history):
+        await get_semantic_cache().store("chat", role, message, response.content)
+    history.append(message_chunk_to_message(response) if response is not None else AIMessage(content=""))
+    get_history_store().set(session_id, history)
+
+def get_history(session_id: str):
     return [
         {"role": "human" if msg.__class__.__name__ == "HumanMessage" else "ai", "content": msg.content}
-        for msg in conversation_history
+        for msg in get_history_store().get(session_id)
     ]
@@ -0,0 +1,260 @@
+# app/services/checkpointer.py
+
+import resource
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Iterator, Optional, Sequence
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.checkpoint.memory import MemorySaver
+from app.config import settings
+
+class BoundedMemorySaver(MemorySaver):
+    """MemorySaver that bounds how much agent state a worker keeps in RAM.
+
+    Each thread_id gets its own MemorySaver, kept in an LRU of at most
+    max_threads entries, and only the newest max_checkpoints_per_thread
+    checkpoints (plus the channel blobs they reference) are retained per
+    namespace. When sqlite_path is set, every checkpoint is also written
+    through to a local SQLite file, so evicted threads are reloaded on their
+    next access and conversations survive restarts.
+    """
+
+    def __init__(self, max_threads: int, max_checkpoints_per_thread: int, sqlite_path: str | None = None, *, serde=None):
+        super().__init__(serde=serde)
+        self.max_threads = max_threads
+        self.max_checkpoints_per_thread = max_checkpoints_per_thread
+        self.threads: OrderedDict[str, MemorySaver] = OrderedDict()
+        self.evictions = 0
+        self._lock = threading.RLock()
+        self._db = _CheckpointDB(sqlite_path) if sqlite_path else None
+
+    def _thread(self, thread_id: str, create: bool = False) -> MemorySaver | None:
+        with self._lock:
+            saver = self.threads.get(thread_id)
+            if saver is None and self._db is not None:
+                saver = self._db.load_thread(thread_id, MemorySaver(serde=self.serde))
+            if saver is None and create:
+                saver = MemorySaver(serde=self.serde)
+            if saver is not None:
+                self.threads[thread_id] = saver
+                self.threads.move_to_end(thread_id)
+                while len(self.threads) > self.max_threads:
+                    self.threads.popitem(last=False)
+                    self.evictions += 1
+            return saver
+
+    def _prune(self, thread_id: str, checkpoint_ns: str, saver: MemorySaver):
+        checkpoints = saver.storage[thread_id][checkpoint_ns]
+        if len(checkpoints) <= self.max_checkpoints_per_thread:
+            return
+        expired = sorted(checkpoints)[:-self.max_checkpoints_per_thread]
+        for checkpoint_id in expired:
+            del checkpoints[checkpoint_id]
+            saver.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+        # Keep only the channel blobs the retained checkpoints still point at.
+        referenced = set()
+        for checkpoint, _, _ in checkpoints.values():
+            referenced.update(self.serde.loads_typed(checkpoint)["channel_versions"].items())
+        stale = [k for k in saver.blobs if k[1] == checkpoint_ns and (k[2], k[3]) not in referenced]
+        for key in stale:
+            del saver.blobs[key]
+        if self._db is not None:
+            self._db.delete_checkpoints(thread_id, checkpoint_ns, expired, [(k[2], k[3]) for k in stale])
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        saver = self._thread(config["configurable"]["thread_id"])
+        return saver.get_tuple(config) if saver is not None else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        if config:
+            saver = self._thread(config["configurable"]["thread_id"])
+            savers = [saver] if saver is not None else []
+        else:
+            with self._lock:
+                savers = list(self.threads.values())
+        for saver in savers:
+            for item in saver.list(config, filter=filter, before=before, limit=limit):
+                if limit is not None:
+                    if limit <= 0:
+                        return
+                    limit -= 1
+                yield item
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        saver = self._thread(thread_id, create=True)
+        next_config = saver.put(config, checkpoint, metadata, new_versions)
+        if self._db is not None:
+            self._db.save_checkpoint(
+                thread_id,
+                checkpoint_ns,
+                checkpoint["id"],
+                saver.storage[thread_id][checkpoint_ns][checkpoint["id"]],
+                {(k, v): saver.blobs[(thread_id, checkpoint_ns, k, v)] for k, v in new_versions.items()},
+            )
+        self._prune(thread_id, checkpoint_ns, saver)
+        return next_config
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        saver = self._thread(thread_id, create=True)
+        saver.put_writes(config, writes, task_id, task_path)
+        if self._db is not None:
+            saved = saver.writes[(thread_id, checkpoint_ns, checkpoint_id)]
+            self._db.save_writes(
+                thread_id,
+                checkpoint_ns,
+                checkpoint_id,
+                {key: value for key, value in saved.items() if key[0] == task_id},
+            )
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self.threads.pop(thread_id, None)
+        if self._db is not None:
+            self._db.delete_thread(thread_id)
+
+    def stats(self) -> dict:
+        """Memory-usage metrics used to size agent workers."""
+        with self._lock:
+            savers = list(self.threads.items())
+        checkpoints = blobs = writes = size = 0
+        for thread_id, saver in savers:
+            for per_ns in saver.storage[thread_id].values():
+                checkpoints += len(per_ns)
+                size += sum(len(c[1]) + len(m[1]) for c, m, _ in per_ns.values())
+            blobs += len(saver.blobs)
+            size += sum(len(b[1]) for b in saver.blobs.values())
+            for per_checkpoint in saver.writes.values():
+                writes += len(per_checkpoint)
+                size += sum(len(w[2][1]) for w in per_checkpoint.values())
+        return {
+            "threads": len(savers),
+            "max_threads": self.max_threads,
+            "checkpoints": checkpoints,
+            "blobs": blobs,
+            "writes": writes,
+            "stored_bytes": size,
+            "evictions": self.evictions,
+            "durable": self._db is not None,
+            "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        }
+
+class _CheckpointDB:
+    """Write-through SQLite storage for BoundedMemorySaver."""
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS checkpoints (thread_id TEXT, checkpoint_ns TEXT, checkpoint_id TEXT, "
+            "checkpoint_type TEXT, checkpoint BLOB, metadata_type TEXT, metadata BLOB, parent_checkpoint_id TEXT, "
+            "PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id));"
+            "CREATE TABLE IF NOT EXISTS blobs (thread_id TEXT, checkpoint_ns TEXT, channel TEXT, version TEXT, "
+            "type TEXT, blob BLOB, PRIMARY KEY (thread_id, checkpoint_ns, channel, version));"
+            "CREATE TABLE IF NOT EXISTS writes (thread_id TEXT, checkpoint_ns TEXT, checkpoint_id TEXT, task_id TEXT, "
+            "idx INTEGER, channel TEXT, type TEXT, value BLOB, task_path TEXT, "
+            "PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx));"
+        )
+
+    def save_checkpoint(self, thread_id, checkpoint_ns, checkpoint_id, saved, blobs):
+        (checkpoint_type, checkpoint), (metadata_type, metadata), parent_id = saved
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint_id, checkpoint_type, checkpoint, metadata_type, metadata, parent_id),
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)",
+                [(thread_id, checkpoint_ns, k, str(v), t, b) for (k, v), (t, b) in blobs.items()],
+            )
+
+    def save_writes(self, thread_id, checkpoint_ns, checkpoint_id, writes):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, value[0], value[1], task_path)
+                    for (task_id, idx), (_, channel, value, task_path) in writes.items()
+                ],
+            )
+
+    def delete_checkpoints(self, thread_id, checkpoint_ns, checkpoint_ids, blob_keys):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                [(thread_id, checkpoint_ns, c) for c in checkpoint_ids],
+            )
+            self._conn.executemany(
+                "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                [(thread_id, checkpoint_ns, c) for c in checkpoint_ids],
+            )
+            self._conn.executemany(
+                "DELETE FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                [(thread_id, checkpoint_ns, k, str(v)) for k, v in blob_keys],
+            )
+
+    def delete_thread(self, thread_id):
+        with self._lock, self._conn:
+            for table in ("checkpoints", "blobs", "writes"):
+                self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    def load_thread(self, thread_id, saver: MemorySaver) -> MemorySaver | None:
+        with self._lock:
+            checkpoints = self._conn.execute(
+                "SELECT checkpoint_ns, checkpoint_id, checkpoint_type, checkpoint, metadata_type, metadata, "
+                "parent_checkpoint_id FROM checkpoints WHERE thread_id = ?",
+                (thread_id,),
+            ).fetchall()
+            if not checkpoints:
+                return None
+            blobs = self._conn.execute(
+                "SELECT checkpoint_ns, channel, version, type, blob FROM blobs WHERE thread_id = ?", (thread_id,)
+            ).fetchall()
+            writes = self._conn.execute(
+                "SELECT checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value, task_path "
+                "FROM writes WHERE thread_id = ?",
+                (thread_id,),
+            ).fetchall()
+        # Versions are rebuilt from the checkpoints themselves so their original type is preserved.
+        versions = {}
+        for ns, checkpoint_id, c_type, c, m_type, m, parent_id in checkpoints:
+            saver.storage[thread_id][ns][checkpoint_id] = ((c_type, c), (m_type, m), parent_id)
+            for k, v in saver.serde.loads_typed((c_type, c))["channel_versions"].items():
+                versions[(ns, k, str(v))] = v
+        for ns, channel, version, b_type, blob in blobs:
+            saver.blobs[(thread_id, ns, channel, versions.get((ns, channel, version), version))] = (b_type, blob)
+        for ns, checkpoint_id, task_id, idx, channel, w_type, value, task_path in writes:
+            saver.writes[(thread_id, ns, checkpoint_id)][(task_id, idx)] = (task_id, channel, (w_type, value), task_path)
+        return saver
+
+def create_checkpointer() -> BoundedMemorySaver:
+    return BoundedMemorySaver(
+        max_threads=settings.AGENT_MAX_THREADS,
+        max_checkpoints_per_thread=settings.AGENT_MAX_CHECKPOINTS_PER_THREAD,
+        sqlite_path=settings.AGENT_CHECKPOINT_SQLITE_PATH,
+    )
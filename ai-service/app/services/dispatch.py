@@ -0,0 +1,430 @@
+# app/services/dispatch.py
+"""Dispatch queue of Submitted delivery tickets, with enforced status transitions.
+
+Submitted tickets sit in one binary heap per priority, keyed by when they
+were created. An Urgent ticket's key is moved DISPATCH_URGENT_HEAD_START_SECONDS
+earlier. Urgent tickets therefore go first, but a Routine ticket that has
+waited longer than the head start is not starved. Within a priority the
+oldest ticket goes first. As in the inventory index, a ticket that leaves
+Submitted is not dug out of its heap. Its entry goes stale and is skipped,
+and a heap is rebuilt once more than half of it is stale. A status update is
+therefore O(log n) amortized; that is what lets the event stream keep up
+with thousands of updates per second.
+
+The queue only mirrors the tickets table. Rows replayed from the table
+(upsert()) are taken as they are, whatever the change. The service's own
+writes, assign_volunteers() and update_status() (pickup, delivery, a volunteer
+dropping a ticket), go through assign() and transition() and must follow the
+ticket lifecycle in TRANSITIONS (Submitted -> Scheduled -> InTransit ->
+Delivered -> Completed). A Scheduled ticket may also fall back to Submitted
+when its volunteer drops it. Any other change raises InvalidTransition.
+Completed tickets are forgotten.
+
+assign() hands the next tickets to a batch of volunteers, one each, in
+dispatch order. Each ticket goes to the nearest volunteer still free in the
+batch, when both locations are known; otherwise to the next volunteer in the
+order given.
+
+DispatchEngine bulk-loads the open tickets on first use and is kept current
+from Supabase database webhook payloads (POST /dispatch/events). When the
+mirror and the table disagree, the table wins. This covers a malformed
+event, and a write whose conditional update found the ticket no longer in the
+status it was checked against. In both cases the row is read again and the mirror is resynced
+from it. If even that read fails, the whole queue is reloaded on next use.
+"""
+import asyncio
+import heapq
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, Mapping
+import numpy as np
+from pydantic import ValidationError
+from app import telemetry
+from app.config import settings
+from app.db import queries
+from app.models.schemas import TicketPriority, TicketStatus, TicketsRow
+from app.services import spatial
+from app.services.spatial import haversine_km
+
+assign_latency = telemetry.register_metric(
+    telemetry.Histogram("helphut_dispatch_assign_seconds", "Batch volunteer assignment latency.")
+)
+event_batch_latency = telemetry.register_metric(
+    telemetry.Histogram("helphut_dispatch_event_batch_seconds", "Ticket event batch apply latency.")
+)
+
+TRANSITIONS: dict[TicketStatus, frozenset[TicketStatus]] = {
+    TicketStatus.Submitted: frozenset({TicketStatus.Scheduled}),
+    TicketStatus.Scheduled: frozenset({TicketStatus.InTransit, TicketStatus.Submitted}),
+    TicketStatus.InTransit: frozenset({TicketStatus.Delivered}),
+    TicketStatus.Delivered: frozenset({TicketStatus.Completed}),
+    TicketStatus.Completed: frozenset(),
+}
+
+# A heap entry: (dispatch key, ticket id, ticket version).
+Entry = tuple[float, str, int]
+
+class TicketConflict(Exception):
+    """The ticket's row changed before our conditional write reached it."""
+
+    def __init__(self, ticket_id: str):
+        super().__init__(f"Ticket {ticket_id} was changed by someone else; reload it and retry")
+        self.ticket_id = ticket_id
+
+class InvalidTransition(ValueError):
+    def __init__(self, ticket_id: str, current: TicketStatus, new: TicketStatus):
+        super().__init__(f"Ticket {ticket_id} cannot go from {current.value} to {new.value}")
+        self.ticket_id = ticket_id
+        self.current = current
+        self.new = new
+
+@dataclass
+class Ticket:
+    id: str
+    priority: TicketPriority
+    status: TicketStatus
+    created: float  # POSIX timestamp
+    volunteer_id: str | None = None
+    pickup_location_id: str | None = None
+    dropoff_location_id: str | None = None
+    version: int = 0
+
+def _timestamp(value: datetime) -> float:
+    return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+
+def _ticket(row: TicketsRow, version: int = 0) -> Ticket:
+    return Ticket(
+        row.id, TicketPriority(row.priority), TicketStatus(row.status), _timestamp(row.created_at),
+        row.volunteer_id, row.pickup_location_id, row.dropoff_location_id, version,
+    )
+
+def _in_order(heap: list[Entry]) -> Iterator[Entry]:
+    # Best-first walk of the implicit heap tree: yields entries in order without popping.
+    if not heap:
+        return
+    frontier = [(heap[0], 0)]
+    while frontier:
+        entry, i = heapq.heappop(frontier)
+        yield entry
+        for child in (2 * i + 1, 2 * i + 2):
+            if child < len(heap):
+                heapq.heappush(frontier, (heap[child], child))
+
+class DispatchQueue:
+    def __init__(self, rows: Iterable[TicketsRow] = (), urgent_head_start: float | None = None):
+        """Bulk build: collect each priority's Submitted tickets, then heapify once (O(n))."""
+        self.urgent_head_start = (
+            settings.DISPATCH_URGENT_HEAD_START_SECONDS if urgent_head_start is None else urgent_head_start
+        )
+        self.tickets: dict[str, Ticket] = {}
+        self.heaps: dict[TicketPriority, list[Entry]] = {priority: [] for priority in TicketPriority}
+        self.stale: dict[TicketPriority, int] = {priority: 0 for priority in TicketPriority}
+        self.assigned = 0
+        for row in rows:
+            ticket = _ticket(row)
+            if ticket.status == TicketStatus.Completed:
+                continue
+            self.tickets[ticket.id] = ticket
+            if ticket.status == TicketStatus.Submitted:
+                self.heaps[ticket.priority].append(self._entry(ticket))
+        for heap in self.heaps.values():
+            heapq.heapify(heap)
+
+    def _entry(self, ticket: Ticket) -> Entry:
+        head_start = self.urgent_head_start if ticket.priority == TicketPriority.Urgent else 0.0
+        return (ticket.created - head_start, ticket.id, ticket.version)
+
+    def _live(self, entry: Entry) -> bool:
+        ticket = self.tickets.get(entry[1])
+        return ticket is not None and ticket.version == entry[2] and ticket.status == TicketStatus.Submitted
+
+    def _retire(self, ticket: Ticket):
+        if ticket.status != TicketStatus.Submitted:
+            return
+        self.stale[ticket.priority] += 1
+        heap = self.heaps[ticket.priority]
+        if self.stale[ticket.priority] > 32 and self.stale[ticket.priority] * 2 > len(heap):
+            heap[:] = [entry for entry in heap if entry[1] != ticket.id and self._live(entry)]
+            heapq.heapify(heap)
+            self.stale[ticket.priority] = 0
+
+    def _store(self, ticket: Ticket, old: Ticket | None, queued: bool = True):
+        # queued=False: `old` was already popped off its heap, so it leaves no stale entry behind.
+        if old is not None and queued:
+            self._retire(old)
+        if ticket.status == TicketStatus.Completed:
+            self.tickets.pop(ticket.id, None)
+            return
+        self.tickets[ticket.id] = ticket
+        if ticket.status == TicketStatus.Submitted:
+            heapq.heappush(self.heaps[ticket.priority], self._entry(ticket))
+
+    def upsert(self, row: TicketsRow):
+        """Insert or replace a ticket with its row from the table, which is not checked against TRANSITIONS."""
+        old = self.tickets.get(row.id)
+        self._store(_ticket(row, old.version + 1 if old is not None else 0), old)
+
+    def transition(self, ticket_id: str, status: TicketStatus, volunteer_id: str | None = None) -> Ticket:
+        """Move a known ticket to `status`; Scheduled needs a volunteer, Submitted drops it."""
+        old = self.tickets.get(ticket_id)
+        if old is None:
+            raise KeyError(ticket_id)
+        ticket = self._moved(old, TicketStatus(status), volunteer_id)
+        self._store(ticket, old)
+        return ticket
+
+    def _moved(self, old: Ticket, status: TicketStatus, volunteer_id: str | None) -> Ticket:
+        if status not in TRANSITIONS[old.status]:
+            raise InvalidTransition(old.id, old.status, status)
+        if status == TicketStatus.Scheduled and volunteer_id is None:
+            raise ValueError(f"Scheduling ticket {old.id} needs a volunteer")
+        if status == TicketStatus.Submitted:
+            volunteer = None
+        else:
+            volunteer = volunteer_id or old.volunteer_id
+        return replace(old, status=status, volunteer_id=volunteer, version=old.version + 1)
+
+    def remove(self, ticket_id: str):
+        ticket = self.tickets.pop(ticket_id, None)
+        if ticket is not None:
+            self._retire(ticket)
+
+    def peek(self, limit: int) -> list[Ticket]:
+        """The next `limit` Submitted tickets in dispatch order, without dequeuing them."""
+        results = []
+        for entry in heapq.merge(*(_in_order(heap) for heap in self.heaps.values())):
+            if len(results) >= limit:
+                break
+            if self._live(entry):
+                results.append(self.tickets[entry[1]])
+        return results
+
+    def _pop(self) -> Ticket | None:
+        # Dequeue the next Submitted ticket; the caller moves it out of Submitted.
+        while True:
+            heads = [(heap[0], priority) for priority, heap in self.heaps.items() if heap]
+            if not heads:
+                return None
+            entry, priority = min(heads)
+            heapq.heappop(self.heaps[priority])
+            if self._live(entry):
+                return self.tickets[entry[1]]
+            self.stale[priority] = max(0, self.stale[priority] - 1)
+
+    def assign(
+        self,
+        volunteer_ids: list[str],
+        locations: Mapping[str, tuple[float, float]] | None = None,
+        volunteer_locations: Mapping[str, tuple[float, float]] | None = None,
+    ) -> list[Ticket]:
+        """Schedule the next tickets onto a batch of volunteers, one ticket each; see the module docstring.
+
+        `locations` maps pickup location ids, and `volunteer_locations` volunteer ids, to (lat, lon).
+        """
+        start = time.perf_counter()
+        locations = locations or {}
+        volunteer_locations = volunteer_locations or {}
+        free = list(dict.fromkeys(volunteer_ids))
+        placed = [vid for vid in free if vid in volunteer_locations]
+        position = {vid: i for i, vid in enumerate(placed)}
+        lats = np.array([volunteer_locations[vid][0] for vid in placed])
+        lons = np.array([volunteer_locations[vid][1] for vid in placed])
+        busy = np.zeros(len(placed), dtype=bool)
+        taken: set[str] = set()
+        cursor = 0
+        scheduled = []
+        while len(scheduled) < len(free) and (ticket := self._pop()) is not None:
+            pickup = locations.get(ticket.pickup_location_id)
+            if pickup is not None and not busy.all():
+                distances = np.where(busy, np.inf, haversine_km(pickup[0], pickup[1], lats, lons))
+                volunteer_id = placed[int(np.argmin(distances))]
+            else:
+                while free[cursor] in taken:
+                    cursor += 1
+                volunteer_id = free[cursor]
+            taken.add(volunteer_id)
+            if volunteer_id in position:
+                busy[position[volunteer_id]] = True
+            moved = self._moved(ticket, TicketStatus.Scheduled, volunteer_id)
+            self._store(moved, ticket, queued=False)
+            scheduled.append(moved)
+        self.assigned += len(scheduled)
+        assign_latency.observe(time.perf_counter() - start)
+        return scheduled
+
+    def stats(self, now: float | None = None) -> dict:
+        now = time.time() if now is None else now
+        by_status = {status.value: 0 for status in TicketStatus if status != TicketStatus.Completed}
+        for ticket in self.tickets.values():
+            by_status[ticket.status.value] += 1
+        queued = {priority.value: 0 for priority in TicketPriority}
+        oldest = None
+        for ticket in self.tickets.values():
+            if ticket.status == TicketStatus.Submitted:
+                queued[ticket.priority.value] += 1
+                oldest = ticket.created if oldest is None else min(oldest, ticket.created)
+        return {
+            "tickets": by_status,
+            "queued": queued,
+            "oldest_wait_seconds": round(now - oldest, 1) if oldest is not None else None,
+            "heap_entries": sum(len(heap) for heap in self.heaps.values()),
+            "assigned": self.assigned,
+        }
+
+class DispatchEngine:
+    """The DispatchQueue loaded from the database and kept current; see the module docstring."""
+
+    def __init__(self):
+        self.queue: DispatchQueue | None = None
+        self.loads = 0
+        self.events = 0
+        self.rejected = 0
+        self.resyncs = 0
+        self._lock = asyncio.Lock()
+
+    async def get_queue(self) -> DispatchQueue:
+        if self.queue is not None:
+            return self.queue
+        async with self._lock:
+            if self.queue is None:
+                with telemetry.span("dispatch.build"):
+                    rows = [row async for row in queries.iter_rows("tickets", filters=[("status", "neq", "Completed")])]
+                    self.queue = DispatchQueue(rows)
+                self.loads += 1
+        return self.queue
+
+    async def apply_events(self, events: Iterable[tuple[str, dict | None, dict | None]]) -> list[dict]:
+        """Apply a batch of (INSERT/UPDATE/DELETE, record, old_record) ticket changes.
+
+        Every event is attempted. The ones that carry no valid ticket come back
+        as {"id", "error"}, and the rest of the batch still applies. A rejected
+        ticket is then resynced from the table.
+        """
+        queue = await self.get_queue()
+        start = time.perf_counter()
+        rejected = []
+        for change, record, old_record in events:
+            row = record if change != "DELETE" else old_record
+            try:
+                if row is None or "id" not in row:
+                    raise ValueError(f"{change} on tickets carries no row id")
+                if change == "DELETE":
+                    queue.remove(row["id"])
+                else:
+                    queue.upsert(TicketsRow.model_validate(row))
+            except (ValueError, ValidationError) as e:
+                rejected.append({"id": (row or {}).get("id"), "error": str(e).splitlines()[0]})
+            self.events += 1
+        self.rejected += len(rejected)
+        event_batch_latency.observe(time.perf_counter() - start)
+        await self.resync([r["id"] for r in rejected if isinstance(r["id"], str)])
+        return rejected
+
+    async def resync(self, ticket_ids: list[str]):
+        """Replace the mirrored tickets with their rows as they are in the table now."""
+        if not ticket_ids:
+            return
+        queue = await self.get_queue()
+        try:
+            rows = {row.id: row async for row in queries.iter_rows("tickets", filters=[("id", "in_", ticket_ids)])}
+        except Exception:
+            # We cannot tell what the table holds; start over from it.
+            self.rebuild()
+            return
+        for ticket_id in ticket_ids:
+            if ticket_id in rows:
+                queue.upsert(rows[ticket_id])
+            else:
+                queue.remove(ticket_id)
+        self.resyncs += len(ticket_ids)
+
+    def rebuild(self):
+        """Drop the queue; the next use bulk-loads the open tickets again."""
+        self.queue = None
+
+    def stats(self) -> dict:
+        queue_stats = self.queue.stats() if self.queue is not None else {}
+        return {
+            **queue_stats, "loads": self.loads, "events": self.events, "rejected": self.rejected, "resyncs": self.resyncs,
+        }
+
+engine = DispatchEngine()
+
+def _summary(ticket: Ticket, now: float) -> dict:
+    return {
+        "id": ticket.id,
+        "priority": ticket.priority.value,
+        "status": ticket.status.value,
+        "created_at": datetime.fromtimestamp(ticket.created, timezone.utc).isoformat(),
+        "waiting_minutes": round((now - ticket.created) / 60, 1),
+        "pickup_location_id": ticket.pickup_location_id,
+        "dropoff_location_id": ticket.dropoff_location_id,
+        "volunteer_id": ticket.volunteer_id,
+    }
+
+async def next_tickets(limit: int) -> list[dict]:
+    queue = await engine.get_queue()
+    now = time.time()
+    return [_summary(ticket, now) for ticket in queue.peek(limit)]
+
+async def assign_volunteers(volunteer_ids: list[str]) -> dict:
+    """Schedule the next tickets onto `volunteer_ids` and write the assignments to the tickets table.
+
+    Each write only succeeds while the ticket is still Submitted. A ticket that
+    changed underneath us, or whose write failed, is reported as a conflict
+    and resynced from the table.
+    """
+    queue = await engine.get_queue()
+    await spatial.engine.ensure_loaded()
+    volunteer_locations = {
+        vid: spatial.engine.locations[location_id]
+        for vid in volunteer_ids
+        if (location_id := spatial.engine.placed.get(("volunteers", vid))) in spatial.engine.locations
+    }
+    scheduled = queue.assign(volunteer_ids, spatial.engine.locations, volunteer_locations)
+    written = await asyncio.gather(*(
+        queries.update_ticket(
+            ticket.id, {"status": TicketStatus.Scheduled.value, "volunteer_id": ticket.volunteer_id},
+            expected_status=TicketStatus.Submitted.value,
+        )
+        for ticket in scheduled
+    ), return_exceptions=True)
+    now = time.time()
+    assignments, conflicts = [], []
+    for ticket, rows in zip(scheduled, written):
+        if rows and not isinstance(rows, BaseException):
+            assignments.append(_summary(ticket, now))
+            continue
+        conflicts.append(ticket.id)
+    await engine.resync(conflicts)
+    return {"assignments": assignments, "conflicts": conflicts}
+
+async def update_status(ticket_id: str, status: TicketStatus, volunteer_id: str | None = None) -> dict:
+    """Move a ticket along TRANSITIONS and write it to the tickets table.
+
+    The write only succeeds while the row still has the status the move was
+    checked against; otherwise the ticket is resynced and TicketConflict raised.
+    Raises KeyError for a ticket that is not open, InvalidTransition for a move
+    the lifecycle does not allow.
+    """
+    queue = await engine.get_queue()
+    if ticket_id not in queue.tickets:
+        raise KeyError(ticket_id)
+    expected = queue.tickets[ticket_id].status
+    ticket = queue.transition(ticket_id, status, volunteer_id)
+    try:
+        rows = await queries.update_ticket(
+            ticket_id, {"status": ticket.status.value, "volunteer_id": ticket.volunteer_id},
+            expected_status=expected.value,
+        )
+    except Exception:
+        await engine.resync([ticket_id])
+        raise
+    if not rows:
+        await engine.resync([ticket_id])
+        raise TicketConflict(ticket_id)
+    return _summary(ticket, time.time())
+
+def get_dispatch_stats() -> dict:
+    return engine.stats()
@@ -1,54 +1,346 @@
 # File: app/services/donation_parser.py
 
-from datetime import datetime
-from langchain_openai import ChatOpenAI
+import asyncio
+import copy
+import re
+from datetime import datetime, timedelta
 from langchain.prompts import PromptTemplate
+from langchain_core.runnables import RunnableLambda
+from app import clients, telemetry
 from app.config import settings
 from app.models.schemas import DonationDetails
+from app.services import breaker, hedging, model_router, prompts, scheduler
+from app.services.cache import LRUCache, ResultCache, SQLiteCache
+from app.services.history import count_tokens
+from app.services.singleflight import SingleFlight
 
-# Initialize the LLM using your API key.
-llm = ChatOpenAI(model="gpt-4o", temperature=0, openai_api_key=settings.OPENAI_API_KEY)
-
-# Wrap the LLM for structured output to match DonationDetails.
-structured_llm = llm.with_structured_output(DonationDetails)
-
-# Define a prompt template that instructs the model to extract donation details.
+# Define a prompt that instructs the model to extract donation details.
 # For handling, the prompt now instructs the model to decide true or false for each attribute
 # based solely on the text (without needing explicit user declarations).
-prompt_template = (
-    "Assume today is {current_date}. You are an assistant tasked with extracting structured donation details "
-    "from a natural language query. The output must be a valid JSON object with the following keys:\n"
-    "- \"food_type\": one of \"Baked Goods\", \"Fresh Produce\", \"Other\", \"Pantry Items\", or \"Prepared Foods\".\n"
-    "- \"quantity\": an object with:\n"
-    "     - \"amount\": a number extracted from the text.\n"
-    "     - \"unit\": one of \"Pounds\", \"Kilograms\", \"Items\", or \"Servings\". If the text mentions an unrecognized unit such as \"loaves\", map it to \"Items\".\n"
-    "- \"pickup_window\": an object with:\n"
-    "     - \"startTime\": an ISO 8601 datetime string.\n"
-    "     - \"endTime\": an ISO 8601 datetime string.\n"
-    "   Interpret phrases like \"tomorrow morning\" as meaning the pickup starts at 08:00 and ends at 12:00 on the day after {current_date}.\n"
-    "- \"handling\": an object with the following boolean attributes: \"refrigeration\", \"freezing\", \"fragile\", and \"heavyLifting\". "
-    "For each attribute, based solely on the input text, decide whether it should be true or false. "
-    "For example, set \"refrigeration\" to true if the text implies the item needs to be kept cold (e.g. mentions \"refrigerated\", \"chilled\", or \"keep cold\"); "
-    "set \"freezing\" to true if the text implies it should be frozen (e.g. mentions \"frozen\" or \"freezer\"); "
-    "set \"fragile\" to true if the text indicates the item is delicate (e.g. mentions \"fragile\", \"delicate\", or \"easily broken\"); "
-    "set \"heavyLifting\" to true if the text suggests the item is heavy or cumbersome (e.g. mentions \"heavy\", \"bulk\", or \"difficult to move\"). "
-    "Otherwise, set the value to false.\n"
-    "- \"notes\": include any additional descriptive details from the text. For instance, if the text mentions a specific variety (like \"bread\"), "
-    "include that in \"notes\" and adjust \"food_type\" if appropriate (e.g. if \"bread\" is mentioned, use \"Baked Goods\").\n\n"
-    "Extract the details from the following text:\n{text}\n\n"
-    "Output must be valid JSON."
+# The instructions are identical on every request and come first, so the provider can
+# serve them from its prompt cache; the date and the donor's text follow them.
+prompt_layout = prompts.PromptLayout(
+    static=(
+        "You are an assistant tasked with extracting structured donation details "
+        "from a natural language query. The output must be a valid JSON object with the following keys:\n"
+        "- \"food_type\": one of \"Baked Goods\", \"Fresh Produce\", \"Other\", \"Pantry Items\", or \"Prepared Foods\".\n"
+        "- \"quantity\": an object with:\n"
+        "     - \"amount\": a number extracted from the text.\n"
+        "     - \"unit\": one of \"Pounds\", \"Kilograms\", \"Items\", or \"Servings\". If the text mentions an unrecognized unit such as \"loaves\", map it to \"Items\".\n"
+        "- \"pickup_window\": an object with:\n"
+        "     - \"startTime\": an ISO 8601 datetime string.\n"
+        "     - \"endTime\": an ISO 8601 datetime string.\n"
+        "   Interpret phrases like \"tomorrow morning\" as meaning the pickup starts at 08:00 and ends at 12:00 on the day after today's date (given below).\n"
+        "- \"handling\": an object with the following boolean attributes: \"refrigeration\", \"freezing\", \"fragile\", and \"heavyLifting\". "
+        "For each attribute, based solely on the input text, decide whether it should be true or false. "
+        "For example, set \"refrigeration\" to true if the text implies the item needs to be kept cold (e.g. mentions \"refrigerated\", \"chilled\", or \"keep cold\"); "
+        "set \"freezing\" to true if the text implies it should be frozen (e.g. mentions \"frozen\" or \"freezer\"); "
+        "set \"fragile\" to true if the text indicates the item is delicate (e.g. mentions \"fragile\", \"delicate\", or \"easily broken\"); "
+        "set \"heavyLifting\" to true if the text suggests the item is heavy or cumbersome (e.g. mentions \"heavy\", \"bulk\", or \"difficult to move\"). "
+        "Otherwise, set the value to false.\n"
+        "- \"notes\": include any additional descriptive details from the text. For instance, if the text mentions a specific variety (like \"bread\"), "
+        "include that in \"notes\" and adjust \"food_type\" if appropriate (e.g. if \"bread\" is mentioned, use \"Baked Goods\").\n"
+        "Output must be valid JSON.\n\n"
+    ),
+    dynamic="Today is {current_date}.\nExtract the details from the following text:\n{text}",
 )
+prompt_template = prompt_layout.template
 
 # Create a prompt template that accepts both 'text' and 'current_date'.
-prompt = PromptTemplate(template=prompt_template, input_variables=["text", "current_date"])
+prompt = PromptTemplate(template=prompt_template, input_variables=prompt_layout.input_variables)
+
+# The structured-output tool schema is sent ahead of the prompt, so it is part of the static prefix.
+schema_tokens = prompts.tool_schema_tokens([DonationDetails])
+
+# Chains per model tier and the result cache are built on first use (see app.clients).
+donation_chains: dict = {}
+
+# Parsed results keyed on (current_date, normalized text); the prompt depends on nothing else.
+donation_cache = None
+
+# Concurrent parses of the same key (double submits, client retries) share one model call.
+donation_flights = SingleFlight("donation")
+
+def get_donation_chain(tier: str = model_router.LARGE):
+    if tier not in donation_chains:
+        # Wrap the tier's shared LLM for structured output to match DonationDetails,
+        # then build the chain using the chaining operator.
+        # Upstream 429s are retried by the scheduler rather than the OpenAI client.
+        max_retries = 0 if settings.LLM_RATE_LIMIT_ENABLED else None
+        model = clients.get_chat_model(model_router.model_name(tier), max_retries=max_retries)
+        donation_chains[tier] = prompt | model.with_structured_output(DonationDetails)
+    return donation_chains[tier]
+
+def get_donation_cache() -> ResultCache:
+    global donation_cache
+    if donation_cache is None:
+        donation_cache = ResultCache(
+            LRUCache(settings.DONATION_CACHE_MAX_ENTRIES, settings.DONATION_CACHE_TTL_SECONDS),
+            SQLiteCache(settings.DONATION_CACHE_SQLITE_PATH, settings.DONATION_CACHE_TTL_SECONDS, table="donation_cache")
+            if settings.DONATION_CACHE_SQLITE_PATH else None,
+        )
+    return donation_cache
+
+def normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+def cache_key(text: str, current_date: str) -> str:
+    return f"{current_date}|{normalize_text(text)}"
+
+# -------------------------
+# Rule-based fast path
+# -------------------------
+# Formulaic inputs ("50 pounds of apples tomorrow morning") are extracted locally using the
+# same rules the prompt spells out. Anything ambiguous returns None and goes to the LLM.
+
+UNIT_WORDS = {
+    "Pounds": ["pounds", "pound", "lbs", "lb"],
+    "Kilograms": ["kilograms", "kilogram", "kilos", "kilo", "kgs", "kg"],
+    "Servings": ["servings", "serving", "portions", "portion", "meals", "meal"],
+    # Unrecognized container/count units map to Items, as the prompt instructs for "loaves".
+    "Items": [
+        "items", "item", "loaves", "loaf", "boxes", "box", "cases", "case", "cans", "can", "bags", "bag",
+        "trays", "tray", "crates", "crate", "dozen", "jars", "jar", "bottles", "bottle", "cartons", "carton",
+    ],
+}
+
+FOOD_TYPE_WORDS = {
+    "Baked Goods": [
+        "bread", "loaves", "loaf", "bagels", "muffins", "pastries", "croissants", "rolls", "buns",
+        "cakes", "cookies", "donuts", "doughnuts", "pies", "baguettes",
+    ],
+    "Fresh Produce": [
+        "produce", "apples", "bananas", "oranges", "pears", "grapes", "berries", "strawberries", "fruit",
+        "vegetables", "veggies", "lettuce", "tomatoes", "potatoes", "carrots", "onions", "cabbage", "greens",
+    ],
+    "Pantry Items": [
+        "canned", "cans", "rice", "pasta", "beans", "cereal", "flour", "sugar", "oats", "peanut butter",
+        "soup cans", "non-perishable", "nonperishable",
+    ],
+    "Prepared Foods": [
+        "prepared", "sandwiches", "casserole", "lasagna", "soup", "stew", "pizza", "burritos", "entrees",
+        "hot meals", "cooked",
+    ],
+}
+
+HANDLING_WORDS = {
+    "refrigeration": ["refrigerated", "refrigerate", "chilled", "keep cold"],
+    "freezing": ["frozen", "freezer"],
+    "fragile": ["fragile", "delicate", "easily broken"],
+    "heavyLifting": ["heavy", "bulk", "difficult to move"],
+}
+
+# Day offsets and part-of-day windows (hours) for relative pickup phrases.
+PICKUP_DAYS = {"today": 0, "tonight": 0, "tomorrow": 1}
+PICKUP_PARTS = {"morning": (8, 12), "afternoon": (12, 17), "evening": (17, 21), "tonight": (17, 21)}
+PICKUP_WHOLE_DAY = (8, 21)
+
+def _alternation(words):
+    return "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+_UNIT_BY_WORD = {word: unit for unit, words in UNIT_WORDS.items() for word in words}
+_QUANTITY_RE = re.compile(rf"\b(\d+(?:\.\d+)?)\s*({_alternation(_UNIT_BY_WORD)})\b(?:\s+of\s+([a-z][a-z -]*?))?(?=[,.;]|\s+(?:for|pick|to|ready|available|{_alternation(PICKUP_DAYS)})\b|$)")
+_FOOD_RES = {food_type: re.compile(rf"\b(?:{_alternation(words)})\b") for food_type, words in FOOD_TYPE_WORDS.items()}
+_HANDLING_RES = {key: re.compile(rf"\b(?:{_alternation(words)})\b") for key, words in HANDLING_WORDS.items()}
+_DAY_RE = re.compile(rf"\b({_alternation(PICKUP_DAYS)})(?:\s+({_alternation(PICKUP_PARTS)}))?\b")
+# Explicit clock times, dates, negations or several numbers need the model's judgement.
+_AMBIGUOUS_RE = re.compile(r"\d+\s*(?:am|pm)\b|\d{1,2}:\d{2}|\b(?:not|no|don't|without|or|between|until|monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b")
+
+fast_path_stats = {"hits": 0, "misses": 0}
+
+def extract_donation_fast(text: str, current_date: str) -> DonationDetails | None:
+    """Return DonationDetails for formulaic inputs, or None when not confident."""
+    normalized = normalize_text(text)
+    if _AMBIGUOUS_RE.search(normalized) or len(re.findall(r"\d+(?:\.\d+)?", normalized)) != 1:
+        return None
+    quantity = _QUANTITY_RE.search(normalized)
+    food_types = [food_type for food_type, pattern in _FOOD_RES.items() if pattern.search(normalized)]
+    days = _DAY_RE.findall(normalized)
+    if quantity is None or len(food_types) != 1 or len(days) != 1:
+        return None
+    day, part = days[0]
+    if not part:
+        if day != "tonight":
+            return None
+        part = "tonight"
+    return _details(normalized, quantity, food_types[0], day, PICKUP_PARTS[part], current_date)
 
-# Build the chain using the chaining operator.
-donation_chain = prompt | structured_llm
+def extract_donation_degraded(text: str, current_date: str) -> DonationDetails | None:
+    """Best-effort extraction for when the model is unavailable.
 
-async def parse_donation(text: str) -> dict:
+    Needs an amount with a unit and a pickup day; an unclear food type becomes
+    "Other" and a day without a part of day gets the whole day's window.
+    """
+    normalized = normalize_text(text)
+    quantity = _QUANTITY_RE.search(normalized)
+    days = _DAY_RE.findall(normalized)
+    if quantity is None or not days:
+        return None
+    food_types = [food_type for food_type, pattern in _FOOD_RES.items() if pattern.search(normalized)]
+    day, part = days[0]
+    hours = PICKUP_PARTS[part or day] if part or day == "tonight" else PICKUP_WHOLE_DAY
+    return _details(normalized, quantity, food_types[0] if len(food_types) == 1 else "Other", day, hours, current_date)
+
+def _details(normalized: str, quantity: re.Match, food_type: str, day: str, hours: tuple, current_date: str) -> DonationDetails:
+    start_hour, end_hour = hours
+    pickup_date = datetime.strptime(current_date, "%Y-%m-%d") + timedelta(days=PICKUP_DAYS[day])
+    amount, unit_word, item = quantity.groups()
+    return DonationDetails(
+        food_type=food_type,
+        quantity={"amount": float(amount), "unit": _UNIT_BY_WORD[unit_word]},
+        pickup_window={
+            "startTime": pickup_date.replace(hour=start_hour).isoformat(),
+            "endTime": pickup_date.replace(hour=end_hour).isoformat(),
+        },
+        handling={key: bool(pattern.search(normalized)) for key, pattern in _HANDLING_RES.items()},
+        notes=(item or unit_word).strip(),
+    )
+
+def donation_confidence(text: str) -> float:
+    """How routine a donation text looks (0-1), from the same signals as the fast path."""
+    normalized = normalize_text(text)
+    confidence = 1.0
+    if _AMBIGUOUS_RE.search(normalized):
+        confidence -= 0.5
+    if len(re.findall(r"\d+(?:\.\d+)?", normalized)) != 1:
+        confidence -= 0.3
+    if sum(1 for pattern in _FOOD_RES.values() if pattern.search(normalized)) != 1:
+        confidence -= 0.2
+    return max(confidence, 0.0)
+
+def get_fast_path_stats() -> dict:
+    total = fast_path_stats["hits"] + fast_path_stats["misses"]
+    return {**fast_path_stats, "hit_rate": fast_path_stats["hits"] / total if total else 0.0}
+
+def _lookup(text: str, current_date: str, use_cache: bool) -> dict | None:
+    # Serve from the rule-based fast path or the result cache when possible.
+    if settings.DONATION_FAST_PATH_ENABLED:
+        if (details := extract_donation_fast(text, current_date)) is not None:
+            fast_path_stats["hits"] += 1
+            return details.model_dump()
+        fast_path_stats["misses"] += 1
+    if use_cache and (cached := get_donation_cache().get(cache_key(text, current_date))) is not None:
+        return copy.deepcopy(cached)
+    return None
+
+def _store(text: str, current_date: str, use_cache: bool, donation_details: DonationDetails) -> dict:
+    parsed = donation_details.model_dump()
+    if use_cache:
+        get_donation_cache().set(cache_key(text, current_date), copy.deepcopy(parsed))
+    return parsed
+
+def _degraded(text: str, current_date: str) -> dict | None:
+    # The model's circuit is open (the fast path and cache have already missed):
+    # return a best-effort parse, flagged and not cached, instead of an error.
+    details = extract_donation_degraded(text, current_date)
+    if details is None:
+        return None
+    breaker.record_degraded("donation")
+    return {**details.model_dump(), "degraded": True}
+
+async def _call_tier(tier: str, inputs: dict) -> DonationDetails:
+    with model_router.track("donation", tier) as usage:
+        result = await get_donation_chain(tier).ainvoke(inputs, config={"callbacks": telemetry.callbacks() + [usage]})
+        if result is None:
+            raise ValueError("Model returned no DonationDetails")
+    return result
+
+async def _invoke_tier(tier: str, inputs: dict, priority: int = scheduler.STANDARD) -> DonationDetails:
+    tokens = count_tokens(prompt.format(**inputs))
+    prompts.record("donation", schema_tokens + prompt_layout.static_tokens, schema_tokens + tokens)
+    return await hedging.hedged(
+        f"donation:{tier}", lambda: scheduler.run(priority, tokens, lambda: _call_tier(tier, inputs))
+    )
+
+async def _invoke_routed(inputs: dict, priority: int = scheduler.STANDARD) -> DonationDetails:
+    tier = model_router.select_tier("donation", inputs["text"], donation_confidence(inputs["text"]))
+    try:
+        return await _invoke_tier(tier, inputs, priority)
+    except ValueError:
+        # Output that fails DonationDetails validation (pydantic's ValidationError and
+        # OutputParserException are ValueErrors) gets one more try on the large model.
+        if tier == model_router.LARGE:
+            raise
+        model_router.record_escalation("donation", tier)
+        return await _invoke_tier(model_router.LARGE, inputs, priority)
+
+async def _invoke_coalesced(inputs: dict, priority: int = scheduler.STANDARD) -> DonationDetails:
+    if not settings.LLM_COALESCING_ENABLED:
+        return await _invoke_routed(inputs, priority)
+    key = cache_key(inputs["text"], inputs["current_date"])
+    return await donation_flights.do(key, lambda: _invoke_routed(inputs, priority))
+
+async def parse_donation(text: str, use_cache: bool = True) -> dict:
     # Compute the current date as a string (YYYY-MM-DD).
     current_date = datetime.now().strftime("%Y-%m-%d")
+    use_cache = use_cache and settings.DONATION_CACHE_ENABLED
+    if (parsed := _lookup(text, current_date, use_cache)) is not None:
+        return parsed
     # Invoke the chain asynchronously. Note: pass a mapping with keys matching input_variables.
-    donation_details = await donation_chain.ainvoke(input={"text": text, "current_date": current_date})
+    try:
+        donation_details = await hedging.with_deadline(
+            "donation", _invoke_coalesced({"text": text, "current_date": current_date})
+        )
+    except breaker.CircuitOpen:
+        if (degraded := _degraded(text, current_date)) is None:
+            raise
+        return degraded
     # Return the structured output as a dictionary.
-    return donation_details.dict()
+    return _store(text, current_date, use_cache, donation_details)
+
+async def _invoke_with_timeout(inputs: dict) -> DonationDetails:
+    try:
+        return await asyncio.wait_for(
+            _invoke_coalesced(inputs, scheduler.BATCH), settings.DONATION_BATCH_ITEM_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"Timed out after {settings.DONATION_BATCH_ITEM_TIMEOUT}s")
+
+async def parse_donations(texts: list[str], use_cache: bool = True) -> list[dict]:
+    """Parse many donation texts at once.
+
+    Identical entries (after normalization) are parsed once. Texts that the fast
+    path and cache cannot answer go through the routed chains in a single abatch call
+    limited to DONATION_BATCH_CONCURRENCY in flight. Each item gets either a
+    "result" or an "error", so one failure does not sink the batch.
+    """
+    current_date = datetime.now().strftime("%Y-%m-%d")
+    use_cache = use_cache and settings.DONATION_CACHE_ENABLED
+    results: dict[str, dict] = {}
+    pending: dict[str, str] = {}
+    for text in texts:
+        key = cache_key(text, current_date)
+        if key in results or key in pending:
+            continue
+        if (parsed := _lookup(text, current_date, use_cache)) is not None:
+            results[key] = {"result": parsed}
+        else:
+            pending[key] = text
+
+    outputs = await RunnableLambda(_invoke_with_timeout).abatch(
+        [{"text": text, "current_date": current_date} for text in pending.values()],
+        config={"max_concurrency": settings.DONATION_BATCH_CONCURRENCY},
+        return_exceptions=True,
+    )
+    for (key, text), output in zip(pending.items(), outputs):
+        if isinstance(output, breaker.CircuitOpen) and (degraded := _degraded(text, current_date)) is not None:
+            results[key] = {"result": degraded}
+        elif isinstance(output, Exception):
+            results[key] = {"error": str(output) or type(output).__name__}
+        else:
+            results[key] = {"result": _store(text, current_date, use_cache, output)}
+    return [{"text": text, **results[cache_key(text, current_date)]} for text in texts]
+
+def get_cache_stats() -> dict:
+    return get_donation_cache().stats()
+
+@telemetry.register_collector
+def _donation_metrics() -> dict:
+    cache = get_cache_stats()
+    fast_path = get_fast_path_stats()
+    return {
+        "helphut_donation_cache_hits": cache["hits"],
+        "helphut_donation_cache_misses": cache["misses"],
+        "helphut_donation_fast_path_hits": fast_path["hits"],
+        "helphut_donation_fast_path_misses": fast_path["misses"],
+    }
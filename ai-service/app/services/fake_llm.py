@@ -0,0 +1,221 @@
+# File: app/services/fake_llm.py
+
+import asyncio
+import json
+import random
+import time
+import uuid
+from typing import Any, AsyncIterator, Iterator, Optional
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import Field
+
+# Phrases that make the fake agent model call a tool instead of answering directly.
+DEFAULT_TOOL_KEYWORDS = {
+    "navigation_tool": ["take me", "navigate", "go to", "open the"],
+    "crud_tool": ["user", "partner"],
+    "synthesis_tool": ["summarize", "synthesize"],
+    "matching_tool": ["available volunteers", "who can pick up"],
+    "inventory_tool": ["expiring", "spoil"],
+}
+
+# Arguments the fake uses for those tool calls; other tools get schema placeholders.
+DEFAULT_TOOL_ARGUMENTS = {
+    "navigation_tool": {"page": "dashboard"},
+    "crud_tool": {"operation": "get_partners", "data": {}},
+}
+
+def fake_arguments(schema: dict) -> Any:
+    """Deterministic placeholder value that satisfies a (dereferenced) JSON schema."""
+    if "anyOf" in schema:
+        return fake_arguments(next((s for s in schema["anyOf"] if s.get("type") != "null"), {"type": "null"}))
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type")
+    if kind == "object":
+        return {name: fake_arguments(prop) for name, prop in schema.get("properties", {}).items()}
+    if kind == "array":
+        return []
+    return {"string": "fake", "number": 1.0, "integer": 1, "boolean": False}.get(kind)
+
+class FakeUpstreamError(Exception):
+    """Injected provider failure, shaped like openai.APIStatusError."""
+
+    status_code = 503
+
+class FakeChatModel(BaseChatModel):
+    """Offline stand-in for ChatOpenAI, selected with LLM_BACKEND=fake.
+
+    Replies deterministically ("Echo: <last human message>"), after `latency`
+    seconds plus up to `jitter` seconds of seeded random delay; a
+    `tail_probability` fraction of calls instead take `tail_latency` seconds,
+    to model a long-tailed upstream, and a `failure_rate` fraction then fail
+    with FakeUpstreamError (a 503). When streaming,
+    that delay is spread across the tokens. Bound tools are honoured: a forced
+    tool_choice (as used by with_structured_output) always yields a tool call
+    with schema-conforming arguments, and otherwise a tool is called when the
+    message matches one of `tool_keywords`. After a tool result the model
+    answers with a summary of it, so ReAct loops terminate.
+
+    Usage metadata mimics OpenAI's prefix cache: once a prompt (tool schemas,
+    then messages) reaches `prefix_cache_min_tokens`, the longest prefix seen
+    before, in whole `prefix_cache_block_tokens` blocks, is reported as
+    cache_read.
+    """
+
+    model_name: str = "fake"
+    latency: float = 0.0
+    jitter: float = 0.0
+    tail_probability: float = 0.0
+    tail_latency: float = 0.0
+    failure_rate: float = 0.0
+    seed: int = 0
+    tool_keywords: dict[str, list[str]] = DEFAULT_TOOL_KEYWORDS
+    tool_arguments: dict[str, dict] = DEFAULT_TOOL_ARGUMENTS
+    prefix_cache_min_tokens: int = 1024
+    prefix_cache_block_tokens: int = 128
+    prefixes: set[int] = Field(default_factory=set)
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def bind_tools(self, tools, *, tool_choice=None, **kwargs):
+        formatted = [convert_to_openai_tool(tool) for tool in tools]
+        return self.bind(tools=formatted, tool_choice=tool_choice, **kwargs)
+
+    def _plan(self) -> tuple[float, bool]:
+        """Delay for the next call, and whether it fails."""
+        rng = random.Random(self.seed + self.calls)
+        self.calls += 1
+        if rng.random() < self.tail_probability:
+            delay = self.tail_latency
+        else:
+            delay = self.latency + rng.random() * self.jitter
+        return delay, rng.random() < self.failure_rate
+
+    def _reply(self, messages: list[BaseMessage], tools=None, tool_choice=None) -> AIMessage:
+        last = messages[-1] if messages else None
+        tools = {t["function"]["name"]: t["function"] for t in tools or []}
+        if tools and not isinstance(last, ToolMessage):
+            name = None
+            if isinstance(tool_choice, dict):
+                name = tool_choice.get("function", {}).get("name")
+            elif isinstance(tool_choice, str) and tool_choice in tools:
+                name = tool_choice
+            elif tool_choice in ("any", "required", True):
+                name = next(iter(tools))
+            else:
+                text = str(last.content).lower() if last is not None else ""
+                name = next(
+                    (t for t, words in self.tool_keywords.items() if t in tools and any(w in text for w in words)),
+                    None,
+                )
+            if name:
+                args = self.tool_arguments.get(name) or fake_arguments(tools[name].get("parameters", {}))
+                return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": f"call_{uuid.uuid4().hex[:12]}"}])
+        if isinstance(last, ToolMessage):
+            return AIMessage(content=f"Done: {last.content}")
+        return AIMessage(content=f"Echo: {last.content if last is not None else ''}")
+
+    def _cached_tokens(self, messages, tools) -> int:
+        text = json.dumps(tools or []) + "".join(f"{m.type}:{m.content}" for m in messages)
+        cached = 0
+        for tokens in range(self.prefix_cache_min_tokens, len(text) // 4 + 1, self.prefix_cache_block_tokens):
+            prefix = hash(text[:tokens * 4])
+            if prefix in self.prefixes:
+                cached = tokens
+            self.prefixes.add(prefix)
+        return cached
+
+    def _usage(self, messages, reply: AIMessage, tools=None) -> dict:
+        prompt = sum(len(str(m.content)) // 4 + 4 for m in messages)
+        completion = len(str(reply.content)) // 4 + 1
+        cached = min(self._cached_tokens(messages, tools), prompt)
+        return {
+            "input_tokens": prompt,
+            "output_tokens": completion,
+            "total_tokens": prompt + completion,
+            "input_token_details": {"cache_read": cached},
+        }
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        delay, fail = self._plan()
+        time.sleep(delay)
+        if fail:
+            raise FakeUpstreamError("Injected upstream failure")
+        reply = self._reply(messages, kwargs.get("tools"), kwargs.get("tool_choice"))
+        reply.usage_metadata = self._usage(messages, reply, kwargs.get("tools"))
+        return ChatResult(generations=[ChatGeneration(message=reply)])
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        delay, fail = self._plan()
+        await asyncio.sleep(delay)
+        if fail:
+            raise FakeUpstreamError("Injected upstream failure")
+        reply = self._reply(messages, kwargs.get("tools"), kwargs.get("tool_choice"))
+        reply.usage_metadata = self._usage(messages, reply, kwargs.get("tools"))
+        return ChatResult(generations=[ChatGeneration(message=reply)])
+
+    def _chunks(self, reply: AIMessage) -> list[AIMessageChunk]:
+        if reply.tool_calls:
+            return [AIMessageChunk(content="", tool_call_chunks=[
+                {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": 0}
+                for c in reply.tool_calls
+            ])]
+        words = str(reply.content).split(" ")
+        return [AIMessageChunk(content=w if i == 0 else f" {w}") for i, w in enumerate(words)]
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        reply = self._reply(messages, kwargs.get("tools"), kwargs.get("tool_choice"))
+        chunks = self._chunks(reply)
+        delay, fail = self._plan()
+        if fail:
+            raise FakeUpstreamError("Injected upstream failure")
+        delay /= len(chunks)
+        for chunk in chunks:
+            time.sleep(delay)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.content, chunk=ChatGenerationChunk(message=chunk))
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        reply = self._reply(messages, kwargs.get("tools"), kwargs.get("tool_choice"))
+        chunks = self._chunks(reply)
+        delay, fail = self._plan()
+        if fail:
+            raise FakeUpstreamError("Injected upstream failure")
+        delay /= len(chunks)
+        for chunk in chunks:
+            await asyncio.sleep(delay)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.content, chunk=ChatGenerationChunk(message=chunk))
+            yield ChatGenerationChunk(message=chunk)
@@ -0,0 +1,119 @@
+# app/services/hedging.py
+"""Deadlines and hedged requests for model calls.
+
+with_deadline() bounds a whole task (queueing, retries, escalation) by
+LLM_DEADLINES[task]. hedged() runs one attempt and, if it is still running
+after the HEDGE_PERCENTILE of that call's recent latencies, starts a second
+identical attempt; whichever succeeds first wins and the other is cancelled.
+Hedges are capped at HEDGE_MAX_RATE of requests so a slow upstream is not
+hit with double load.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+from app import telemetry
+from app.config import settings
+
+T = TypeVar("T")
+
+hedge_requests = telemetry.register_metric(
+    telemetry.Counter("helphut_hedge_requests_total", "Hedgeable calls by key and outcome (primary/hedge won, unhedged).")
+)
+deadline_exceeded = telemetry.register_metric(
+    telemetry.Counter("helphut_deadline_exceeded_total", "Requests that missed their deadline, by task.")
+)
+
+class DeadlineExceeded(TimeoutError):
+    def __init__(self, task: str, deadline: float):
+        super().__init__(f"{task} request exceeded its {deadline:g}s deadline")
+        self.task = task
+        self.deadline = deadline
+
+async def with_deadline(task: str, call: Awaitable[T]) -> T:
+    deadline = settings.LLM_DEADLINES.get(task)
+    if deadline is None:
+        return await call
+    try:
+        return await asyncio.wait_for(call, deadline)
+    except asyncio.TimeoutError:
+        deadline_exceeded.inc(task=task)
+        raise DeadlineExceeded(task, deadline) from None
+
+class LatencyTracker:
+    """Recent successful-call latencies for one key."""
+
+    def __init__(self, window: int = 500):
+        self.samples: deque[float] = deque(maxlen=window)
+
+    def record(self, latency: float):
+        self.samples.append(latency)
+
+    def percentile(self, pct: float) -> float | None:
+        if len(self.samples) < settings.HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+trackers: dict[str, LatencyTracker] = {}
+hedge_stats: dict[str, dict] = {}
+
+def _stats(key: str) -> dict:
+    return hedge_stats.setdefault(key, {"requests": 0, "hedged": 0, "hedge_wins": 0})
+
+async def _timed(call: Callable[[], Awaitable[T]]) -> tuple[T, float]:
+    start = time.perf_counter()
+    result = await call()
+    return result, time.perf_counter() - start
+
+async def hedged(key: str, call: Callable[[], Awaitable[T]]) -> T:
+    """Run call(), hedging it with a second attempt when it is slow (see module docstring)."""
+    tracker = trackers.setdefault(key, LatencyTracker())
+    stats = _stats(key)
+    stats["requests"] += 1
+    threshold = tracker.percentile(settings.HEDGE_PERCENTILE) if settings.HEDGING_ENABLED else None
+    primary = asyncio.ensure_future(_timed(call))
+    hedge = None
+    pending = {primary}
+    try:
+        if threshold is not None and stats["hedged"] < settings.HEDGE_MAX_RATE * stats["requests"]:
+            done, _ = await asyncio.wait(pending, timeout=threshold)
+            if not done:
+                hedge = asyncio.ensure_future(_timed(call))
+                pending.add(hedge)
+                stats["hedged"] += 1
+        while True:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            winner = next((task for task in done if task.exception() is None), None)
+            if winner is not None or not pending:
+                break
+            # The first attempt to finish failed; the other one may still succeed.
+        if winner is None:
+            return next(iter(done)).result()
+        result, latency = winner.result()
+        tracker.record(latency)
+        if hedge is None:
+            outcome = "unhedged"
+        elif winner is hedge:
+            outcome = "hedge_won"
+            stats["hedge_wins"] += 1
+        else:
+            outcome = "primary_won"
+        hedge_requests.inc(key=key, outcome=outcome)
+        return result
+    finally:
+        for task in (primary, hedge):
+            if task is not None and not task.done():
+                task.cancel()
+
+def get_hedge_stats() -> dict:
+    stats = {}
+    for key, totals in sorted(hedge_stats.items()):
+        tracker = trackers.get(key)
+        stats[key] = {
+            **totals,
+            "hedge_rate": totals["hedged"] / totals["requests"] if totals["requests"] else 0.0,
+            "win_rate": totals["hedge_wins"] / totals["hedged"] if totals["hedged"] else 0.0,
+            "threshold_ms": (tracker.percentile(settings.HEDGE_PERCENTILE) or 0.0) * 1000 if tracker else 0.0,
+        }
+    return stats
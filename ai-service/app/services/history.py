@@ -0,0 +1,111 @@
+# File: app/services/history.py
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from langchain_core.messages import BaseMessage, messages_from_dict, messages_to_dict
+from app.config import settings
+
+def count_tokens(text: str) -> int:
+    # Rough local estimate (~4 characters per token), good enough for
+    # budgeting without a tokenizer round trip.
+    return len(text) // 4
+
+def estimate_tokens(message: BaseMessage) -> int:
+    # Message content plus per-message overhead.
+    content = message.content if isinstance(message.content, str) else json.dumps(message.content)
+    return count_tokens(content) + 4
+
+def trim_to_budget(messages: list[BaseMessage], token_budget: int) -> list[BaseMessage]:
+    """Drop the oldest messages until the conversation fits in token_budget.
+
+    The most recent message is always kept, and trimming never leaves an AI
+    message at the head of the history.
+    """
+    total = sum(estimate_tokens(m) for m in messages)
+    start = 0
+    while total > token_budget and start < len(messages) - 1:
+        total -= estimate_tokens(messages[start])
+        start += 1
+    while start < len(messages) - 1 and messages[start].type != "human":
+        start += 1
+    return messages[start:]
+
+class MemoryHistoryStore:
+    """Session-keyed histories in an LRU with idle-TTL eviction."""
+
+    def __init__(self, max_sessions: int, ttl_seconds: float):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: OrderedDict[str, tuple[float, list[BaseMessage]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float):
+        while self._sessions:
+            session_id, (touched, _) = next(iter(self._sessions.items()))
+            if now - touched <= self.ttl_seconds and len(self._sessions) <= self.max_sessions:
+                break
+            del self._sessions[session_id]
+
+    def get(self, session_id: str) -> list[BaseMessage]:
+        with self._lock:
+            now = time.monotonic()
+            self._evict(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return []
+            self._sessions[session_id] = (now, entry[1])
+            self._sessions.move_to_end(session_id)
+            return list(entry[1])
+
+    def set(self, session_id: str, messages: list[BaseMessage]):
+        with self._lock:
+            self._sessions[session_id] = (time.monotonic(), list(messages))
+            self._sessions.move_to_end(session_id)
+            self._evict(time.monotonic())
+
+    def __len__(self):
+        return len(self._sessions)
+
+class SQLiteHistoryStore:
+    """Session-keyed histories persisted to a local SQLite file."""
+
+    def __init__(self, path: str, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chat_history "
+            "(session_id TEXT PRIMARY KEY, updated_at REAL NOT NULL, messages TEXT NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> list[BaseMessage]:
+        with self._lock:
+            cutoff = time.time() - self.ttl_seconds
+            self._conn.execute("DELETE FROM chat_history WHERE updated_at < ?", (cutoff,))
+            self._conn.commit()
+            row = self._conn.execute(
+                "SELECT messages FROM chat_history WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return messages_from_dict(json.loads(row[0])) if row else []
+
+    def set(self, session_id: str, messages: list[BaseMessage]):
+        payload = json.dumps(messages_to_dict(messages))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chat_history (session_id, updated_at, messages) VALUES (?, ?, ?)",
+                (session_id, time.time(), payload),
+            )
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chat_history").fetchone()[0]
+
+def create_history_store():
+    if settings.CHAT_HISTORY_BACKEND == "sqlite":
+        return SQLiteHistoryStore(settings.CHAT_HISTORY_SQLITE_PATH, settings.CHAT_HISTORY_TTL_SECONDS)
+    return MemoryHistoryStore(settings.CHAT_HISTORY_MAX_SESSIONS, settings.CHAT_HISTORY_TTL_SECONDS)
@@ -0,0 +1,123 @@
+# app/services/intent_router.py
+"""Local intent routing in front of the agent.
+
+Messages that unambiguously ask to open a known page or to list partners are
+dispatched straight to the matching tool, skipping the ReAct loop and its two
+LLM round trips. Patterns match the whole message, so anything with extra
+conditions, questions or unknown pages falls through to the agent.
+
+match_loose() finds a page or partner request anywhere in a message. It is
+only used when the agent model is unavailable (its circuit breaker is open),
+where a plausible tool answer beats an error.
+"""
+import logging
+import re
+from dataclasses import dataclass
+from app import telemetry
+
+logger = logging.getLogger(__name__)
+
+# Pages of the web client (client/src routes), keyed by the names users say.
+PAGES = {
+    "dashboard": "dashboard",
+    "home": "dashboard",
+    "donate": "donate",
+    "donation form": "donate",
+    "guidelines": "guidelines",
+    "donation guidelines": "guidelines",
+    "history": "history",
+    "donation history": "history",
+    "delivery history": "history",
+    "impact": "impact",
+    "recipients": "recipients",
+    "available donations": "available-donations",
+    "claimed donations": "claimed-donations",
+    "donors": "donors",
+    "inventory": "inventory",
+    "requirements": "requirements",
+    "settings": "settings",
+    "availability": "availability",
+    "deliveries": "deliveries",
+    "leaderboard": "leaderboard",
+    "available pickups": "pickups/available",
+    "pickups": "pickups/available",
+    "profile": "profile",
+    "zones": "zones",
+    "schedule": "schedule",
+    "login": "login",
+    "signup": "signup",
+    "sign up": "signup",
+}
+
+_POLITE = r"(?:(?:please|can you|could you|pls)\s+)?"
+_END = r"\s*(?:,?\s*please)?[.!?]*"
+_NAVIGATION_RE = re.compile(
+    rf"^{_POLITE}(?:take me to|go to|navigate to|bring me to|open|show me)\s+(?:the\s+|my\s+)?"
+    rf"(?P<page>[a-z ]+?)(?:\s+(?:page|screen|tab))?{_END}$"
+)
+_LIST_PARTNERS_RE = re.compile(
+    rf"^{_POLITE}(?:list|show(?: me)?|get)\s+(?:all\s+)?(?:the\s+|our\s+)?(?:partners|partner organizations){_END}$"
+)
+
+_LOOSE_NAVIGATION_RE = re.compile(
+    r"\b(?:take me to|go to|navigate to|bring me to|open|show me|where is|find)\s+(?:the\s+|my\s+)?(?P<rest>[a-z ]+)"
+)
+_LOOSE_PARTNERS_RE = re.compile(r"\bpartner(?:s| organizations)\b")
+
+@dataclass
+class Route:
+    intent: str
+    tool: str
+    args: dict
+
+routes = telemetry.register_metric(
+    telemetry.Counter("helphut_intent_routes_total", "Agent requests by routing decision (intent or 'agent').")
+)
+router_stats: dict = {"routed": {}, "fallback": 0}
+
+def _normalize(message: str) -> str:
+    return re.sub(r"\s+", " ", message).strip().lower()
+
+def match(message: str) -> Route | None:
+    """The tool call a message maps to, or None when it needs the agent."""
+    text = _normalize(message)
+    if m := _NAVIGATION_RE.match(text):
+        page = PAGES.get(m.group("page").strip())
+        if page is not None:
+            return Route("navigate", "navigation_tool", {"page": page})
+    if _LIST_PARTNERS_RE.match(text):
+        return Route("list_partners", "crud_tool", {"operation": "get_partners", "data": {}})
+    return None
+
+def match_loose(message: str) -> Route | None:
+    """Best-effort match() for degraded mode: the first known page after a navigation verb, or any partner mention."""
+    text = _normalize(message)
+    for m in _LOOSE_NAVIGATION_RE.finditer(text):
+        rest = m.group("rest")
+        name = max((name for name in PAGES if re.match(rf"{re.escape(name)}\b", rest)), key=len, default=None)
+        if name is not None:
+            return Route("navigate", "navigation_tool", {"page": PAGES[name]})
+    if _LOOSE_PARTNERS_RE.search(text):
+        return Route("list_partners", "crud_tool", {"operation": "get_partners", "data": {}})
+    return None
+
+def route(message: str) -> Route | None:
+    """match() plus decision logging and hit-rate accounting."""
+    decision = match(message)
+    intent = decision.intent if decision else "agent"
+    routes.inc(intent=intent)
+    if decision:
+        router_stats["routed"][intent] = router_stats["routed"].get(intent, 0) + 1
+    else:
+        router_stats["fallback"] += 1
+    logger.info("intent route=%s tool=%s message=%r", intent, decision.tool if decision else None, message[:200])
+    return decision
+
+def get_router_stats() -> dict:
+    routed = sum(router_stats["routed"].values())
+    total = routed + router_stats["fallback"]
+    return {
+        "routed": dict(router_stats["routed"]),
+        "fallback": router_stats["fallback"],
+        "hit_rate": routed / total if total else 0.0,
+    }
@@ -0,0 +1,261 @@
+# app/services/inventory.py
+"""Expiration-ordered index of available inventory, for "what spoils next" queries.
+
+Available items with an expiration_date sit in one binary heap per
+(partner_org_id, food_type_id) bucket, keyed by expiration time. An item
+that is reserved, distributed, deleted or re-dated is not dug out of its
+heap. Its entry goes stale (each item carries a version) and is skipped. A
+bucket's heap is rebuilt once more than half of it is stale. An insert or
+status change is therefore O(log n) amortized.
+
+expiring() reads the relevant heaps in order without popping them (best-first
+walk of the heap tree) and merges them. The cost grows with the number of
+items returned, not the size of the inventory. Items that are still Available
+after their expiration date would otherwise head every walk, so each query
+first pops a bucket's expired entries into its `expired` list, which is
+sorted because it fills in heap order. They are only returned with
+include_expired, and never crowd out items that are still good.
+
+InventoryEngine bulk-loads the inventory table on first use. After that,
+apply_change() keeps it current from Supabase database webhook payloads
+(POST /inventory/changes); the table stays the source of truth for status
+transitions.
+"""
+import asyncio
+import heapq
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterable, Iterator
+from app import telemetry
+from app.db import queries, reference
+from app.models.schemas import InventoryRow, InventoryStatus
+
+query_latency = telemetry.register_metric(
+    telemetry.Histogram("helphut_inventory_expiring_query_seconds", "Expiring-inventory query latency.")
+)
+
+# A heap entry: (expires at, item version, item id).
+Entry = tuple[float, int, str]
+
+@dataclass
+class Item:
+    id: str
+    partner_id: str | None
+    food_type_id: str | None
+    quantity: float
+    unit: str
+    expires: float | None  # POSIX timestamp
+    status: InventoryStatus
+    version: int = 0
+
+    @property
+    def indexed(self) -> bool:
+        return self.status == InventoryStatus.Available and self.expires is not None
+
+class Bucket:
+    def __init__(self):
+        self.heap: list[Entry] = []
+        self.expired: list[Entry] = []  # popped off the heap in order, so sorted
+        self.stale = 0
+
+    def in_order(self) -> Iterator[Entry]:
+        # Best-first walk of the implicit heap tree: yields entries in order without popping.
+        if not self.heap:
+            return
+        frontier = [(self.heap[0], 0)]
+        while frontier:
+            entry, i = heapq.heappop(frontier)
+            yield entry
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(self.heap):
+                    heapq.heappush(frontier, (self.heap[child], child))
+
+def _timestamp(value: datetime | None) -> float | None:
+    if value is None:
+        return None
+    return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+
+class InventoryIndex:
+    def __init__(self, rows: Iterable[InventoryRow] = ()):
+        """Bulk build: collect each bucket's entries, then heapify once (O(n))."""
+        self.items: dict[str, Item] = {}
+        # partner id -> food type id -> bucket
+        self.buckets: dict[str | None, dict[str | None, Bucket]] = {}
+        for row in rows:
+            item = self._item(row, 0)
+            self.items[item.id] = item
+            if item.indexed:
+                self._bucket(item).heap.append((item.expires, item.version, item.id))
+        for by_food_type in self.buckets.values():
+            for bucket in by_food_type.values():
+                heapq.heapify(bucket.heap)
+
+    @staticmethod
+    def _item(row: InventoryRow, version: int) -> Item:
+        return Item(
+            row.id, row.partner_org_id, row.food_type_id, row.quantity, row.unit,
+            _timestamp(row.expiration_date), InventoryStatus(row.status), version,
+        )
+
+    def _bucket(self, item: Item) -> Bucket:
+        return self.buckets.setdefault(item.partner_id, {}).setdefault(item.food_type_id, Bucket())
+
+    def _live(self, entry: Entry) -> bool:
+        item = self.items.get(entry[2])
+        return item is not None and item.version == entry[1] and item.indexed
+
+    def _retire(self, item: Item):
+        if not item.indexed:
+            return
+        bucket = self._bucket(item)
+        bucket.stale += 1
+        if bucket.stale > 32 and bucket.stale * 2 > len(bucket.heap) + len(bucket.expired):
+            bucket.heap = [entry for entry in bucket.heap if entry[2] != item.id and self._live(entry)]
+            bucket.expired = [entry for entry in bucket.expired if entry[2] != item.id and self._live(entry)]
+            heapq.heapify(bucket.heap)
+            bucket.stale = 0
+
+    def _sweep(self, bucket: Bucket, now: float):
+        # Move entries that have expired off the heap; stale ones are dropped on the way.
+        while bucket.heap and bucket.heap[0][0] < now:
+            entry = heapq.heappop(bucket.heap)
+            if self._live(entry):
+                bucket.expired.append(entry)
+            else:
+                bucket.stale = max(0, bucket.stale - 1)
+
+    def upsert(self, row: InventoryRow):
+        """Insert or replace an item: status transitions, re-dating and moves between partners."""
+        old = self.items.get(row.id)
+        if old is not None:
+            self._retire(old)
+        item = self._item(row, old.version + 1 if old is not None else 0)
+        self.items[item.id] = item
+        if item.indexed:
+            heapq.heappush(self._bucket(item).heap, (item.expires, item.version, item.id))
+
+    def remove(self, item_id: str):
+        item = self.items.pop(item_id, None)
+        if item is not None:
+            self._retire(item)
+
+    def expiring(
+        self,
+        within_hours: float,
+        limit: int,
+        partner_id: str | None = None,
+        food_type_id: str | None = None,
+        now: float | None = None,
+        include_expired: bool = False,
+    ) -> list[Item]:
+        """Available items expiring within `within_hours`, soonest first.
+
+        Items already past their expiration date are left out unless include_expired,
+        in which case they come first.
+        """
+        start = time.perf_counter()
+        now = time.time() if now is None else now
+        horizon = now + within_hours * 3600
+        partners = [self.buckets.get(partner_id, {})] if partner_id is not None else self.buckets.values()
+        buckets = [
+            bucket
+            for by_food_type in partners
+            for food_type, bucket in by_food_type.items()
+            if food_type_id is None or food_type == food_type_id
+        ]
+        walks = []
+        for bucket in buckets:
+            self._sweep(bucket, now)
+            first = 0 if include_expired else bisect_left(bucket.expired, (now,))
+            walks += [iter(bucket.expired[first:]), bucket.in_order()]
+        results = []
+        for entry in heapq.merge(*walks):
+            if entry[0] > horizon or len(results) >= limit:
+                break
+            if self._live(entry):
+                results.append(self.items[entry[2]])
+        query_latency.observe(time.perf_counter() - start)
+        return results
+
+    def stats(self) -> dict:
+        buckets = [bucket for by_food_type in self.buckets.values() for bucket in by_food_type.values()]
+        return {
+            "items": len(self.items),
+            "indexed": sum(item.indexed for item in self.items.values()),
+            "heap_entries": sum(len(bucket.heap) + len(bucket.expired) for bucket in buckets),
+            "buckets": len(buckets),
+        }
+
+class InventoryEngine:
+    """The InventoryIndex loaded from the database and kept current; see the module docstring."""
+
+    def __init__(self):
+        self.index: InventoryIndex | None = None
+        self.loads = 0
+        self.changes = 0
+        self._lock = asyncio.Lock()
+
+    async def get_index(self) -> InventoryIndex:
+        if self.index is not None:
+            return self.index
+        async with self._lock:
+            if self.index is None:
+                with telemetry.span("inventory.build"):
+                    self.index = InventoryIndex([row async for row in queries.iter_rows("inventory")])
+                self.loads += 1
+        return self.index
+
+    async def apply_change(self, change: str, record: dict | None, old_record: dict | None = None):
+        """Apply one INSERT/UPDATE/DELETE of an inventory row."""
+        index = await self.get_index()
+        row = record if change != "DELETE" else old_record
+        if row is None or "id" not in row:
+            raise ValueError(f"{change} on inventory carries no row id")
+        if change == "DELETE":
+            index.remove(row["id"])
+        else:
+            index.upsert(InventoryRow.model_validate(row))
+        self.changes += 1
+
+    def rebuild(self):
+        """Drop the index; the next query bulk-loads the table again."""
+        self.index = None
+
+    def stats(self) -> dict:
+        index_stats = self.index.stats() if self.index is not None else {}
+        return {**index_stats, "loads": self.loads, "changes": self.changes}
+
+engine = InventoryEngine()
+
+async def expiring_inventory(
+    within_hours: float,
+    limit: int,
+    partner_id: str | None = None,
+    food_type_id: str | None = None,
+    include_expired: bool = False,
+) -> list[dict]:
+    index = await engine.get_index()
+    now = time.time()
+    return [
+        {
+            "id": item.id,
+            "partner_org_id": item.partner_id,
+            "food_type_id": item.food_type_id,
+            "quantity": item.quantity,
+            "unit": item.unit,
+            "expiration_date": datetime.fromtimestamp(item.expires, timezone.utc).isoformat(),
+            "hours_left": round((item.expires - now) / 3600, 1),
+        }
+        for item in index.expiring(within_hours, limit, partner_id, food_type_id, now, include_expired)
+    ]
+
+async def resolve_food_type(value: str) -> str | None:
+    """A food type id, given its id or its (case-insensitive) name."""
+    if await reference.food_types.get(value) is not None:
+        return value
+    return await reference.resolve_food_type_id(value)
+
+def get_inventory_stats() -> dict:
+    return engine.stats()
@@ -0,0 +1,267 @@
+# app/services/matching.py
+"""Donation-to-volunteer matching over in-memory indexes of the volunteer tables.
+
+Weekly availability (volunteer_availability_time) is held as minute-of-week
+intervals in UTC, day_of_week 0 = Sunday. Slot times with a UTC offset are
+converted, plain times and naive datetimes are taken as UTC. A volunteer's
+slots are folded into the week and merged, also across Saturday-to-Sunday
+midnight, so back-to-back slots cover a window that spans them. Each interval
+is also stored one week earlier: a slot that runs past the end of the week
+then covers Sunday-morning windows as well. The
+intervals sit in NumPy arrays sorted by start. Every interval containing a
+window [a, b] starts in [a - longest interval, a], which binary search finds.
+Only those candidates are checked for end >= b.
+
+Zones and skills are inverted indexes: one boolean mask over volunteers per
+value. Handling requirements map to skills and vehicle types (HANDLING).
+Filtering a candidate set is then a few vectorized mask lookups.
+
+The index is rebuilt from the four tables on first use, after
+MATCHING_INDEX_TTL_SECONDS, or after invalidate() (wired to POST
+/reference/invalidate like the reference tables).
+"""
+import asyncio
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, time as dt_time, timedelta, timezone
+from typing import Iterable
+import numpy as np
+from app import telemetry
+from app.config import settings
+from app.db import queries
+from app.models.schemas import (
+    DonationsRow,
+    VolunteerAvailabilityTimeRow,
+    VolunteerAvailabilityZonesRow,
+    VolunteerSkillsRow,
+    VolunteersRow,
+)
+
+TABLES = ("volunteers", "volunteer_availability_time", "volunteer_availability_zones", "volunteer_skills")
+WEEK_MINUTES = 7 * 24 * 60
+
+# Handling requirement -> skills that satisfy it, and vehicle types that do (normalized).
+HANDLING = {
+    "refrigeration": ({"refrigeration", "cold chain"}, {"refrigerated van", "refrigerated truck"}),
+    "freezing": ({"freezing", "cold chain"}, {"refrigerated van", "refrigerated truck"}),
+    "heavy_lifting": ({"heavy lifting"}, set()),
+    "fragile": ({"fragile handling"}, set()),
+}
+
+match_latency = telemetry.register_metric(
+    telemetry.Histogram("helphut_matching_query_seconds", "Eligible-volunteer query latency.")
+)
+
+def normalize(value: str) -> str:
+    return re.sub(r"[\s_-]+", " ", value.strip().casefold())
+
+def minute_of_day(value: str) -> int:
+    """Minutes from the slot's day's midnight, in UTC.
+
+    The columns are TIMESTAMPTZ in the database but plain "HH:MM[:SS]" strings
+    are accepted too. A UTC offset can push the result below 0 or past 1440,
+    i.e. into the neighbouring day.
+    """
+    parsed = datetime.fromisoformat(value).timetz() if "T" in value or " " in value.strip() else dt_time.fromisoformat(value)
+    offset = parsed.utcoffset()
+    minutes = parsed.hour * 60 + parsed.minute
+    return minutes - int(offset / timedelta(minutes=1)) if offset else minutes
+
+def _utc(moment: datetime) -> datetime:
+    return moment.astimezone(timezone.utc) if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+def minute_of_week(moment: datetime) -> int:
+    moment = _utc(moment)
+    return (moment.isoweekday() % 7) * 24 * 60 + moment.hour * 60 + moment.minute
+
+def _merge(intervals: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Merge intervals whose starts lie in [0, WEEK_MINUTES), wrapping around the end of the week."""
+    merged: list[list[int]] = []
+    for start, end in sorted(intervals):
+        # Slots ending at 23:59 and starting at 00:00 the next day are contiguous.
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    # An interval running past Saturday midnight absorbs the ones it reaches early in the week.
+    while len(merged) > 1 and merged[-1][1] + 1 >= merged[0][0] + WEEK_MINUTES:
+        first = merged.pop(0)
+        merged[-1][1] = max(merged[-1][1], first[1] + WEEK_MINUTES)
+    return [(start, end) for start, end in merged]
+
+@dataclass
+class MatchQuery:
+    window_start: datetime
+    window_end: datetime
+    zone: str | None = None
+    skills: list[str] = field(default_factory=list)
+    handling: list[str] = field(default_factory=list)  # keys of HANDLING
+
+    @classmethod
+    def for_donation(cls, donation: DonationsRow, zone: str | None = None, skills: Iterable[str] = ()) -> "MatchQuery":
+        flags = {
+            "refrigeration": donation.requires_refrigeration,
+            "freezing": donation.requires_freezing,
+            "heavy_lifting": donation.requires_heavy_lifting,
+            "fragile": donation.is_fragile,
+        }
+        return cls(donation.pickup_window_start, donation.pickup_window_end, zone, list(skills), [k for k, v in flags.items() if v])
+
+class MatchingIndex:
+    def __init__(
+        self,
+        volunteers: Iterable[VolunteersRow],
+        times: Iterable[VolunteerAvailabilityTimeRow] = (),
+        zones: Iterable[VolunteerAvailabilityZonesRow] = (),
+        skills: Iterable[VolunteerSkillsRow] = (),
+    ):
+        volunteers = list(volunteers)
+        self.ids = [v.id for v in volunteers]
+        self.vehicle_types = [v.vehicle_type for v in volunteers]
+        self.positions = {vid: i for i, vid in enumerate(self.ids)}
+        count = len(self.ids)
+
+        slots: dict[int, list[tuple[int, int]]] = {}
+        for row in times:
+            if (owner := self.positions.get(row.volunteer_id)) is None:
+                continue
+            start = row.day_of_week * 24 * 60 + minute_of_day(row.start_time)
+            end = row.day_of_week * 24 * 60 + minute_of_day(row.end_time)
+            if end <= start:
+                end += 24 * 60  # overnight slot
+            folded = start % WEEK_MINUTES
+            slots.setdefault(owner, []).append((folded, end + folded - start))
+        starts, ends, owners = [], [], []
+        for owner, intervals in slots.items():
+            for start, end in _merge(intervals):
+                for shift in (-WEEK_MINUTES, 0):
+                    starts.append(start + shift)
+                    ends.append(end + shift)
+                    owners.append(owner)
+        order = np.argsort(np.asarray(starts, dtype=np.int32), kind="stable")
+        self.starts = np.asarray(starts, dtype=np.int32)[order]
+        self.ends = np.asarray(ends, dtype=np.int32)[order]
+        self.owners = np.asarray(owners, dtype=np.int32)[order]
+        self.longest = int((self.ends - self.starts).max()) if len(self.starts) else 0
+
+        self.zones = self._inverted(count, ((r.volunteer_id, r.zone) for r in zones))
+        self.skills = self._inverted(count, ((r.volunteer_id, r.skill) for r in skills))
+        self.vehicles = self._inverted(count, ((v.id, v.vehicle_type) for v in volunteers if v.vehicle_type))
+        self.handling = {}
+        for requirement, (skill_names, vehicle_types) in HANDLING.items():
+            mask = np.zeros(count, dtype=bool)
+            for name in skill_names:
+                mask |= self.skills.get(name, False)
+            for name in vehicle_types:
+                mask |= self.vehicles.get(name, False)
+            self.handling[requirement] = mask
+
+    def _inverted(self, count: int, pairs) -> dict[str, np.ndarray]:
+        index: dict[str, np.ndarray] = {}
+        for volunteer_id, value in pairs:
+            if (owner := self.positions.get(volunteer_id)) is not None:
+                index.setdefault(normalize(value), np.zeros(count, dtype=bool))[owner] = True
+        return index
+
+    def available(self, window_start: datetime, window_end: datetime) -> np.ndarray:
+        """Positions of volunteers whose merged availability covers the whole window."""
+        window_start, window_end = _utc(window_start), _utc(window_end)
+        if window_end <= window_start:
+            raise ValueError("The pickup window must end after it starts")
+        a = minute_of_week(window_start)
+        b = a + int((window_end - window_start) / timedelta(minutes=1))
+        if b - a > self.longest:
+            return np.zeros(0, dtype=np.int32)
+        lo = np.searchsorted(self.starts, a - self.longest, side="left")
+        hi = np.searchsorted(self.starts, a, side="right")
+        return self.owners[lo:hi][self.ends[lo:hi] >= b]
+
+    def match(self, query: MatchQuery) -> np.ndarray:
+        """Positions of volunteers available for the whole window who meet every filter, ascending."""
+        start = time.perf_counter()
+        candidates = self.available(query.window_start, query.window_end)
+        filters = []
+        if query.zone is not None:
+            filters.append(self.zones.get(normalize(query.zone)))
+        filters += [self.skills.get(normalize(skill)) for skill in query.skills]
+        filters += [self.handling[requirement] for requirement in query.handling]
+        for mask in filters:
+            if mask is None:
+                candidates = candidates[:0]
+                break
+            candidates = candidates[mask[candidates]]
+        candidates = np.sort(candidates)
+        if len(candidates) > 1:
+            # A volunteer appears twice only when one merged interval spans a whole week.
+            candidates = candidates[np.concatenate(([True], candidates[1:] != candidates[:-1]))]
+        match_latency.observe(time.perf_counter() - start)
+        return candidates
+
+    def eligible(self, query: MatchQuery, limit: int | None = None) -> list[str]:
+        """Ids of the matching volunteers in load order, at most `limit` of them."""
+        return [self.ids[i] for i in self.match(query)[:limit]]
+
+    def stats(self) -> dict:
+        return {
+            "volunteers": len(self.ids),
+            "intervals": len(self.starts) // 2,
+            "zones": len(self.zones),
+            "skills": len(self.skills),
+        }
+
+class MatchingEngine:
+    """Builds the MatchingIndex from the database and keeps it fresh (see module docstring)."""
+
+    def __init__(self):
+        self.index: MatchingIndex | None = None
+        self.loaded_at: float | None = None
+        self.loads = 0
+        self.queries = 0
+        self._lock = asyncio.Lock()
+
+    def _fresh(self) -> bool:
+        return self.loaded_at is not None and time.monotonic() - self.loaded_at < settings.MATCHING_INDEX_TTL_SECONDS
+
+    async def get_index(self) -> MatchingIndex:
+        if self._fresh():
+            return self.index
+        async with self._lock:
+            if not self._fresh():
+                tables = [[row async for row in queries.iter_rows(table)] for table in TABLES]
+                with telemetry.span("matching.build", volunteers=len(tables[0])):
+                    self.index = MatchingIndex(*tables)
+                self.loaded_at = time.monotonic()
+                self.loads += 1
+        return self.index
+
+    async def match(self, query: MatchQuery) -> np.ndarray:
+        index = await self.get_index()
+        self.queries += 1
+        return index.match(query)
+
+    def invalidate(self):
+        self.loaded_at = None
+
+    def stats(self) -> dict:
+        index_stats = self.index.stats() if self.index is not None else {}
+        return {**index_stats, "loads": self.loads, "queries": self.queries}
+
+engine = MatchingEngine()
+
+async def get_donation(donation_id: str) -> DonationsRow | None:
+    page = await queries.fetch_page("donations", filters={"id": donation_id}, limit=1)
+    return page.rows[0] if page.rows else None
+
+async def eligible_volunteers(query: MatchQuery, limit: int | None = None) -> dict:
+    """How many volunteers are eligible, and the first `limit` of them (id and vehicle type)."""
+    positions = await engine.match(query)
+    index = engine.index
+    volunteers = [{"id": index.ids[i], "vehicle_type": index.vehicle_types[i]} for i in positions[:limit]]
+    return {"count": len(positions), "volunteers": volunteers}
+
+def invalidate():
+    engine.invalidate()
+
+def get_matching_stats() -> dict:
+    return engine.stats()
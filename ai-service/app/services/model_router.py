@@ -0,0 +1,167 @@
+# app/services/model_router.py
+"""Per-request choice between a small and a large chat model.
+
+Each task (chat, donation, agent) has a default tier in MODEL_TASK_TIERS.
+Requests on a small-tier task are promoted to the large model when the input
+is long or the caller's confidence that the input is routine is low. Callers
+that validate structured output escalate to the large tier on failure.
+track() records per-task, per-tier latency, token usage and estimated cost,
+and passes each call through its model's circuit breaker. A request that
+does more than call the model (the agent runs tools and queries the
+database between its model calls) is tracked with per_llm_call=True. The
+breaker then sees only the model calls themselves.
+"""
+import time
+from contextlib import contextmanager
+from typing import Any
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from app import telemetry
+from app.config import settings
+from app.services import breaker
+from app.services.history import count_tokens
+
+SMALL, LARGE = "small", "large"
+
+tier_requests = telemetry.register_metric(
+    telemetry.Counter("helphut_model_tier_requests_total", "Model calls by task, tier and outcome.")
+)
+tier_latency = telemetry.register_metric(
+    telemetry.Histogram("helphut_model_tier_latency_seconds", "Model call latency by task and tier.")
+)
+tier_cost = telemetry.register_metric(
+    telemetry.Counter("helphut_model_tier_cost_usd_total", "Estimated model spend by task and tier.")
+)
+tier_escalations = telemetry.register_metric(
+    telemetry.Counter("helphut_model_tier_escalations_total", "Requests retried on a larger tier by task.")
+)
+
+# (task, tier) -> running totals for get_tier_stats().
+_totals: dict[tuple[str, str], dict] = {}
+
+def task_tier(task: str) -> str:
+    """The task's default tier (always LARGE with routing disabled)."""
+    if not settings.MODEL_ROUTING_ENABLED:
+        return LARGE
+    return settings.MODEL_TASK_TIERS.get(task, LARGE)
+
+def select_tier(task: str, text: str, confidence: float | None = None) -> str:
+    tier = task_tier(task)
+    if tier == LARGE:
+        return LARGE
+    if count_tokens(text) > settings.MODEL_SMALL_MAX_INPUT_TOKENS:
+        return LARGE
+    if confidence is not None and confidence < settings.MODEL_MIN_CONFIDENCE:
+        return LARGE
+    return tier
+
+def model_name(tier: str) -> str:
+    return settings.MODEL_TIERS[tier]
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int, cached_prompt_tokens: int = 0) -> float:
+    input_price, output_price = settings.MODEL_PRICES.get(model, (0.0, 0.0))
+    # Cached prompt tokens are part of prompt_tokens but billed at a discount.
+    input_cost = (prompt_tokens - cached_prompt_tokens * settings.MODEL_CACHED_PROMPT_DISCOUNT) * input_price
+    return (input_cost + completion_tokens * output_price) / 1_000_000
+
+class UsageRecorder(BaseCallbackHandler):
+    """Collects token usage from the LLM calls of one tracked request.
+
+    Given a circuit, it also records each LLM call's own latency and outcome on it.
+    """
+
+    run_inline = True
+
+    def __init__(self, circuit: breaker.CircuitBreaker | None = None):
+        self.prompt_tokens = 0
+        self.cached_prompt_tokens = 0
+        self.completion_tokens = 0
+        self.circuit = circuit
+        self.llm_calls = 0
+        self._started: dict[UUID, float] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs: Any):
+        self._started[run_id] = time.perf_counter()
+
+    def _finish(self, run_id: UUID, error: BaseException | None):
+        start = self._started.pop(run_id, None)
+        if start is None:
+            return
+        self.llm_calls += 1
+        if self.circuit is not None:
+            self.circuit.record(time.perf_counter() - start, error)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any):
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                self.prompt_tokens += usage.get("input_tokens", 0)
+                self.cached_prompt_tokens += (usage.get("input_token_details") or {}).get("cache_read", 0)
+                self.completion_tokens += usage.get("output_tokens", 0)
+        self._finish(run_id, None)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._finish(run_id, error)
+
+@contextmanager
+def track(task: str, tier: str, per_llm_call: bool = False):
+    """Time one model request; pass the yielded recorder in the call's callbacks.
+
+    Raises breaker.CircuitOpen, before the call starts, while the model's circuit is open.
+    The breaker records the whole request, or with per_llm_call each LLM call in it.
+    """
+    circuit = breaker.get_breaker(model_name(tier))
+    circuit.check()
+    recorder = UsageRecorder(circuit if per_llm_call else None)
+    outcome = "ok"
+    error = None
+    start = time.perf_counter()
+    try:
+        yield recorder
+    except BaseException as exc:
+        outcome = "error"
+        error = exc
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        if not per_llm_call:
+            circuit.record(elapsed, error)
+        elif not recorder.llm_calls:
+            circuit.release()
+        cost = estimate_cost(
+            model_name(tier), recorder.prompt_tokens, recorder.completion_tokens, recorder.cached_prompt_tokens
+        )
+        tier_requests.inc(task=task, tier=tier, outcome=outcome)
+        tier_latency.observe(elapsed, task=task, tier=tier)
+        tier_cost.inc(cost, task=task, tier=tier)
+        totals = _totals.setdefault((task, tier), {
+            "requests": 0, "errors": 0, "escalations": 0, "latency_seconds": 0.0,
+            "prompt_tokens": 0, "cached_prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0,
+        })
+        totals["requests"] += 1
+        totals["errors"] += outcome == "error"
+        totals["latency_seconds"] += elapsed
+        totals["prompt_tokens"] += recorder.prompt_tokens
+        totals["cached_prompt_tokens"] += recorder.cached_prompt_tokens
+        totals["completion_tokens"] += recorder.completion_tokens
+        totals["cost_usd"] += cost
+
+def record_escalation(task: str, from_tier: str):
+    tier_escalations.inc(task=task, tier=from_tier)
+    totals = _totals.get((task, from_tier))
+    if totals is not None:
+        totals["escalations"] += 1
+
+def get_tier_stats() -> dict:
+    stats = {}
+    for (task, tier), totals in sorted(_totals.items()):
+        requests = totals["requests"]
+        stats.setdefault(task, {})[tier] = {
+            "model": model_name(tier),
+            **totals,
+            "mean_latency_ms": totals["latency_seconds"] / requests * 1000 if requests else 0.0,
+        }
+    return stats
@@ -0,0 +1,107 @@
+# app/services/prompts.py
+"""Prompt layout for provider-side prefix caching, and prompt-size accounting.
+
+OpenAI reuses the longest previously seen prefix of a prompt (tool schemas
+first, then messages in order) once the prompt is at least 1024 tokens, and
+bills those cached tokens at a discount. Every prompt here therefore starts
+with the parts that never change -- tool schemas, then static instructions --
+and puts per-request values (the date, the user's text, the conversation)
+after them. PromptLayout enforces that split for string templates.
+
+record() counts a request's prompt locally (static prefix vs total);
+get_prompt_stats() sets those counts beside the prompt and cached-prompt
+tokens the provider reported, per task.
+"""
+import json
+from dataclasses import dataclass
+from string import Formatter
+from langchain_core.messages import BaseMessage, SystemMessage
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from app import telemetry
+from app.services import model_router
+from app.services.history import count_tokens, estimate_tokens
+
+CHAT_SYSTEM_PROMPT = (
+    "You are HelpHut's assistant. HelpHut connects food donors, partner organizations and volunteers "
+    "to move surplus food to people who need it. Answer questions about donating food, partner "
+    "agencies, volunteering and using the HelpHut app. Be concise and friendly, and say so when you "
+    "do not know something rather than guessing."
+)
+
+AGENT_SYSTEM_PROMPT = (
+    "You are HelpHut's in-app agent. Use the available tools to look up, update or remove users, list "
+    "partners, find volunteers for donation pickups, check which inventory expires soonest, navigate "
+    "the app, and summarize information. Call a tool whenever the request needs data or an action, and "
+    "answer briefly using the tool results."
+)
+
+prompt_tokens_estimated = telemetry.register_metric(
+    telemetry.Counter("helphut_prompt_tokens_estimated_total", "Locally counted prompt tokens by task and part (static/dynamic).")
+)
+
+# task -> running totals of locally counted prompt tokens.
+_totals: dict[str, dict] = {}
+
+@dataclass(frozen=True)
+class PromptLayout:
+    """A string prompt split into an invariant prefix and a per-request suffix."""
+
+    static: str
+    dynamic: str
+
+    def __post_init__(self):
+        if self.variables(self.static):
+            raise ValueError(f"Static prompt prefix contains template variables: {sorted(self.variables(self.static))}")
+
+    @staticmethod
+    def variables(text: str) -> set[str]:
+        return {name for _, name, _, _ in Formatter().parse(text) if name}
+
+    @property
+    def template(self) -> str:
+        return self.static + self.dynamic
+
+    @property
+    def input_variables(self) -> list[str]:
+        return sorted(self.variables(self.dynamic))
+
+    @property
+    def static_tokens(self) -> int:
+        return count_tokens(self.static)
+
+def with_system_prompt(system_prompt: str, messages: list[BaseMessage]) -> list[BaseMessage]:
+    """The conversation behind a fixed system message, so every turn shares that prefix."""
+    return [SystemMessage(content=system_prompt)] + list(messages)
+
+def tool_schema_tokens(tools) -> int:
+    return count_tokens(json.dumps([convert_to_openai_tool(tool) for tool in tools]))
+
+def message_tokens(messages: list[BaseMessage]) -> int:
+    return sum(estimate_tokens(m) for m in messages)
+
+def record(task: str, static_tokens: int, total_tokens: int):
+    """Count one request's prompt: static_tokens of invariant prefix out of total_tokens."""
+    prompt_tokens_estimated.inc(static_tokens, task=task, part="static")
+    prompt_tokens_estimated.inc(total_tokens - static_tokens, task=task, part="dynamic")
+    totals = _totals.setdefault(task, {"requests": 0, "estimated_prompt_tokens": 0, "static_prefix_tokens": 0})
+    totals["requests"] += 1
+    totals["estimated_prompt_tokens"] += total_tokens
+    totals["static_prefix_tokens"] += static_tokens
+
+def get_prompt_stats() -> dict:
+    stats = {}
+    reported = model_router.get_tier_stats()
+    for task, totals in sorted(_totals.items()):
+        tiers = reported.get(task, {}).values()
+        prompt_tokens = sum(t["prompt_tokens"] for t in tiers)
+        cached = sum(t["cached_prompt_tokens"] for t in tiers)
+        stats[task] = {
+            **totals,
+            "static_prefix_ratio": totals["static_prefix_tokens"] / totals["estimated_prompt_tokens"]
+            if totals["estimated_prompt_tokens"] else 0.0,
+            "prompt_tokens": prompt_tokens,
+            "cached_prompt_tokens": cached,
+            "uncached_prompt_tokens": prompt_tokens - cached,
+            "cached_ratio": cached / prompt_tokens if prompt_tokens else 0.0,
+        }
+    return stats
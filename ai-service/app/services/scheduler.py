@@ -0,0 +1,214 @@
+# app/services/scheduler.py
+"""Admission control for model calls.
+
+Every model request takes a slot from the worker's LLMScheduler, which holds
+two token buckets: requests per minute and tokens per minute (estimated
+prompt plus completion). Requests wait in a priority queue (interactive chat
+and agent turns ahead of single parses, ahead of batch parsing). Once
+LLM_MAX_QUEUE requests are waiting, new ones are rejected with Overloaded,
+which the endpoints turn into 429 + Retry-After. An upstream 429 is retried
+with jittered exponential backoff after draining the buckets, so queued
+requests back off too. Budgets are per worker: divide the account's limits
+by the number of workers.
+"""
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, TypeVar
+from app import telemetry
+from app.config import settings
+
+T = TypeVar("T")
+
+# Lower runs first.
+INTERACTIVE, STANDARD, BATCH = 0, 1, 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", STANDARD: "standard", BATCH: "batch"}
+
+queue_wait = telemetry.register_metric(
+    telemetry.Histogram("helphut_llm_queue_wait_seconds", "Time model requests waited for admission, by priority.")
+)
+rejections = telemetry.register_metric(
+    telemetry.Counter("helphut_llm_rejections_total", "Model requests rejected because the queue was full.")
+)
+upstream_retries = telemetry.register_metric(
+    telemetry.Counter("helphut_llm_upstream_retries_total", "Retries after upstream rate-limit (429) responses.")
+)
+
+class Overloaded(Exception):
+    """The admission queue is full; retry after `retry_after` seconds."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Model request queue is full; retry after {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` (capped at capacity) can be taken."""
+        self._refill()
+        return max(0.0, (min(amount, self.capacity) - self.tokens) / self.rate)
+
+    def take(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def drain(self):
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+
+class _Waiter:
+    def __init__(self, priority: int, seq: int, tokens: int):
+        self.priority, self.seq, self.tokens = priority, seq, tokens
+        self.wakeup: asyncio.Future | None = None
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    return getattr(error, "status_code", None) == 429
+
+def _retry_after_header(error: BaseException) -> float | None:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+class LLMScheduler:
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, max_queue: int):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_queue = max_queue
+        self._queue: list[_Waiter] = []
+        self._seq = itertools.count()
+        self.in_flight = 0
+
+    def retry_after(self) -> float:
+        queued_tokens = sum(w.tokens for w in self._queue)
+        return max(1.0, len(self._queue) / self.requests.rate, queued_tokens / self.tokens.rate)
+
+    def check_admission(self):
+        if len(self._queue) >= self.max_queue:
+            rejections.inc()
+            raise Overloaded(self.retry_after())
+
+    def _wake_head(self):
+        if self._queue and self._queue[0].wakeup is not None and not self._queue[0].wakeup.done():
+            self._queue[0].wakeup.set_result(None)
+
+    def _remove(self, waiter: _Waiter):
+        if waiter in self._queue:
+            self._queue.remove(waiter)
+            heapq.heapify(self._queue)
+            self._wake_head()
+
+    async def acquire(self, priority: int, tokens: int):
+        self.check_admission()
+        waiter = _Waiter(priority, next(self._seq), tokens)
+        heapq.heappush(self._queue, waiter)
+        start = time.perf_counter()
+        try:
+            while True:
+                if self._queue[0] is waiter:
+                    wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                    if wait <= 0:
+                        heapq.heappop(self._queue)
+                        self.requests.take(1)
+                        self.tokens.take(tokens)
+                        self._wake_head()
+                        break
+                    # A higher-priority arrival may take the head meanwhile; recheck after the sleep.
+                    await asyncio.sleep(wait)
+                else:
+                    waiter.wakeup = asyncio.get_running_loop().create_future()
+                    await waiter.wakeup
+                    waiter.wakeup = None
+        except BaseException:
+            self._remove(waiter)
+            raise
+        queue_wait.observe(time.perf_counter() - start, priority=PRIORITY_NAMES.get(priority, priority))
+
+    @asynccontextmanager
+    async def slot(self, priority: int, tokens: int):
+        await self.acquire(priority, tokens)
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+
+    async def run(self, priority: int, tokens: int, call: Callable[[], Awaitable[T]]) -> T:
+        """Admit, then run `call`, retrying upstream 429s with jittered backoff."""
+        attempt = 0
+        while True:
+            async with self.slot(priority, tokens):
+                try:
+                    return await call()
+                except Exception as e:
+                    if not is_rate_limit_error(e) or attempt >= settings.LLM_MAX_RETRIES:
+                        raise
+                    retry_after = _retry_after_header(e)
+            # Upstream says we are over budget: stop admitting others until the buckets refill.
+            self.requests.drain()
+            self.tokens.drain()
+            backoff = min(settings.LLM_RETRY_MAX_DELAY, settings.LLM_RETRY_BASE_DELAY * 2 ** attempt)
+            upstream_retries.inc(priority=PRIORITY_NAMES.get(priority, priority))
+            await asyncio.sleep(max(retry_after or 0.0, random.uniform(0, backoff)))
+            attempt += 1
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._queue),
+            "in_flight": self.in_flight,
+            "max_queue": self.max_queue,
+            "request_tokens": round(self.requests.tokens, 1),
+            "model_tokens": round(self.tokens.tokens, 1),
+        }
+
+scheduler: LLMScheduler | None = None
+
+def get_scheduler() -> LLMScheduler:
+    global scheduler
+    if scheduler is None:
+        scheduler = LLMScheduler(
+            settings.LLM_REQUESTS_PER_MINUTE, settings.LLM_TOKENS_PER_MINUTE, settings.LLM_MAX_QUEUE
+        )
+    return scheduler
+
+async def run(priority: int, tokens: int, call: Callable[[], Awaitable[T]]) -> T:
+    if not settings.LLM_RATE_LIMIT_ENABLED:
+        return await call()
+    return await get_scheduler().run(priority, tokens + settings.LLM_COMPLETION_TOKEN_ESTIMATE, call)
+
+@asynccontextmanager
+async def slot(priority: int, tokens: int):
+    """Admission without retries, for calls that cannot simply be replayed (streams, agent turns)."""
+    if not settings.LLM_RATE_LIMIT_ENABLED:
+        yield
+        return
+    async with get_scheduler().slot(priority, tokens + settings.LLM_COMPLETION_TOKEN_ESTIMATE):
+        yield
+
+def check_admission():
+    if settings.LLM_RATE_LIMIT_ENABLED:
+        get_scheduler().check_admission()
+
+@telemetry.register_collector
+def _scheduler_metrics() -> dict:
+    if scheduler is None:
+        return {}
+    stats = scheduler.stats()
+    return {"helphut_llm_queue_depth": stats["queued"], "helphut_llm_in_flight": stats["in_flight"]}
@@ -0,0 +1,301 @@
+# app/services/semantic_cache.py
+"""Semantic cache of chat and agent answers.
+
+The embedder is pluggable (SEMANTIC_CACHE_EMBEDDER). HashingEmbedder, the
+default, is local and lexical: word unigrams and bigrams plus character
+trigrams of each word, feature-hashed into SEMANTIC_CACHE_DIMENSIONS signed
+buckets and L2-normalized. It takes microseconds and tolerates inflections
+and typos ("pickup"/"pick-ups") but not synonyms, which is why the default
+threshold is high. OpenAIEmbedder ("openai", opt-in) asks
+SEMANTIC_CACHE_EMBEDDING_MODEL, so paraphrases and synonyms land close
+together, at the cost of a network call in front of every lookup. An
+embedding that fails or exceeds SEMANTIC_CACHE_EMBED_TIMEOUT_SECONDS counts
+as a miss and stores nothing.
+
+VectorIndex keeps the unit vectors in one float32 matrix, so an exact search
+is a single matrix-vector product. From SEMANTIC_CACHE_APPROX_MIN_ENTRIES
+on, the index also keeps SEMANTIC_CACHE_NLIST k-means centroids. A search
+then scores only the rows in the SEMANTIC_CACHE_NPROBE clusters closest to
+the query (an IVF index). Entries carry a scope (task and user role) and an
+expiry time, and both are filtered with vectorized masks. When the index
+is full, expired entries are dropped first, then the oldest.
+"""
+import asyncio
+import logging
+import re
+import time
+import zlib
+from collections import deque
+import numpy as np
+from app import telemetry
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+lookups = telemetry.register_metric(
+    telemetry.Counter("helphut_semantic_cache_lookups_total", "Semantic cache lookups by task and result (hit/miss).")
+)
+lookup_latency = telemetry.register_metric(
+    telemetry.Histogram("helphut_semantic_cache_lookup_seconds", "Semantic cache lookup latency (embedding plus search).")
+)
+
+# Greetings, politeness and function words that do not change what is being asked.
+_FILLER = {
+    "a", "an", "the", "please", "hi", "hey", "hello", "thanks", "thank", "you", "so", "just",
+    "do", "does", "can", "could", "would", "i", "me", "my", "we", "our", "your", "is", "are", "to", "of",
+}
+
+def normalize_query(text: str) -> list[str]:
+    words = re.findall(r"[a-z0-9]+", text.casefold())
+    # Crude plural folding ("pickups" -> "pickup"), enough for short support questions.
+    return [w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w for w in words if w not in _FILLER]
+
+class HashingEmbedder:
+    def __init__(self, dimensions: int):
+        self.dimensions = dimensions
+
+    def _features(self, words: list[str]) -> list[tuple[str, float]]:
+        features = [(f"w:{w}", 1.0) for w in words]
+        features += [(f"b:{a} {b}", 1.0) for a, b in zip(words, words[1:])]
+        # Split compounds ("pick up") also count towards the joined word ("pickup").
+        features += [(f"w:{a}{b}", 0.5) for a, b in zip(words, words[1:])]
+        for w in words:
+            padded = f"#{w}#"
+            features += [(f"c:{padded[i:i + 3]}", 0.5) for i in range(len(padded) - 2)]
+        return features
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature, weight in self._features(normalize_query(text)):
+            digest = zlib.crc32(feature.encode())
+            # The top bit picks the sign, so collisions cancel out instead of piling up.
+            vector[digest % self.dimensions] += weight if digest & 0x80000000 else -weight
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_many(self, texts: list[str]) -> np.ndarray:
+        return np.stack([self.embed(text) for text in texts]) if texts else np.zeros((0, self.dimensions), np.float32)
+
+    async def aembed(self, text: str) -> np.ndarray:
+        return self.embed(text)
+
+class OpenAIEmbedder:
+    """Embeddings from an OpenAI embedding model, shortened to `dimensions` by the API."""
+
+    def __init__(self, dimensions: int, model: str):
+        # Imported here: langchain_openai/openai dominate import time.
+        from langchain_openai import OpenAIEmbeddings
+        from app.clients import get_openai_http_clients
+
+        http_client, http_async_client = get_openai_http_clients()
+        self.dimensions = dimensions
+        self.model = OpenAIEmbeddings(
+            model=model,
+            dimensions=dimensions,
+            openai_api_key=settings.OPENAI_API_KEY,
+            # A cache lookup is not worth retrying: a miss just goes to the model.
+            max_retries=0,
+            http_client=http_client,
+            http_async_client=http_async_client,
+        )
+
+    async def aembed(self, text: str) -> np.ndarray:
+        # Normalized text keeps greetings and filler from moving the vector.
+        vector = np.asarray(await self.model.aembed_query(" ".join(normalize_query(text)) or text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+def get_embedder(dimensions: int):
+    if settings.SEMANTIC_CACHE_EMBEDDER == "hashing" or settings.LLM_BACKEND == "fake":
+        return HashingEmbedder(dimensions)
+    if settings.SEMANTIC_CACHE_EMBEDDER == "openai":
+        return OpenAIEmbedder(dimensions, settings.SEMANTIC_CACHE_EMBEDDING_MODEL)
+    raise ValueError(f"Unknown SEMANTIC_CACHE_EMBEDDER {settings.SEMANTIC_CACHE_EMBEDDER!r}")
+
+class VectorIndex:
+    """Unit vectors with a payload, scope and expiry each; see the module docstring."""
+
+    def __init__(self, dimensions: int, max_entries: int):
+        self.dimensions = dimensions
+        self.max_entries = max_entries
+        self.size = 0
+        self.vectors = np.zeros((64, dimensions), dtype=np.float32)
+        self.scopes = np.zeros(64, dtype=np.int32)
+        self.expires = np.zeros(64, dtype=np.float64)
+        self.clusters = np.zeros(64, dtype=np.int32)
+        self.payloads: list = []
+        self.scope_ids: dict[str, int] = {}
+        self.centroids: np.ndarray | None = None
+        self.trained_at = 0
+
+    def _grow(self):
+        capacity = min(len(self.vectors) * 2, self.max_entries)
+        for name in ("vectors", "scopes", "expires", "clusters"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def _compact(self, now: float):
+        keep = self.expires[:self.size] >= now
+        if keep.sum() >= self.max_entries:
+            # Still full of live entries: drop the oldest tenth.
+            keep[:max(1, self.max_entries // 10)] = False
+        rows = np.flatnonzero(keep)
+        for name in ("vectors", "scopes", "expires", "clusters"):
+            array = getattr(self, name)
+            array[:len(rows)] = array[rows]
+        self.payloads = [self.payloads[i] for i in rows]
+        self.size = len(rows)
+
+    def add(self, vector: np.ndarray, scope: str, payload, ttl: float, now: float | None = None):
+        now = time.time() if now is None else now
+        if self.size == self.max_entries:
+            self._compact(now)
+        if self.size == len(self.vectors):
+            self._grow()
+        row = self.size
+        self.vectors[row] = vector
+        self.scopes[row] = self.scope_ids.setdefault(scope, len(self.scope_ids))
+        self.expires[row] = now + ttl
+        self.payloads.append(payload)
+        self.size += 1
+        if self.centroids is not None:
+            self.clusters[row] = int(np.argmax(self.centroids @ vector))
+        if self.size >= settings.SEMANTIC_CACHE_APPROX_MIN_ENTRIES and self.size >= 2 * self.trained_at:
+            self.train()
+
+    def train(self, iterations: int = 8, sample: int = 20_000, seed: int = 0):
+        """(Re)build the k-means centroids (spherical k-means on a sample) and reassign every row."""
+        rng = np.random.default_rng(seed)
+        vectors = self.vectors[:self.size]
+        nlist = min(settings.SEMANTIC_CACHE_NLIST, self.size)
+        points = vectors[rng.choice(self.size, min(sample, self.size), replace=False)]
+        centroids = points[rng.choice(len(points), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(points @ centroids.T, axis=1)
+            for k in range(nlist):
+                members = points[assignment == k]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    centroids[k] = centroid / (np.linalg.norm(centroid) or 1.0)
+        self.centroids = centroids
+        for start in range(0, self.size, 50_000):
+            block = vectors[start:start + 50_000]
+            self.clusters[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        self.trained_at = self.size
+
+    def search(self, vector: np.ndarray, scope: str, approximate: bool | None = None, now: float | None = None):
+        """(score, payload) of the best live entry in scope, or (0.0, None)."""
+        scope_id = self.scope_ids.get(scope)
+        if scope_id is None or self.size == 0:
+            return 0.0, None
+        now = time.time() if now is None else now
+        if approximate is None:
+            approximate = self.centroids is not None
+        live = (self.scopes[:self.size] == scope_id) & (self.expires[:self.size] >= now)
+        if approximate and self.centroids is not None:
+            probes = np.argsort(self.centroids @ vector)[-settings.SEMANTIC_CACHE_NPROBE:]
+            probed = np.zeros(len(self.centroids), dtype=bool)
+            probed[probes] = True
+            rows = np.flatnonzero(probed[self.clusters[:self.size]] & live)
+            scores = self.vectors[rows] @ vector
+        else:
+            # Score every row in place (no gather copy) and mask out the rest.
+            rows = np.arange(self.size)
+            scores = np.where(live, self.vectors[:self.size] @ vector, -np.inf)
+        if len(rows) == 0 or not np.isfinite(best_score := scores.max()):
+            return 0.0, None
+        best = int(np.argmax(scores))
+        return float(best_score), self.payloads[rows[best]]
+
+    def clear(self):
+        self.__init__(self.dimensions, self.max_entries)
+
+    def nbytes(self) -> int:
+        arrays = self.vectors.nbytes + self.scopes.nbytes + self.expires.nbytes + self.clusters.nbytes
+        centroids = self.centroids.nbytes if self.centroids is not None else 0
+        return arrays + centroids + sum(len(p) for p in self.payloads if isinstance(p, str))
+
+class SemanticCache:
+    def __init__(self, dimensions: int, max_entries: int, embedder=None):
+        self.embedder = embedder if embedder is not None else HashingEmbedder(dimensions)
+        self.index = VectorIndex(dimensions, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self.latencies: deque[float] = deque(maxlen=1000)
+
+    @staticmethod
+    def scope(task: str, role: str | None) -> str:
+        return f"{task}:{role or 'anonymous'}"
+
+    async def _embed(self, query: str) -> np.ndarray | None:
+        try:
+            return await asyncio.wait_for(self.embedder.aembed(query), settings.SEMANTIC_CACHE_EMBED_TIMEOUT_SECONDS)
+        except Exception:
+            logger.warning("Semantic cache embedding failed", exc_info=True)
+            return None
+
+    async def lookup(self, task: str, role: str | None, query: str) -> str | None:
+        start = time.perf_counter()
+        vector = await self._embed(query)
+        score, answer = (0.0, None) if vector is None else self.index.search(vector, self.scope(task, role))
+        hit = answer is not None and score >= settings.SEMANTIC_CACHE_THRESHOLD
+        elapsed = time.perf_counter() - start
+        self.latencies.append(elapsed)
+        lookup_latency.observe(elapsed)
+        lookups.inc(task=task, result="hit" if hit else "miss")
+        if hit:
+            self.hits += 1
+            return answer
+        self.misses += 1
+        return None
+
+    async def store(self, task: str, role: str | None, query: str, answer: str):
+        vector = await self._embed(query)
+        if vector is None or not vector.any():
+            return
+        self.index.add(vector, self.scope(task, role), answer, settings.SEMANTIC_CACHE_TTL_SECONDS)
+
+    def clear(self):
+        self.index.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        latencies = sorted(self.latencies)
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": self.index.size,
+            "approximate": self.index.centroids is not None,
+            "index_bytes": self.index.nbytes(),
+            "lookup_p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+            "lookup_p99_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0,
+        }
+
+# Built on first use from the current settings.
+semantic_cache: SemanticCache | None = None
+
+def get_semantic_cache() -> SemanticCache:
+    global semantic_cache
+    if semantic_cache is None:
+        semantic_cache = SemanticCache(
+            settings.SEMANTIC_CACHE_DIMENSIONS,
+            settings.SEMANTIC_CACHE_MAX_ENTRIES,
+            get_embedder(settings.SEMANTIC_CACHE_DIMENSIONS),
+        )
+    return semantic_cache
+
+def get_semantic_cache_stats() -> dict:
+    return get_semantic_cache().stats()
+
+@telemetry.register_collector
+def _semantic_cache_metrics() -> dict:
+    if semantic_cache is None:
+        return {}
+    stats = semantic_cache.stats()
+    return {
+        "helphut_semantic_cache_entries": stats["entries"],
+        "helphut_semantic_cache_index_bytes": stats["index_bytes"],
+    }
@@ -0,0 +1,63 @@
+# app/services/singleflight.py
+"""Coalescing of identical concurrent upstream calls.
+
+The first caller for a key (the leader) starts the call in its own task;
+callers arriving while it is in flight await the same task instead of making
+their own call. Waiters are shielded from each other: cancelling any one of
+them, the leader included, does not cancel the call while others still wait
+for it. The call is cancelled only when every waiter has gone.
+"""
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+from app import telemetry
+
+T = TypeVar("T")
+
+singleflight_calls = telemetry.register_metric(
+    telemetry.Counter("helphut_singleflight_calls_total", "Calls by group and role (leader made the call, follower shared it).")
+)
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self.leaders = 0
+        self.followers = 0
+        self._flights: dict[Hashable, _Flight] = {}
+
+    def _forget(self, key: Hashable, flight: _Flight, _task=None):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(call()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda task: self._forget(key, flight, task))
+            self.leaders += 1
+            singleflight_calls.inc(group=self.name, role="leader")
+        else:
+            self.followers += 1
+            singleflight_calls.inc(group=self.name, role="follower")
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+                self._forget(key, flight)
+
+    def stats(self) -> dict:
+        calls = self.leaders + self.followers
+        return {
+            "in_flight": len(self._flights),
+            "leaders": self.leaders,
+            "coalesced": self.followers,
+            "coalesced_rate": self.followers / calls if calls else 0.0,
+        }
@@ -0,0 +1,316 @@
+# app/services/spatial.py
+"""Nearest-partner, -volunteer and -donor queries over location coordinates.
+
+Partners, volunteers and donors reference a row of `locations`. Each kind has
+its own SpatialIndex: a uniform latitude/longitude grid of cells holding row
+numbers into flat NumPy arrays of coordinates, plus one value per point.
+The value for partners is spare capacity (max_capacity - capacity).
+Distances are haversine, computed over the candidate rows' arrays at once.
+
+A k-nearest query scores the query's cell and then rings of cells around
+it. It stops once k points are found and the k-th is no farther than the
+nearest point the unvisited cells could hold. A radius query scores the cells
+overlapping the circle's bounding box. On a bulk load the cell size is chosen
+for about SPATIAL_POINTS_PER_CELL points per cell. The grid does not wrap
+around the antimeridian; HelpHut serves regional areas.
+
+SpatialEngine joins the tables on first use. After that, apply_change()
+keeps it current from Supabase database webhook payloads (POST
+/spatial/changes): a moved location moves every entity at it, a partner's
+capacity update changes its value, and deleted rows leave the index.
+"""
+import asyncio
+import math
+import time
+from collections import defaultdict
+import numpy as np
+from app import telemetry
+from app.config import settings
+from app.db import queries
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+KINDS = ("partners", "volunteers", "donors")
+TABLES = ("locations",) + KINDS
+
+query_latency = telemetry.register_metric(
+    telemetry.Histogram("helphut_spatial_query_seconds", "Spatial query latency by kind and query type (nearest/within).")
+)
+
+def haversine_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Great-circle distance in km from one point to each of many (all in degrees)."""
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lats, lons = np.radians(lats), np.radians(lons)
+    a = np.sin((lats - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lats) * np.sin((lons - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+class SpatialIndex:
+    """Points (id, lat, lon, value) in a uniform grid; see the module docstring."""
+
+    def __init__(self, cell_degrees: float | None = None):
+        self.cell = cell_degrees or settings.SPATIAL_CELL_DEGREES
+        self.lats = np.zeros(64)
+        self.lons = np.zeros(64)
+        self.values = np.zeros(64)
+        self.ids: list[str | None] = [None] * 64
+        self.rows: dict[str, int] = {}
+        self.free: list[int] = []
+        self.size = 0  # rows in use, including freed ones
+        self.cells: dict[tuple[int, int], list[int]] = defaultdict(list)
+        # Bounds of every cell ever used (min_i, max_i, min_j, max_j), so ring search knows when to stop.
+        self.extent = (math.inf, -math.inf, math.inf, -math.inf)
+
+    @classmethod
+    def build(cls, points: list[tuple[str, float, float, float]]) -> "SpatialIndex":
+        """Bulk-load (id, lat, lon, value) points with a cell size fitted to their spread."""
+        cell = None
+        if len(points) > 1:
+            lats = np.array([p[1] for p in points])
+            lons = np.array([p[2] for p in points])
+            area = max(np.ptp(lats), 1e-3) * max(np.ptp(lons), 1e-3)
+            cell = math.sqrt(area * settings.SPATIAL_POINTS_PER_CELL / len(points))
+        index = cls(cell)
+        for point in points:
+            index.upsert(*point)
+        return index
+
+    def _cell(self, lat: float, lon: float) -> tuple[int, int]:
+        return math.floor(lat / self.cell), math.floor(lon / self.cell)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def upsert(self, point_id: str, lat: float, lon: float, value: float = 0.0):
+        if point_id in self.rows:
+            row = self.rows[point_id]
+            self.cells[self._cell(self.lats[row], self.lons[row])].remove(row)
+        elif self.free:
+            row = self.free.pop()
+        else:
+            if self.size == len(self.lats):
+                for name in ("lats", "lons", "values"):
+                    setattr(self, name, np.concatenate([getattr(self, name), np.zeros(len(self.lats))]))
+                self.ids.extend([None] * (len(self.lats) - len(self.ids)))
+            row = self.size
+            self.size += 1
+        self.lats[row], self.lons[row], self.values[row] = lat, lon, value
+        self.ids[row] = point_id
+        self.rows[point_id] = row
+        i, j = self._cell(lat, lon)
+        self.cells[(i, j)].append(row)
+        min_i, max_i, min_j, max_j = self.extent
+        self.extent = (min(min_i, i), max(max_i, i), min(min_j, j), max(max_j, j))
+
+    def remove(self, point_id: str):
+        row = self.rows.pop(point_id, None)
+        if row is None:
+            return
+        key = self._cell(self.lats[row], self.lons[row])
+        self.cells[key].remove(row)
+        if not self.cells[key]:
+            del self.cells[key]
+        self.ids[row] = None
+        self.free.append(row)
+
+    def _score(self, rows: list[int], lat: float, lon: float, min_value: float | None):
+        rows = np.array(rows, dtype=np.int64)
+        if min_value is not None:
+            rows = rows[self.values[rows] >= min_value]
+        return rows, haversine_km(lat, lon, self.lats[rows], self.lons[rows])
+
+    def _results(self, rows: np.ndarray, distances: np.ndarray, limit: int | None = None) -> list[dict]:
+        order = np.argsort(distances, kind="stable")[:limit]
+        return [
+            {"id": self.ids[rows[i]], "distance_km": float(distances[i]), "value": float(self.values[rows[i]])}
+            for i in order
+        ]
+
+    def _unvisited_bound(self, lat: float, lon: float, ci: int, cj: int, ring: int) -> float:
+        # Nearest possible distance to a point outside the (2*ring+1)^2 cells around (ci, cj).
+        lat_gap = min(lat - (ci - ring) * self.cell, (ci + ring + 1) * self.cell - lat)
+        lon_gap = min(lon - (cj - ring) * self.cell, (cj + ring + 1) * self.cell - lon)
+        # A longitude gap is shortest at the box's most polar latitude.
+        polar = min(abs(lat) + (ring + 1) * self.cell, 90.0)
+        lon_km = float(haversine_km(polar, 0.0, np.array([polar]), np.array([lon_gap]))[0])
+        return min(lat_gap * KM_PER_DEGREE, lon_km)
+
+    def nearest(self, lat: float, lon: float, k: int, min_value: float | None = None) -> list[dict]:
+        """The k points closest to (lat, lon) with value >= min_value, nearest first."""
+        if not self.cells or k <= 0:
+            return []
+        ci, cj = self._cell(lat, lon)
+        min_i, max_i, min_j, max_j = self.extent
+        reach = max(ci - min_i, max_i - ci, cj - min_j, max_j - cj)
+        found = np.zeros(0, dtype=np.int64)
+        distances = np.zeros(0)
+        ring = 0
+        while True:
+            if ring == 0:
+                ring_rows = self.cells.get((ci, cj), [])
+            else:
+                ring_rows = []
+                for i in range(ci - ring, ci + ring + 1):
+                    for j in (cj - ring, cj + ring) if abs(i - ci) != ring else range(cj - ring, cj + ring + 1):
+                        ring_rows.extend(self.cells.get((i, j), ()))
+            if ring_rows:
+                new_rows, new_distances = self._score(ring_rows, lat, lon, min_value)
+                found = np.concatenate([found, new_rows])
+                distances = np.concatenate([distances, new_distances])
+            if len(found) >= k and np.partition(distances, k - 1)[k - 1] <= self._unvisited_bound(lat, lon, ci, cj, ring):
+                break
+            if ring >= reach:
+                break
+            # Far from everything (or few points pass the filter): score the rest in one pass.
+            if ring >= 8 and len(found) < k:
+                found, distances = self._score(list(self.rows.values()), lat, lon, min_value)
+                break
+            ring += 1
+        return self._results(found, distances, k)
+
+    def within(self, lat: float, lon: float, radius_km: float, min_value: float | None = None) -> list[dict]:
+        """Points within radius_km of (lat, lon) with value >= min_value, nearest first."""
+        lat_span = radius_km / KM_PER_DEGREE
+        polar = min(abs(lat) + lat_span, 89.9)
+        lon_span = min(lat_span / math.cos(math.radians(polar)), 180.0)
+        (i0, j0), (i1, j1) = self._cell(lat - lat_span, lon - lon_span), self._cell(lat + lat_span, lon + lon_span)
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > len(self.cells):
+            candidates = list(self.rows.values())
+        else:
+            candidates = [row for i in range(i0, i1 + 1) for j in range(j0, j1 + 1) for row in self.cells.get((i, j), ())]
+        if not candidates:
+            return []
+        rows, distances = self._score(candidates, lat, lon, min_value)
+        inside = distances <= radius_km
+        return self._results(rows[inside], distances[inside])
+
+    def nbytes(self) -> int:
+        return self.lats.nbytes + self.lons.nbytes + self.values.nbytes
+
+class SpatialEngine:
+    """The per-kind indexes joined with locations and partner capacity; see the module docstring."""
+
+    def __init__(self):
+        # Built by the first ensure_loaded().
+        self.indexes: dict[str, SpatialIndex] = {}
+        self.locations: dict[str, tuple[float, float]] = {}
+        # (kind, entity id) -> location id, and the reverse.
+        self.placed: dict[tuple[str, str], str] = {}
+        self.at_location: dict[str, set[tuple[str, str]]] = defaultdict(set)
+        self.values: dict[tuple[str, str], float] = {}
+        self.loaded = False
+        self.loads = 0
+        self.changes = 0
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def spare_capacity(partner: dict) -> float:
+        return (partner.get("max_capacity") or 0.0) - (partner.get("capacity") or 0.0)
+
+    async def ensure_loaded(self):
+        if self.loaded:
+            return
+        async with self._lock:
+            if self.loaded:
+                return
+            with telemetry.span("spatial.build"):
+                await self._load()
+            self.loaded = True
+            self.loads += 1
+
+    async def _load(self):
+        locations = {}
+        async for row in queries.iter_rows("locations", columns=["id", "latitude", "longitude"]):
+            if row.latitude is not None and row.longitude is not None:
+                locations[row.id] = (row.latitude, row.longitude)
+        entities: dict[str, list[tuple[str, str, float]]] = {}
+        for kind in KINDS:
+            columns = ["id", "location_id"] + (["capacity", "max_capacity"] if kind == "partners" else [])
+            entities[kind] = [
+                (row.id, row.location_id, self.spare_capacity(row.model_dump()) if kind == "partners" else 0.0)
+                async for row in queries.iter_rows(kind, columns=columns)
+                if row.location_id is not None
+            ]
+        self.locations = locations
+        self.placed, self.at_location, self.values = {}, defaultdict(set), {}
+        for kind, rows in entities.items():
+            points = []
+            for entity_id, location_id, value in rows:
+                self._place(kind, entity_id, location_id, value)
+                if location_id in locations:
+                    points.append((entity_id, *locations[location_id], value))
+            self.indexes[kind] = SpatialIndex.build(points)
+
+    def _place(self, kind: str, entity_id: str, location_id: str | None, value: float):
+        key = (kind, entity_id)
+        if (previous := self.placed.pop(key, None)) is not None:
+            self.at_location[previous].discard(key)
+        self.values[key] = value
+        if location_id is not None:
+            self.placed[key] = location_id
+            self.at_location[location_id].add(key)
+
+    def _reindex(self, kind: str, entity_id: str):
+        key = (kind, entity_id)
+        location = self.locations.get(self.placed.get(key))
+        if location is None:
+            self.indexes[kind].remove(entity_id)
+        else:
+            self.indexes[kind].upsert(entity_id, *location, self.values.get(key, 0.0))
+
+    def apply_change(self, table: str, change: str, record: dict | None, old_record: dict | None = None):
+        """Apply one INSERT/UPDATE/DELETE of a row in TABLES to the indexes."""
+        row = record if change != "DELETE" else old_record
+        if row is None or "id" not in row:
+            raise ValueError(f"{change} on {table} carries no row id")
+        self.changes += 1
+        if table == "locations":
+            if change == "DELETE" or row.get("latitude") is None or row.get("longitude") is None:
+                self.locations.pop(row["id"], None)
+            else:
+                self.locations[row["id"]] = (row["latitude"], row["longitude"])
+            for kind, entity_id in list(self.at_location.get(row["id"], ())):
+                self._reindex(kind, entity_id)
+        elif table in KINDS:
+            if change == "DELETE":
+                self._place(table, row["id"], None, 0.0)
+            else:
+                value = self.spare_capacity(row) if table == "partners" else 0.0
+                self._place(table, row["id"], row.get("location_id"), value)
+            self._reindex(table, row["id"])
+        else:
+            raise ValueError(f"Unsupported table: {table}")
+
+    def nearest(self, kind: str, lat: float, lon: float, k: int, min_value: float | None = None) -> list[dict]:
+        start = time.perf_counter()
+        results = self.indexes[kind].nearest(lat, lon, k, min_value)
+        query_latency.observe(time.perf_counter() - start, kind=kind, query="nearest")
+        return results
+
+    def within(self, kind: str, lat: float, lon: float, radius_km: float, min_value: float | None = None) -> list[dict]:
+        start = time.perf_counter()
+        results = self.indexes[kind].within(lat, lon, radius_km, min_value)
+        query_latency.observe(time.perf_counter() - start, kind=kind, query="within")
+        return results
+
+    def stats(self) -> dict:
+        return {
+            "loads": self.loads,
+            "changes": self.changes,
+            "locations": len(self.locations),
+            "indexed": {kind: len(index) for kind, index in self.indexes.items()},
+            "cell_degrees": {kind: index.cell for kind, index in self.indexes.items()},
+            "index_bytes": sum(index.nbytes() for index in self.indexes.values()),
+        }
+
+engine = SpatialEngine()
+
+async def donation_location(donation_id: str) -> tuple[float, float] | None:
+    """Coordinates of the donor location a donation is picked up from, if known."""
+    await engine.ensure_loaded()
+    donation = await queries.fetch_page("donations", columns=["id", "donor_id"], filters={"id": donation_id}, limit=1)
+    if not donation.rows or donation.rows[0].donor_id is None:
+        return None
+    return engine.locations.get(engine.placed.get(("donors", donation.rows[0].donor_id)))
+
+def get_spatial_stats() -> dict:
+    return engine.stats()
@@ -0,0 +1,88 @@
+# app/services/tool_output.py
+"""Compact, token-budgeted rendering of tool results for the agent.
+
+Whatever a tool returns is appended to the ReAct transcript and resent on
+every later step and turn of the thread, so rows are rendered as a
+pipe-separated table of selected columns and cut off at the tool's token
+budget with an "N more rows" note. With TOOL_OUTPUT_COMPACTION_ENABLED off,
+results fall back to the plain `f"{label}: {value}"` repr.
+"""
+import json
+from typing import Any, Iterable, Sequence
+from pydantic import BaseModel
+from app import telemetry
+from app.config import settings
+from app.services.history import count_tokens
+
+# Bookkeeping columns that cost tokens without helping the model answer.
+OMITTED_COLUMNS = {"created_at", "updated_at"}
+
+tool_output_tokens = telemetry.register_metric(
+    telemetry.Counter("helphut_tool_output_tokens_total", "Tokens returned to the agent by each tool.")
+)
+tool_tokens_saved = telemetry.register_metric(
+    telemetry.Counter("helphut_tool_output_tokens_saved_total", "Tokens saved by compacting tool output.")
+)
+tool_truncations = telemetry.register_metric(
+    telemetry.Counter("helphut_tool_output_truncations_total", "Tool outputs cut off at their token budget.")
+)
+
+def token_budget(tool: str) -> int:
+    return settings.TOOL_OUTPUT_TOKEN_BUDGETS.get(tool, settings.TOOL_OUTPUT_TOKEN_BUDGET)
+
+def _as_dict(row: Any) -> dict:
+    return row.model_dump(mode="json") if isinstance(row, BaseModel) else dict(row)
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value, separators=(",", ":"), default=str)
+    return str(value).replace("|", "/").replace("\n", " ")
+
+def _record(tool: str, raw: str, compact: str, truncated: bool) -> str:
+    tokens = count_tokens(compact)
+    tool_output_tokens.inc(tokens, tool=tool)
+    tool_tokens_saved.inc(max(count_tokens(raw) - tokens, 0), tool=tool)
+    if truncated:
+        tool_truncations.inc(tool=tool)
+    return compact
+
+def format_rows(tool: str, label: str, rows: Iterable[Any], columns: Sequence[str] | None = None, more_hint: str = "") -> str:
+    """Render rows as `label (N rows):` plus a header line and one line per row."""
+    rows = [_as_dict(row) for row in rows]
+    raw = f"{label}: {rows}"
+    if not settings.TOOL_OUTPUT_COMPACTION_ENABLED:
+        return raw
+    if not rows:
+        return _record(tool, raw, f"{label}: none", False)
+    if columns is None:
+        columns = [c for c in rows[0] if c not in OMITTED_COLUMNS]
+    lines = [f"{label} ({len(rows)} rows):", "|".join(columns)]
+    budget = token_budget(tool)
+    used = count_tokens("\n".join(lines))
+    shown = 0
+    for row in rows:
+        line = "|".join(_cell(row.get(c)) for c in columns)
+        # Keep room for the trailing "N more rows" note.
+        if used + count_tokens(line) + 12 > budget:
+            break
+        lines.append(line)
+        used += count_tokens(line) + 1
+        shown += 1
+    truncated = shown < len(rows)
+    if truncated:
+        lines.append(f"... {len(rows) - shown} more rows not shown{'; ' + more_hint if more_hint else ''}")
+    return _record(tool, raw, "\n".join(lines), truncated)
+
+def format_value(tool: str, label: str, value: Any) -> str:
+    """Render an arbitrary value as compact JSON, truncated at the tool's budget."""
+    raw = f"{label}: {value}"
+    if not settings.TOOL_OUTPUT_COMPACTION_ENABLED:
+        return raw
+    text = f"{label}: {json.dumps(value, separators=(',', ':'), default=str)}"
+    max_chars = token_budget(tool) * 4
+    truncated = len(text) > max_chars
+    if truncated:
+        text = f"{text[:max_chars]}... (truncated, ~{count_tokens(text[max_chars:])} more tokens)"
+    return _record(tool, raw, text, truncated)
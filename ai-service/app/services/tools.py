@@ -1,12 +1,19 @@
 # app/services/tools.py
 
 import warnings
+from datetime import datetime
 from pydantic import BaseModel
 from langchain_core.runnables import RunnableLambda
-from app.db import queries
+from app.db import queries, reference
+from app.services import inventory, matching
+from app.services.tool_output import format_rows, format_value
+from app.telemetry import traced
 
 warnings.filterwarnings("ignore")
 
+# Columns the agent sees when listing partners.
+PARTNER_COLUMNS = ["id", "name", "capacity", "max_capacity", "contact_email"]
+
 class CRUDToolInput(BaseModel):
     operation: str
     data: dict = {}
@@ -17,7 +24,24 @@ class NavigationToolInput(BaseModel):
 class SynthesisToolInput(BaseModel):
     data: dict
 
-def crud_func(args: dict) -> str:
+class MatchingToolInput(BaseModel):
+    donation_id: str | None = None
+    pickup_window_start: datetime | None = None
+    pickup_window_end: datetime | None = None
+    zone: str | None = None
+    skills: list[str] = []
+    handling: list[str] = []
+    limit: int = 20
+
+class InventoryToolInput(BaseModel):
+    hours: float = 48
+    limit: int = 20
+    partner_id: str | None = None
+    food_type: str | None = None
+    include_expired: bool = False
+
+@traced("tool", tool="crud_tool")
+async def crud_func(args: dict) -> str:
     parsed = CRUDToolInput.model_validate(args)
     op = parsed.operation.lower()
     data = parsed.data
@@ -25,33 +49,48 @@ def crud_func(args: dict) -> str:
         user_id = data.get("user_id")
         if not user_id:
             return "Missing 'user_id' for get_user operation."
-        result = queries.get_user(user_id)
-        return f"Retrieved user: {result}"
+        result = await queries.get_user(user_id)
+        return format_rows("crud_tool", "Retrieved user", result)
     elif op in ["update_user", "update"]:
         user_id = data.get("user_id")
         user_data = data.get("user_data")
         if not user_id or not user_data:
             return "Missing 'user_id' or 'user_data' for update_user operation."
-        result = queries.update_user(user_id, user_data)
-        return f"Updated user: {result}"
+        result = await queries.update_user(user_id, user_data)
+        return format_rows("crud_tool", "Updated user", result)
     elif op in ["delete_user", "delete"]:
         user_id = data.get("user_id")
         if not user_id:
             return "Missing 'user_id' for delete_user operation."
-        result = queries.delete_user(user_id)
-        return f"Deleted user: {result}"
+        result = await queries.delete_user(user_id)
+        return format_rows("crud_tool", "Deleted user", result)
+    elif op in ["list_users", "users"]:
+        try:
+            page = await queries.fetch_page(
+                "users",
+                columns=data.get("columns"),
+                filters=data.get("filters"),
+                after=data.get("after"),
+                limit=data.get("limit"),
+            )
+        except ValueError as e:
+            return f"Invalid list_users request: {e}"
+        rows = format_rows("crud_tool", "Users", page.rows, more_hint="request a smaller limit")
+        return f"{rows}\n(next cursor: {page.next_cursor})"
     elif op in ["get_partners", "partners"]:
-        result = queries.get_partners()
-        return f"Partner organizations: {result}"
+        result = await reference.partners.all()
+        return format_rows("crud_tool", "Partner organizations", result, PARTNER_COLUMNS)
     else:
         return f"Unsupported operation: {parsed.operation}"
 
 crud_tool = RunnableLambda(crud_func).as_tool(
     CRUDToolInput,
     name="crud_tool",
-    description="Performs database CRUD operations. Supported operations: get_user, update_user, delete_user."
+    description="Performs database CRUD operations. Supported operations: get_user, update_user, delete_user, "
+                "list_users (optional columns, filters, limit and the `after` cursor from the previous page)."
 )
 
+@traced("tool", tool="navigation_tool")
 def navigation_func(args: dict) -> str:
     parsed = NavigationToolInput.model_validate(args)
     return f"Navigating to page: {parsed.page}"
@@ -62,12 +101,74 @@ navigation_tool = RunnableLambda(navigation_func).as_tool(
     description="Helps users navigate the website."
 )
 
+@traced("tool", tool="synthesis_tool")
 def synthesis_func(args: dict) -> str:
     parsed = SynthesisToolInput.model_validate(args)
-    return f"Synthesized data from: {parsed.data}"
+    return format_value("synthesis_tool", "Synthesized data from", parsed.data)
 
 synthesis_tool = RunnableLambda(synthesis_func).as_tool(
     SynthesisToolInput,
     name="synthesis_tool",
     description="Synthesizes data from various sources."
 )
+
+@traced("tool", tool="matching_tool")
+async def matching_func(args: dict) -> str:
+    parsed = MatchingToolInput.model_validate(args)
+    unknown = set(parsed.handling) - set(matching.HANDLING)
+    if unknown:
+        return f"Unknown handling requirements: {sorted(unknown)}; use {sorted(matching.HANDLING)}."
+    if parsed.donation_id:
+        donation = await matching.get_donation(parsed.donation_id)
+        if donation is None:
+            return f"No donation with id {parsed.donation_id}."
+        query = matching.MatchQuery.for_donation(donation, parsed.zone, parsed.skills)
+        query.handling = sorted(set(query.handling) | set(parsed.handling))
+    elif parsed.pickup_window_start and parsed.pickup_window_end:
+        query = matching.MatchQuery(
+            parsed.pickup_window_start, parsed.pickup_window_end, parsed.zone, parsed.skills, parsed.handling
+        )
+    else:
+        return "Provide 'donation_id' or both 'pickup_window_start' and 'pickup_window_end'."
+    try:
+        result = await matching.eligible_volunteers(query, parsed.limit)
+    except ValueError as e:
+        return f"{e}."
+    label = f"Eligible volunteers ({result['count']} in total)"
+    return format_rows("matching_tool", label, result["volunteers"], more_hint="narrow by zone or skills")
+
+matching_tool = RunnableLambda(matching_func).as_tool(
+    MatchingToolInput,
+    name="matching_tool",
+    description="Finds volunteers available for a donation pickup. Pass donation_id, or pickup_window_start and "
+                "pickup_window_end (ISO datetimes); optionally zone, required skills, handling requirements "
+                "(refrigeration, freezing, heavy_lifting, fragile) and limit."
+)
+
+@traced("tool", tool="inventory_tool")
+async def inventory_func(args: dict) -> str:
+    parsed = InventoryToolInput.model_validate(args)
+    food_type_id = None
+    if parsed.food_type:
+        food_type_id = await inventory.resolve_food_type(parsed.food_type)
+        if food_type_id is None:
+            return f"Unknown food type: {parsed.food_type}."
+    items = await inventory.expiring_inventory(
+        parsed.hours, parsed.limit, parsed.partner_id, food_type_id, parsed.include_expired
+    )
+    for item in items:
+        food_type = await reference.food_types.get(item["food_type_id"]) if item["food_type_id"] else None
+        item["food_type"] = food_type.name if food_type else None
+    label = f"Available inventory expiring within {parsed.hours:g} hours, soonest first"
+    return format_rows(
+        "inventory_tool", label, items, ["id", "partner_org_id", "food_type", "quantity", "unit", "hours_left"],
+        more_hint="ask for a smaller limit or filter by partner or food type",
+    )
+
+inventory_tool = RunnableLambda(inventory_func).as_tool(
+    InventoryToolInput,
+    name="inventory_tool",
+    description="Lists available inventory that expires soonest: items expiring within `hours` (default 48), "
+                "optionally for one partner_id or food_type, up to `limit` items. Set include_expired to also "
+                "list items already past their date (negative hours_left), first."
+)
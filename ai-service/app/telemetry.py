@@ -0,0 +1,228 @@
+# app/telemetry.py
+"""Request tracing and Prometheus-style metrics.
+
+A trace is opened per HTTP request (see the middleware in app/main.py) and
+carried in a context variable. span() times a block, feeds the
+helphut_span_duration_seconds histogram and appends the span to the current
+trace. When TRACE_LOG_ENABLED is set, each finished trace is written to the
+"app.trace" logger as one JSON line; the logger is raised to INFO and given a
+stderr handler if the logging config leaves it without either. LLM calls and prompt formatting are
+timed by TracingCallbackHandler, which is passed as a LangChain callback at
+each invocation site.
+"""
+import functools
+import inspect
+import json
+import logging
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from app.config import settings
+
+trace_logger = logging.getLogger("app.trace")
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _label_str(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in labels) + "}"
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name, self.help = name, help
+        self.values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_label_str(k)} {v}" for k, v in sorted(self.values.items())]
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: tuple = DEFAULT_BUCKETS):
+        self.name, self.help, self.buckets = name, help, buckets
+        self.values: dict[tuple, list] = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            state = self.values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, state in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_label_str(key + (('le', bound),))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_label_str(key + (('le', '+Inf'),))} {state[-1]}")
+            lines.append(f"{self.name}_sum{_label_str(key)} {state[-2]}")
+            lines.append(f"{self.name}_count{_label_str(key)} {state[-1]}")
+        return lines
+
+http_requests = Counter("helphut_http_requests_total", "HTTP requests by route and status.")
+http_duration = Histogram("helphut_http_request_duration_seconds", "HTTP request latency by route.")
+span_duration = Histogram("helphut_span_duration_seconds", "Duration of traced spans (prompt, llm, tool, db).")
+llm_tokens = Counter("helphut_llm_tokens_total", "LLM tokens by model and type (prompt/prompt_cached/completion).")
+
+_metrics: list = [http_requests, http_duration, span_duration, llm_tokens]
+# Callables returning {metric_name: value} (or {name: {labels_tuple: value}}) rendered as gauges.
+_collectors: list[Callable[[], dict]] = []
+
+def register_metric(metric):
+    _metrics.append(metric)
+    return metric
+
+def register_collector(collector: Callable[[], dict]):
+    _collectors.append(collector)
+    return collector
+
+def render_metrics() -> str:
+    lines = []
+    for metric in _metrics:
+        lines += metric.render()
+    for collector in _collectors:
+        for name, value in collector().items():
+            lines.append(f"# TYPE {name} gauge")
+            if isinstance(value, dict):
+                lines += [f"{name}{_label_str(k)} {float(v)}" for k, v in sorted(value.items())]
+            else:
+                lines.append(f"{name} {float(value)}")
+    return "\n".join(lines) + "\n"
+
+# -------------------------
+# Traces and spans
+# -------------------------
+_current_trace: ContextVar[dict | None] = ContextVar("current_trace", default=None)
+
+def _log_trace(current: dict):
+    # uvicorn's logging config covers only its own loggers, leaving "app.trace" at WARNING
+    # with no handler anywhere. Turning TRACE_LOG_ENABLED on must be enough to see traces,
+    # so fill in whatever the deployment's logging config did not.
+    if not trace_logger.isEnabledFor(logging.INFO):
+        trace_logger.setLevel(logging.INFO)
+    if not trace_logger.hasHandlers():
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        trace_logger.addHandler(handler)
+    trace_logger.info(json.dumps(current, default=str))
+
+@contextmanager
+def trace(name: str, **attrs):
+    """Open a trace for one request; the trace dict is yielded so callers can annotate it."""
+    current = {"trace_id": uuid.uuid4().hex, "name": name, "start": time.time(), **attrs, "spans": []}
+    token = _current_trace.set(current)
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current["duration_ms"] = (time.perf_counter() - start) * 1000
+        _current_trace.reset(token)
+        if settings.TRACE_LOG_ENABLED:
+            _log_trace(current)
+
+def record_span(name: str, duration: float, **attrs):
+    span_duration.observe(duration, span=name)
+    current = _current_trace.get()
+    if current is not None:
+        current["spans"].append({"name": name, "duration_ms": round(duration * 1000, 3), **attrs})
+
+@contextmanager
+def span(name: str, **attrs):
+    start = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        record_span(name, time.perf_counter() - start, **attrs)
+
+def traced(name: str, **attrs):
+    """Decorator form of span() for sync and async functions."""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, **attrs):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, **attrs):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Times LLM calls (with token usage) and prompt formatting."""
+
+    # Run in the caller's context so the current trace is visible.
+    run_inline = True
+
+    def __init__(self):
+        self._starts: dict[UUID, tuple[float, str]] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any):
+        params = kwargs.get("invocation_params") or {}
+        model = (
+            params.get("model") or params.get("model_name")
+            or (kwargs.get("metadata") or {}).get("ls_model_name") or params.get("_type", "unknown")
+        )
+        self._starts[run_id] = (time.perf_counter(), model)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any):
+        start, model = self._starts.pop(run_id, (None, "unknown"))
+        if start is None:
+            return
+        prompt_tokens = cached_tokens = completion_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                prompt_tokens += usage.get("input_tokens", 0)
+                cached_tokens += (usage.get("input_token_details") or {}).get("cache_read", 0)
+                completion_tokens += usage.get("output_tokens", 0)
+        llm_tokens.inc(prompt_tokens, model=model, type="prompt")
+        llm_tokens.inc(cached_tokens, model=model, type="prompt_cached")
+        llm_tokens.inc(completion_tokens, model=model, type="completion")
+        record_span("llm", time.perf_counter() - start, model=model, prompt_tokens=prompt_tokens,
+                    cached_prompt_tokens=cached_tokens, completion_tokens=completion_tokens)
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs: Any):
+        start, model = self._starts.pop(run_id, (None, "unknown"))
+        if start is not None:
+            record_span("llm", time.perf_counter() - start, model=model, error=type(error).__name__)
+
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, **kwargs: Any):
+        name = kwargs.get("name") or (serialized or {}).get("name")
+        if name in ("PromptTemplate", "ChatPromptTemplate"):
+            self._starts[run_id] = (time.perf_counter(), name)
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs: Any):
+        if run_id in self._starts and self._starts[run_id][1] in ("PromptTemplate", "ChatPromptTemplate"):
+            start, name = self._starts.pop(run_id)
+            record_span("prompt.format", time.perf_counter() - start, template=name)
+
+    def on_chain_error(self, error, *, run_id: UUID, **kwargs: Any):
+        self._starts.pop(run_id, None)
+
+tracing_handler = TracingCallbackHandler()
+
+def callbacks() -> list:
+    return [tracing_handler]
@@ -0,0 +1,123 @@
+# benchmarks/bench_dispatch.py
+"""Ticket dispatch simulation: event-stream throughput and batch assignment latency.
+
+Run from ai-service/ with:  python -m benchmarks.bench_dispatch [--tickets 10000,100000] [--rounds N]
+
+Synthetic tickets (app.db.memory.seed_tickets), half of them already out for
+delivery, are bulk-loaded into a DispatchEngine. Each round then replays a
+batch of webhook events through apply_events(). A batch has new tickets, then
+in-flight tickets moving along their lifecycle, dropped assignments and a few
+redelivered webhooks. Event throughput covers parsing the payloads. After the
+batch, a batch of located volunteers is assigned: each ticket, in dispatch
+order, goes to the nearest free volunteer. The assignment latency is compared
+with picking the same tickets by sorting the open tickets, and every
+assignment is checked against that sort.
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+def percentile(samples: list[float], p: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+NEXT = {"Scheduled": "InTransit", "InTransit": "Delivered", "Delivered": "Completed"}
+
+def main(args):
+    from app.db.memory import seed_tickets
+    from app.models.schemas import TicketsRow
+    from app.services.dispatch import DispatchEngine, DispatchQueue
+
+    rng = random.Random(args.seed)
+    now = datetime(2025, 3, 1, tzinfo=timezone.utc)
+    head_start = 4 * 3600.0
+    locations = {f"location-{i}": (rng.uniform(30.0, 30.6), rng.uniform(-98.0, -97.4)) for i in range(args.locations)}
+    print(
+        f"{'tickets':>8} {'build s':>8} {'events/s':>10} {'assign p50 ms':>14} "
+        f"{'assign p99 ms':>14} {'sort p50 ms':>12} {'queued':>8}"
+    )
+    for size in (int(s) for s in args.tickets.split(",")):
+        raw = seed_tickets(size, args.locations, args.seed, now)
+        # Half the tickets are already out for delivery, so the stream has lifecycles to advance.
+        for r in raw[::2]:
+            r.update(status=rng.choice(list(NEXT)), volunteer_id=f"volunteer-{rng.randrange(1000)}")
+        start = time.perf_counter()
+        engine = DispatchEngine()
+        engine.queue = DispatchQueue([TicketsRow.model_validate(r) for r in raw], urgent_head_start=head_start)
+        build = time.perf_counter() - start
+        queue = engine.queue
+        records = {r["id"]: r for r in raw}
+        in_flight = [r["id"] for r in raw if r["status"] != "Submitted"]
+        created = 0
+        event_seconds, events, assigns, sorts = 0.0, 0, [], []
+        for round_ in range(args.rounds):
+            batch = []
+            for _ in range(args.arrivals):
+                stamp = (now + timedelta(seconds=round_)).isoformat()
+                record = {
+                    **raw[0], "id": f"new-{created}", "status": "Submitted", "volunteer_id": None,
+                    "priority": "Urgent" if rng.random() < 0.25 else "Routine",
+                    "pickup_location_id": f"location-{rng.randrange(args.locations)}",
+                    "created_at": stamp, "updated_at": stamp,
+                }
+                created += 1
+                records[record["id"]] = record
+                batch.append(("INSERT", record, None))
+            # The rest of the batch advances in-flight tickets; the stream only reports real activity.
+            while len(batch) < args.batch and in_flight:
+                roll = rng.random()
+                i = rng.randrange(len(in_flight))
+                record = records[in_flight[i]]
+                if roll < 0.02:
+                    batch.append(("UPDATE", dict(record), None))  # a redelivered webhook
+                    continue
+                status = NEXT[record["status"]]
+                if record["status"] == "Scheduled" and roll < 0.05:
+                    status = "Submitted"  # the volunteer drops it
+                record = {**record, "status": status, "volunteer_id": None if status == "Submitted" else record["volunteer_id"]}
+                records[record["id"]] = record
+                if status in ("Submitted", "Completed"):
+                    in_flight[i] = in_flight[-1]
+                    in_flight.pop()
+                batch.append(("UPDATE", record, None))
+            t0 = time.perf_counter()
+            asyncio.run(engine.apply_events(batch))
+            event_seconds += time.perf_counter() - t0
+            events += len(batch)
+
+            volunteers = {f"volunteer-{round_}-{j}": rng.choice(list(locations.values())) for j in range(args.volunteers)}
+            expected = None
+            if round_ < args.sort_rounds:
+                t0 = time.perf_counter()
+                open_tickets = [t for t in queue.tickets.values() if t.status == "Submitted"]
+                key = lambda t: (t.created - (head_start if t.priority == "Urgent" else 0.0), t.id)
+                expected = [t.id for t in sorted(open_tickets, key=key)[:args.volunteers]]
+                sorts.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            scheduled = queue.assign(list(volunteers), locations, volunteers)
+            assigns.append(time.perf_counter() - t0)
+            if expected is not None:
+                assert [t.id for t in scheduled] == expected, "queue and sort disagree"
+            for ticket in scheduled:
+                records[ticket.id] = {**records[ticket.id], "status": "Scheduled", "volunteer_id": ticket.volunteer_id}
+                in_flight.append(ticket.id)
+        queued = sum(queue.stats()["queued"].values())
+        print(
+            f"{size:>8} {build:>8.2f} {events / event_seconds:>10.0f} "
+            f"{percentile(assigns, 0.5) * 1000:>14.3f} {percentile(assigns, 0.99) * 1000:>14.3f} "
+            f"{percentile(sorts, 0.5) * 1000:>12.1f} {queued:>8}"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tickets", default="10000,100000")
+    parser.add_argument("--locations", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=1000, help="most events per round")
+    parser.add_argument("--arrivals", type=int, default=100, help="new tickets per round")
+    parser.add_argument("--volunteers", type=int, default=100, help="volunteers assigned per round")
+    parser.add_argument("--sort-rounds", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
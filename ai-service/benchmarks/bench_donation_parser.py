@@ -0,0 +1,52 @@
+# benchmarks/bench_donation_parser.py
+"""Compare latency of the rule-based fast path and the LLM path for /donation/parse.
+
+Run from ai-service/ with:  python -m benchmarks.bench_donation_parser [--llm-samples N]
+The LLM half uses the large-tier donation chain, so it needs a working OPENAI_API_KEY;
+pass --llm-samples 0 to time only the fast path.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime
+from app.services import donation_parser
+from benchmarks.corpus import DONATION_CORPUS
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def report(name, samples):
+    print(
+        f"{name:<10} n={len(samples):<6} p50={percentile(samples, 50) * 1000:9.3f} ms  "
+        f"p95={percentile(samples, 95) * 1000:9.3f} ms  mean={statistics.mean(samples) * 1000:9.3f} ms"
+    )
+
+async def main(rounds: int, llm_samples: int):
+    current_date = datetime.now().strftime("%Y-%m-%d")
+    hits = [text for text in DONATION_CORPUS if donation_parser.extract_donation_fast(text, current_date)]
+    print(f"fast-path hit rate: {len(hits)}/{len(DONATION_CORPUS)} ({len(hits) / len(DONATION_CORPUS):.0%})")
+
+    fast = []
+    for _ in range(rounds):
+        for text in DONATION_CORPUS:
+            start = time.perf_counter()
+            donation_parser.extract_donation_fast(text, current_date)
+            fast.append(time.perf_counter() - start)
+    report("fast path", fast)
+
+    llm = []
+    for text in DONATION_CORPUS[:llm_samples]:
+        start = time.perf_counter()
+        await donation_parser.get_donation_chain().ainvoke(input={"text": text, "current_date": current_date})
+        llm.append(time.perf_counter() - start)
+    if llm:
+        report("llm", llm)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--llm-samples", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.rounds, args.llm_samples))
@@ -0,0 +1,120 @@
+# benchmarks/bench_endpoints.py
+"""Throughput and latency percentiles for each endpoint under concurrent load.
+
+Run from ai-service/ with:  python -m benchmarks.bench_endpoints [options]
+
+By default the app runs in-process on the fake LLM and in-memory database
+(LLM_BACKEND=fake, DB_BACKEND=memory), so the numbers are the service's own
+overhead plus the injected --llm-latency. Pass --base-url to load a running
+server instead. Use --json to write results that can be diffed run-to-run.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+import httpx
+
+def scenarios():
+    """(name, method, path, request kwargs factory) for each benchmarked endpoint."""
+    def agent_config():
+        return {"configurable": {"thread_id": f"bench-{uuid.uuid4().hex[:8]}", "checkpoint_ns": ""}}
+
+    return [
+        ("chat_send", "POST", "/chat/send",
+         lambda i: {"params": {"session_id": f"bench-{i % 50}", "message": "How do I schedule a pickup?"}}),
+        ("chat_stream", "POST", "/chat/stream",
+         lambda i: {"params": {"session_id": f"bench-stream-{i % 50}", "message": "How do I schedule a pickup?"}}),
+        ("donation_parse_llm", "POST", "/donation/parse",
+         lambda i: {"json": {"text": f"Leftover catering from event {i}, about 40 meals", "bypass_cache": True}}),
+        ("donation_parse_fast", "POST", "/donation/parse",
+         lambda i: {"json": {"text": "20 loaves of bread, pick up tomorrow morning"}}),
+        ("donation_parse_batch", "POST", "/donation/parse/batch",
+         lambda i: {"json": {"texts": [f"Batch {i} item {j}: assorted groceries" for j in range(10)], "bypass_cache": True}}),
+        ("agent_send", "POST", "/agent/send",
+         lambda i: {"json": {"message": "Hello, how are you?", "config": agent_config()}}),
+        ("agent_send_tool", "POST", "/agent/send",
+         lambda i: {"json": {"message": "Could you open the dashboard for me?", "config": agent_config()}}),
+        ("agent_send_routed", "POST", "/agent/send",
+         lambda i: {"json": {"message": "Take me to the dashboard", "config": agent_config()}}),
+    ]
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+async def run_scenario(client, method, path, make_request, requests, concurrency):
+    latencies, errors = [], 0
+    queue = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in queue:
+            start = time.perf_counter()
+            response = await client.request(method, path, **make_request(i))
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": requests / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+async def main(args):
+    if args.base_url:
+        transport, base_url = None, args.base_url
+    else:
+        # Settings are read lazily, so the fake backends can be selected before first use.
+        os.environ.update({
+            "LLM_BACKEND": "fake",
+            "DB_BACKEND": "memory",
+            "FAKE_LLM_LATENCY": str(args.llm_latency),
+            "FAKE_LLM_JITTER": str(args.llm_jitter),
+            "FAKE_LLM_TAIL_PROBABILITY": str(args.llm_tail_probability),
+            "FAKE_LLM_TAIL_LATENCY": str(args.llm_tail_latency),
+            "FAKE_LLM_FAILURE_RATE": str(args.llm_failure_rate),
+            "HEDGING_ENABLED": str(args.hedging),
+            "FAKE_DB_LATENCY": str(args.db_latency),
+        })
+        from app.main import app
+
+        transport, base_url = httpx.ASGITransport(app=app), "http://bench"
+
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=120) as client:
+        for name, method, path, make_request in scenarios():
+            if args.only and name not in args.only:
+                continue
+            results[name] = await run_scenario(client, method, path, make_request, args.requests, args.concurrency)
+            r = results[name]
+            print(f"{name:<22} {r['throughput_rps']:9.1f} req/s  p50 {r['p50_ms']:8.2f} ms  "
+                  f"p95 {r['p95_ms']:8.2f} ms  p99 {r['p99_ms']:8.2f} ms  errors {r['errors']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--llm-jitter", type=float, default=0.0)
+    parser.add_argument("--llm-tail-probability", type=float, default=0.0)
+    parser.add_argument("--llm-tail-latency", type=float, default=0.0)
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0)
+    parser.add_argument("--hedging", action="store_true")
+    parser.add_argument("--db-latency", type=float, default=0.0)
+    parser.add_argument("--only", nargs="*")
+    parser.add_argument("--base-url")
+    parser.add_argument("--json")
+    asyncio.run(main(parser.parse_args()))
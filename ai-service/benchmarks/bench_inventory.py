@@ -0,0 +1,79 @@
+# benchmarks/bench_inventory.py
+"""Expiring-inventory queries and status transitions: heap index vs a table scan.
+
+Run from ai-service/ with:  python -m benchmarks.bench_inventory [--items 10000,100000] [--queries N]
+
+Synthetic inventory rows (app.db.memory.seed_inventory) are bulk-loaded into
+an InventoryIndex. "Top 20 expiring within 48 hours" queries, across all
+partners and for one partner, are timed against filtering and sorting the
+rows, and every answer is checked against the scan. Reserve/release
+transitions are then timed.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timezone
+
+def percentile(samples: list[float], p: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+def main(args):
+    from app.db.memory import seed_inventory
+    from app.models.schemas import InventoryRow
+    from app.services.inventory import InventoryIndex
+
+    rng = random.Random(args.seed)
+    now = datetime(2025, 3, 1, tzinfo=timezone.utc)
+    print(f"{'items':>8} {'build s':>8} {'query':>8} {'p50 ms':>8} {'p99 ms':>8} {'scan p50 ms':>12} {'transition us':>14}")
+    for size in (int(s) for s in args.items.split(",")):
+        rows = [InventoryRow.model_validate(r) for r in seed_inventory(size, args.partners, args.seed, now)]
+        start = time.perf_counter()
+        index = InventoryIndex(rows)
+        build = time.perf_counter() - start
+        horizon = now.timestamp() + args.hours * 3600
+
+        def scan(partner):
+            kept = [
+                r for r in rows
+                if r.status == "Available" and now.timestamp() <= r.expiration_date.timestamp() <= horizon
+                and partner in (None, r.partner_org_id)
+            ]
+            return [r.id for r in sorted(kept, key=lambda r: r.expiration_date)[:args.limit]]
+
+        for name in ("all", "partner"):
+            latencies, scans = [], []
+            for i in range(args.queries):
+                partner = f"partner-{rng.randrange(args.partners)}" if name == "partner" else None
+                t0 = time.perf_counter()
+                found = index.expiring(args.hours, args.limit, partner, now=now.timestamp())
+                latencies.append(time.perf_counter() - t0)
+                if i < args.scan_queries:
+                    t0 = time.perf_counter()
+                    expected = scan(partner)
+                    scans.append(time.perf_counter() - t0)
+                    assert [item.id for item in found] == expected, "index and scan disagree"
+            transition = ""
+            if name == "partner":
+                available = [r for r in rows if r.status == "Available"]
+                t0 = time.perf_counter()
+                for r in rng.sample(available, min(args.transitions, len(available))):
+                    index.upsert(r.model_copy(update={"status": "Reserved"}))
+                    index.upsert(r)
+                transition = f"{(time.perf_counter() - t0) / (2 * min(args.transitions, len(available))) * 1e6:.1f}"
+            print(
+                f"{size:>8} {build:>8.2f} {name:>8} {percentile(latencies, 0.5) * 1000:>8.3f} "
+                f"{percentile(latencies, 0.99) * 1000:>8.3f} {percentile(scans, 0.5) * 1000:>12.1f} {transition:>14}"
+            )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", default="10000,100000")
+    parser.add_argument("--partners", type=int, default=50)
+    parser.add_argument("--hours", type=float, default=48)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--scan-queries", type=int, default=10)
+    parser.add_argument("--transitions", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
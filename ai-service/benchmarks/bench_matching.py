@@ -0,0 +1,84 @@
+# benchmarks/bench_matching.py
+"""Eligible-volunteer query latency: matching indexes vs a scan of the rows.
+
+Run from ai-service/ with:  python -m benchmarks.bench_matching [--volunteers 10000,50000] [--queries N]
+
+Synthetic volunteer tables (app.db.memory.seed_volunteer_tables) are loaded
+into a MatchingIndex. Random one-to-three-hour pickup windows, half with a
+zone and a third with a handling requirement, are answered by the index
+(MatchingIndex.match: count and positions of every match) and by a plain
+Python scan over the same rows, and the answers are compared.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+def percentile(samples: list[float], p: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+def scan(rows, query, matching) -> list[str]:
+    volunteers, times, zones, skills = rows
+    a = matching.minute_of_week(query.window_start)
+    b = a + int((query.window_end - query.window_start) / timedelta(minutes=1))
+    available = {
+        r.volunteer_id for r in times
+        if r.day_of_week * 1440 + matching.minute_of_day(r.start_time) <= a
+        and r.day_of_week * 1440 + matching.minute_of_day(r.end_time) >= b
+    }
+    if query.zone:
+        available &= {r.volunteer_id for r in zones if matching.normalize(r.zone) == matching.normalize(query.zone)}
+    for requirement in query.handling:
+        skill_names, vehicle_types = matching.HANDLING[requirement]
+        available &= {r.volunteer_id for r in skills if matching.normalize(r.skill) in skill_names} | {
+            v.id for v in volunteers if v.vehicle_type and matching.normalize(v.vehicle_type) in vehicle_types
+        }
+    return [v.id for v in volunteers if v.id in available]
+
+def main(args):
+    from app.db.memory import ZONES, seed_volunteer_tables
+    from app.db.queries import TABLE_MODELS
+    from app.services import matching
+
+    rng = random.Random(args.seed)
+    sunday = datetime(2025, 1, 5)
+    print(f"{'volunteers':>10} {'build s':>8} {'p50 ms':>8} {'p99 ms':>8} {'scan p50 ms':>12} {'avg matches':>12}")
+    for size in (int(s) for s in args.volunteers.split(",")):
+        tables = seed_volunteer_tables(size, seed=args.seed)
+        rows = [[TABLE_MODELS[t].model_validate(r) for r in tables[t]] for t in matching.TABLES]
+        start = time.perf_counter()
+        index = matching.MatchingIndex(*rows)
+        build = time.perf_counter() - start
+        queries = []
+        for _ in range(args.queries):
+            window_start = sunday + timedelta(days=rng.randrange(7), hours=rng.randint(7, 20))
+            queries.append(matching.MatchQuery(
+                window_start, window_start + timedelta(hours=rng.randint(1, 3)),
+                zone=rng.choice(ZONES) if rng.random() < 0.5 else None,
+                handling=[rng.choice(list(matching.HANDLING))] if rng.random() < 0.33 else [],
+            ))
+        latencies, matches = [], 0
+        for query in queries:
+            start = time.perf_counter()
+            found = index.match(query)
+            latencies.append(time.perf_counter() - start)
+            matches += len(found)
+        scans = []
+        for query in queries[:args.scan_queries]:
+            start = time.perf_counter()
+            expected = scan(rows, query, matching)
+            scans.append(time.perf_counter() - start)
+            assert expected == index.eligible(query), "index and scan disagree"
+        print(
+            f"{size:>10} {build:>8.2f} {percentile(latencies, 0.5) * 1000:>8.3f} {percentile(latencies, 0.99) * 1000:>8.3f} "
+            f"{percentile(scans, 0.5) * 1000:>12.1f} {matches / len(queries):>12.0f}"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--volunteers", default="1000,10000,50000")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--scan-queries", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
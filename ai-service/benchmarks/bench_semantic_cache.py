@@ -0,0 +1,85 @@
+# benchmarks/bench_semantic_cache.py
+"""Semantic cache lookup latency, index memory, hit rate and approximate recall.
+
+Run from ai-service/ with:  python -m benchmarks.bench_semantic_cache [--sizes 1000,10000,100000] [--lookups N]
+
+The cache is filled with synthetic support questions (random topic words
+inside question templates) up to each size. At each size, paraphrases of a
+fixed set of stored questions are looked up with exact and with approximate
+(IVF) search. Hit rate is the share of paraphrases answered from the cache,
+recall the share of approximate results that match the exact search.
+"""
+import argparse
+import random
+import time
+
+ASKS = ["How do I {}?", "how can I {}", "hi, how do I {} please", "How to {}?", "can I {}?"]
+TASKS = [
+    "schedule a pickup", "cancel a pickup", "change my pickup window", "donate fresh produce",
+    "donate prepared meals", "sign up to volunteer", "find a partner agency", "update my profile",
+    "report a food safety issue", "see my donation history", "add a new location", "reset my password",
+]
+WORDS = (
+    "bread apples dairy frozen meals shelf route driver window warehouse pantry shelter label "
+    "receipt tax invoice badge shift training cooler truck van pallet box crate bakery store "
+    "school church event catering surplus expiry allergen weekend holiday morning evening"
+).split()
+
+def filler(rng: random.Random) -> str:
+    return rng.choice(ASKS).format(" ".join(rng.sample(WORDS, rng.randint(2, 4))))
+
+def percentile(samples: list[float], p: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+def main(args):
+    from app.config import settings
+    from app.services.semantic_cache import HashingEmbedder, SemanticCache
+
+    rng = random.Random(args.seed)
+    sizes = sorted(int(s) for s in args.sizes.split(","))
+    # The local embedder keeps the run offline; this measures the index, not an embedding API.
+    dimensions = settings.SEMANTIC_CACHE_DIMENSIONS
+    cache = SemanticCache(dimensions, max(sizes) + len(TASKS), HashingEmbedder(dimensions))
+    embedder, index = cache.embedder, cache.index
+    scope = cache.scope("chat", "Donor")
+
+    def store(query: str, answer: str):
+        index.add(embedder.embed(query), scope, answer, settings.SEMANTIC_CACHE_TTL_SECONDS)
+
+    for task in TASKS:
+        store(ASKS[0].format(task), f"answer: {task}")
+    queries = [(rng.choice(ASKS[1:]).format(task), task) for task in rng.choices(TASKS, k=args.lookups)]
+
+    print(f"{'entries':>8} {'mode':>7} {'p50 ms':>8} {'p99 ms':>8} {'hit rate':>9} {'recall':>7} {'index MB':>9}")
+    for size in sizes:
+        while index.size < size:
+            store(filler(rng), "filler")
+        # Below SEMANTIC_CACHE_APPROX_MIN_ENTRIES the cache only searches exactly; train anyway to compare.
+        if index.centroids is None and size >= 10 * settings.SEMANTIC_CACHE_NLIST * settings.SEMANTIC_CACHE_NPROBE:
+            index.train()
+        results = {}
+        for approximate in (False, True):
+            if approximate and index.centroids is None:
+                continue
+            latencies, hits, found = [], 0, []
+            for query, task in queries:
+                start = time.perf_counter()
+                score, answer = index.search(embedder.embed(query), scope, approximate=approximate)
+                latencies.append(time.perf_counter() - start)
+                found.append(answer)
+                hits += score >= settings.SEMANTIC_CACHE_THRESHOLD and answer == f"answer: {task}"
+            results[approximate] = found
+            recall = sum(a == b for a, b in zip(found, results[False])) / len(found)
+            print(
+                f"{index.size:>8} {'approx' if approximate else 'exact':>7} {percentile(latencies, 0.5) * 1000:>8.3f} "
+                f"{percentile(latencies, 0.99) * 1000:>8.3f} {hits / len(queries):>9.1%} {recall:>7.1%} "
+                f"{index.nbytes() / 1e6:>9.1f}"
+            )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--lookups", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
@@ -0,0 +1,96 @@
+# benchmarks/bench_spatial.py
+"""k-nearest and radius query latency: grid index vs a brute-force haversine scan.
+
+Run from ai-service/ with:  python -m benchmarks.bench_spatial [--locations 100000] [--queries N] [--k 10]
+
+Points are spread over a metro-sized area (Austin, about 70 x 70 km), with
+half of them in a few dense clusters. Both methods compute vectorized
+haversine distances. The scan scores every point, and every index answer
+is checked against it.
+"""
+import argparse
+import time
+import numpy as np
+
+def percentile(samples: list[float], p: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+def synthetic_points(n: int, rng: np.random.Generator) -> list[tuple[str, float, float, float]]:
+    uniform = n // 2
+    lats = np.concatenate([rng.uniform(29.95, 30.6, uniform), np.zeros(n - uniform)])
+    lons = np.concatenate([rng.uniform(-98.1, -97.4, uniform), np.zeros(n - uniform)])
+    centres = rng.uniform([30.1, -97.9], [30.45, -97.6], (8, 2))
+    picks = rng.integers(0, len(centres), n - uniform)
+    lats[uniform:] = centres[picks, 0] + rng.normal(0, 0.01, n - uniform)
+    lons[uniform:] = centres[picks, 1] + rng.normal(0, 0.01, n - uniform)
+    spare = rng.integers(0, 500, n).astype(float)
+    return [(f"location-{i}", float(lats[i]), float(lons[i]), float(spare[i])) for i in range(n)]
+
+def main(args):
+    from app.services.spatial import SpatialIndex, haversine_km
+
+    rng = np.random.default_rng(args.seed)
+    points = synthetic_points(args.locations, rng)
+    lats = np.array([p[1] for p in points])
+    lons = np.array([p[2] for p in points])
+    spare = np.array([p[3] for p in points])
+    start = time.perf_counter()
+    index = SpatialIndex.build(points)
+    print(f"{args.locations} locations, built in {time.perf_counter() - start:.2f}s, cell {index.cell:.4f} deg")
+
+    origins = rng.uniform([30.0, -98.05], [30.55, -97.45], (args.queries, 2))
+    cases = [
+        ("knn", lambda lat, lon: index.nearest(lat, lon, args.k), None),
+        ("knn spare>=400", lambda lat, lon: index.nearest(lat, lon, args.k, 400.0), 400.0),
+    ]
+    print(f"{'query':>16} {'index p50 ms':>13} {'index p99 ms':>13} {'scan p50 ms':>12} {'speedup':>8}")
+    for name, query, min_value in cases:
+        indexed, scanned = [], []
+        for lat, lon in origins:
+            t0 = time.perf_counter()
+            result = query(lat, lon)
+            t1 = time.perf_counter()
+            distances = haversine_km(lat, lon, lats, lons)
+            if min_value is not None:
+                distances = np.where(spare >= min_value, distances, np.inf)
+            nearest = np.argpartition(distances, args.k)[:args.k]
+            expected = nearest[np.argsort(distances[nearest])]
+            t2 = time.perf_counter()
+            indexed.append(t1 - t0)
+            scanned.append(t2 - t1)
+            assert [r["id"] for r in result] == [points[i][0] for i in expected], "index and scan disagree"
+        p50, scan_p50 = percentile(indexed, 0.5), percentile(scanned, 0.5)
+        print(f"{name:>16} {p50 * 1000:>13.3f} {percentile(indexed, 0.99) * 1000:>13.3f} {scan_p50 * 1000:>12.3f} {scan_p50 / p50:>7.1f}x")
+
+    indexed, scanned = [], []
+    for lat, lon in origins:
+        t0 = time.perf_counter()
+        result = index.within(lat, lon, args.radius_km)
+        t1 = time.perf_counter()
+        distances = haversine_km(lat, lon, lats, lons)
+        inside = np.flatnonzero(distances <= args.radius_km)
+        t2 = time.perf_counter()
+        indexed.append(t1 - t0)
+        scanned.append(t2 - t1)
+        assert len(result) == len(inside), "index and scan disagree"
+    p50, scan_p50 = percentile(indexed, 0.5), percentile(scanned, 0.5)
+    name = f"within {args.radius_km:g} km"
+    print(f"{name:>16} {p50 * 1000:>13.3f} {percentile(indexed, 0.99) * 1000:>13.3f} {scan_p50 * 1000:>12.3f} {scan_p50 / p50:>7.1f}x")
+
+    start = time.perf_counter()
+    for i in range(args.updates):
+        point_id, lat, lon, value = points[i % len(points)]
+        index.upsert(point_id, lat + 0.001, lon - 0.001, value)
+    elapsed = time.perf_counter() - start
+    print(f"{args.updates} incremental updates: {elapsed / args.updates * 1e6:.1f} us each")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--locations", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--radius-km", type=float, default=2.0)
+    parser.add_argument("--updates", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
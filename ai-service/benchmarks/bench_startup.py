@@ -0,0 +1,36 @@
+# benchmarks/bench_startup.py
+"""Measure the cost of importing app.main in a fresh interpreter.
+
+Run from ai-service/ with:  python -m benchmarks.bench_startup [--runs N]
+Secrets are stripped from the environment to confirm that importing the app
+neither reads Settings nor builds any client.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+SNIPPET = (
+    "import time; start = time.perf_counter(); import app.main; "
+    "print(time.perf_counter() - start)"
+)
+SECRETS = ("OPENAI_API_KEY", "SUPABASE_URL", "SUPABASE_ANON_KEY", "SUPABASE_SERVICE_ROLE_KEY")
+
+def measure(runs: int) -> list[float]:
+    env = {k: v for k, v in os.environ.items() if k not in SECRETS}
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-W", "ignore", "-c", SNIPPET], env=env, capture_output=True, text=True, check=True
+        )
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return samples
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    samples = measure(args.runs)
+    print(f"import app.main: median {statistics.median(samples) * 1000:.0f} ms, "
+          f"min {min(samples) * 1000:.0f} ms over {len(samples)} runs")
@@ -0,0 +1,63 @@
+# benchmarks/bench_tool_output.py
+"""Prompt tokens per agent turn with raw vs compacted tool output.
+
+Run from ai-service/ with:  python -m benchmarks.bench_tool_output [--partners N] [--turns N]
+
+A multi-turn agent thread runs on the fake LLM and in-memory database. The
+first turn lists partners through crud_tool; every later turn resends that
+tool result as part of the thread, so its size shows up in each turn's
+prompt tokens. Token counts use the fake model's ~4 characters per token.
+"""
+import argparse
+import asyncio
+import os
+import uuid
+
+TURNS = [
+    "List partner organizations",
+    "Thanks, which one is closest to downtown?",
+    "How do I schedule a pickup?",
+    "And what time do drivers usually arrive?",
+    "Great, thank you!",
+]
+
+async def run_thread(turns: list[str]) -> list[int]:
+    from app import telemetry
+    from app.services import agent
+
+    config = {"configurable": {"thread_id": f"bench-{uuid.uuid4().hex[:8]}", "checkpoint_ns": ""}}
+    prompt_tokens = []
+    for message in turns:
+        with telemetry.trace("bench") as current:
+            await agent.get_agent_response(message, config)
+        prompt_tokens.append(sum(s.get("prompt_tokens", 0) for s in current["spans"] if s["name"] == "llm"))
+    return prompt_tokens
+
+async def main(args):
+    os.environ.update({"LLM_BACKEND": "fake", "DB_BACKEND": "memory"})
+    from app.config import settings
+    from app.db import connection, reference
+    from app.db.memory import MemorySupabase, seed_tables
+
+    # Measure the ReAct path; the intent router would answer the first turn directly.
+    settings.INTENT_ROUTER_ENABLED = False
+    connection._async_supabase = MemorySupabase(seed_tables(partners=args.partners))
+    turns = (TURNS * (args.turns // len(TURNS) + 1))[:args.turns]
+    results = {}
+    for compact in (False, True):
+        settings.TOOL_OUTPUT_COMPACTION_ENABLED = compact
+        reference.invalidate()
+        results["compact" if compact else "raw"] = await run_thread(turns)
+
+    print(f"{args.partners} partners, {args.turns} turns (prompt tokens per turn)")
+    print(f"{'turn':>4} {'raw':>8} {'compact':>8} {'saved':>7}")
+    for i, (raw, compact) in enumerate(zip(results["raw"], results["compact"]), 1):
+        print(f"{i:>4} {raw:>8} {compact:>8} {1 - compact / raw:>7.0%}")
+    raw_total, compact_total = sum(results["raw"]), sum(results["compact"])
+    print(f"total {raw_total:>7} {compact_total:>8} {1 - compact_total / raw_total:>7.0%}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--partners", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=5)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,30 @@
+# benchmarks/corpus.py
+# Sample donor inputs used by the donation parser benchmarks.
+
+DONATION_CORPUS = [
+    "50 pounds of apples tomorrow morning",
+    "20 loaves of bread, pick up tomorrow morning",
+    "30 servings of lasagna tonight, keep cold",
+    "5 boxes of canned beans, heavy, tomorrow evening",
+    "12 trays of sandwiches today afternoon",
+    "40 lbs of potatoes, pick up tomorrow afternoon",
+    "15 kg of carrots tomorrow morning",
+    "25 bags of rice, bulk, tomorrow morning",
+    "60 bagels, pick up today evening",
+    "8 crates of tomatoes tomorrow morning, delicate",
+    "100 servings of soup tonight, keep cold",
+    "3 cases of pasta tomorrow afternoon",
+    "18 loaves of sourdough bread today afternoon",
+    "10 kg of frozen chicken thighs today afternoon",
+    "Leftover catering from our event: roughly 40 meals of chicken and rice, can be picked up between 6 and 9pm",
+    "We have some extra produce, maybe 20 pounds or so, available Friday",
+    "2 pallets of bottled water and 30 boxes of cereal next Monday morning",
+    "A few dozen pastries, not refrigerated, please come before noon",
+    "Frozen pizzas - 24 of them - in our freezer, pick up anytime tomorrow",
+    "35 pounds of bananas tomorrow morning",
+    "6 jars of peanut butter tomorrow evening",
+    "45 meals of prepared stew tonight",
+    "9 boxes of cookies, fragile, tomorrow afternoon",
+    "70 lbs of onions tomorrow morning, heavy",
+    "Fresh strawberries, about 12 pounds, chilled, pick up today at 2:30",
+]
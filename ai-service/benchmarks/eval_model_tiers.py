@@ -0,0 +1,114 @@
+# benchmarks/eval_model_tiers.py
+"""Offline quality check of donation parsing per model tier.
+
+Run from ai-service/ with:  python -m benchmarks.eval_model_tiers [--tiers small large routed]
+
+Each recorded donation in benchmarks/recorded_donations.json is parsed by
+the small tier, the large tier and the router ("routed", including
+escalation), and scored field by field against its labelled result. Fields
+missing from a label are too ambiguous to score and are skipped. Prints
+accuracy, exact-match rate, mean latency and estimated cost per mode; with
+--min-accuracy the exit status is non-zero when the routed mode falls short.
+Use --record to refresh the labels from the large tier (review the diff).
+Needs a working OPENAI_API_KEY unless LLM_BACKEND=fake.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from app.services import donation_parser, model_router
+
+RECORDED = Path(__file__).with_name("recorded_donations.json")
+
+def flatten(value: dict, prefix: str = "") -> dict:
+    fields = {}
+    for key, item in value.items():
+        if isinstance(item, dict):
+            fields.update(flatten(item, f"{prefix}{key}."))
+        else:
+            fields[f"{prefix}{key}"] = item
+    return fields
+
+def same(expected, actual) -> bool:
+    if isinstance(expected, (int, float)) and not isinstance(expected, bool):
+        return isinstance(actual, (int, float)) and abs(expected - actual) < 1e-6
+    if isinstance(expected, str) and expected[:4].isdigit():
+        try:
+            return datetime.fromisoformat(expected) == datetime.fromisoformat(actual).replace(tzinfo=None)
+        except (TypeError, ValueError):
+            return False
+    return expected == actual
+
+def score(expected: dict, actual: dict | None) -> tuple[int, int]:
+    expected, actual = flatten(expected), flatten(actual or {})
+    return sum(same(value, actual.get(field)) for field, value in expected.items()), len(expected)
+
+def total_cost() -> float:
+    return sum(tier["cost_usd"] for tier in model_router.get_tier_stats().get("donation", {}).values())
+
+async def parse(mode: str, inputs: dict) -> dict | None:
+    try:
+        if mode == "routed":
+            details = await donation_parser._invoke_routed(inputs)
+        else:
+            details = await donation_parser._invoke_tier(mode, inputs)
+    except Exception:
+        return None
+    return details.model_dump()
+
+async def evaluate(mode: str, records: list[dict]) -> dict:
+    correct = fields = exact = 0
+    latencies = []
+    cost_before = total_cost()
+    for record in records:
+        start = time.perf_counter()
+        actual = await parse(mode, {"text": record["text"], "current_date": record["current_date"]})
+        latencies.append(time.perf_counter() - start)
+        right, scored = score(record["expected"], actual)
+        correct, fields, exact = correct + right, fields + scored, exact + (right == scored)
+    return {
+        "accuracy": correct / fields,
+        "exact": exact / len(records),
+        "mean_latency_ms": sum(latencies) / len(latencies) * 1000,
+        "cost_usd": total_cost() - cost_before,
+    }
+
+async def record(path: Path):
+    from benchmarks.corpus import DONATION_CORPUS
+
+    current_date = datetime.now().strftime("%Y-%m-%d")
+    records = []
+    for text in DONATION_CORPUS:
+        actual = await parse(model_router.LARGE, {"text": text, "current_date": current_date})
+        if actual is not None:
+            actual.pop("notes", None)
+            records.append({"text": text, "current_date": current_date, "expected": actual})
+    path.write_text("[\n" + ",\n".join("  " + json.dumps(r) for r in records) + "\n]\n")
+    print(f"recorded {len(records)} labels to {path}")
+
+async def main(args) -> int:
+    if args.record:
+        await record(Path(args.record))
+        return 0
+    records = json.loads(RECORDED.read_text())
+    print(f"{len(records)} recorded donations")
+    print(f"{'mode':<8} {'accuracy':>9} {'exact':>7} {'latency':>11} {'cost':>11}")
+    results = {}
+    for mode in args.tiers:
+        results[mode] = result = await evaluate(mode, records)
+        print(f"{mode:<8} {result['accuracy']:>9.1%} {result['exact']:>7.1%} "
+              f"{result['mean_latency_ms']:>8.0f} ms {result['cost_usd']:>10.5f}$")
+    if args.min_accuracy is not None and "routed" in results and results["routed"]["accuracy"] < args.min_accuracy:
+        print(f"routed accuracy below {args.min_accuracy:.0%}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tiers", nargs="+", default=["small", "large", "routed"], choices=["small", "large", "routed"])
+    parser.add_argument("--min-accuracy", type=float)
+    parser.add_argument("--record", metavar="PATH", help="write large-tier outputs for the corpus as new labels")
+    sys.exit(asyncio.run(main(parser.parse_args())))
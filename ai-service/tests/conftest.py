@@ -0,0 +1,7 @@
+# tests/conftest.py
+import os
+
+# The suite runs offline: fake LLM and in-memory database, so no API keys are needed.
+# Set before anything reads app.config.settings, which is loaded lazily on first use.
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("DB_BACKEND", "memory")
@@ -0,0 +1,154 @@
+import asyncio
+import time
+import pytest
+from langchain_core.tools import tool
+from fastapi.testclient import TestClient
+from langgraph.prebuilt import create_react_agent
+from app.config import settings
+from app.main import app
+from app.models.schemas import DonationDetails
+from app.services import agent, breaker, chat, donation_parser, intent_router, model_router
+from app.services.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen
+from app.services.cache import LRUCache, ResultCache
+from app.services.checkpointer import BoundedMemorySaver
+from app.services.fake_llm import FakeChatModel, FakeUpstreamError
+from app.services.history import MemoryHistoryStore
+
+client = TestClient(app)
+
+class RateLimitError(Exception):
+    status_code = 429
+
+@pytest.fixture(autouse=True)
+def fresh_breakers(monkeypatch):
+    monkeypatch.setattr(breaker, "breakers", {})
+    monkeypatch.setattr(settings, "BREAKER_MIN_CALLS", 4)
+    monkeypatch.setattr(settings, "BREAKER_OPEN_SECONDS", 30.0)
+
+def trip(circuit: CircuitBreaker):
+    for _ in range(settings.BREAKER_MIN_CALLS):
+        circuit.check()
+        circuit.record(0.01, FakeUpstreamError())
+
+def test_breaker_opens_on_errors_and_recovers_through_a_probe(monkeypatch):
+    monkeypatch.setattr(settings, "BREAKER_OPEN_SECONDS", 0.05)
+    circuit = CircuitBreaker("m")
+    circuit.record(0.01)
+    circuit.record(0.01, FakeUpstreamError())
+    circuit.record(0.01)
+    assert circuit.state == CLOSED
+    circuit.record(0.01, FakeUpstreamError())
+    assert circuit.state == OPEN
+    with pytest.raises(CircuitOpen):
+        circuit.check()
+    time.sleep(0.06)
+    circuit.check()
+    assert circuit.state == HALF_OPEN
+    # Only one probe at a time.
+    with pytest.raises(CircuitOpen):
+        circuit.check()
+    circuit.record(0.01)
+    assert circuit.state == CLOSED and circuit.stats()["rejected"] == 2
+
+def test_failed_probe_reopens_and_slow_calls_count_as_failures(monkeypatch):
+    monkeypatch.setattr(settings, "BREAKER_SLOW_CALL_SECONDS", 1.0)
+    monkeypatch.setattr(settings, "BREAKER_OPEN_SECONDS", 0.05)
+    circuit = CircuitBreaker("m")
+    for _ in range(4):
+        circuit.record(2.0)
+    assert circuit.state == OPEN
+    time.sleep(0.06)
+    circuit.check()
+    circuit.record(0.01, TimeoutError())
+    assert circuit.state == OPEN
+
+def test_rate_limits_and_bad_output_do_not_trip_the_breaker():
+    circuit = CircuitBreaker("m")
+    for error in [RateLimitError(), ValueError("invalid output")] * 4:
+        circuit.record(0.01, error)
+    assert circuit.state == CLOSED and circuit.stats()["window_calls"] == 0
+
+def test_open_circuit_fails_fast_with_503(monkeypatch):
+    model = FakeChatModel(failure_rate=1.0)
+    monkeypatch.setattr(chat, "chat_models", {"small": model, "large": model})
+    monkeypatch.setattr(chat, "history_store", MemoryHistoryStore(max_sessions=10, ttl_seconds=60))
+    statuses = [client.post("/chat/send", params={"session_id": "s", "message": "hi"}).status_code for _ in range(6)]
+    assert statuses == [500] * 4 + [503] * 2
+    assert model.calls == 4
+    response = client.post("/chat/send", params={"session_id": "s", "message": "hi"})
+    assert response.headers["Retry-After"] == "30"
+    body = client.get("/metrics").text
+    assert 'helphut_circuit_state{model="gpt-4o-mini"} 2.0' in body
+    assert client.get("/metrics/breakers").json()["breakers"]["gpt-4o-mini"]["state"] == OPEN
+
+def test_donations_degrade_to_local_rules_while_open(monkeypatch):
+    model = FakeChatModel(failure_rate=1.0)
+    chain = donation_parser.prompt | model.with_structured_output(DonationDetails)
+    monkeypatch.setattr(donation_parser, "donation_chains", {"small": chain, "large": chain})
+    monkeypatch.setattr(donation_parser, "donation_cache", ResultCache(LRUCache(10, 60)))
+    tier = model_router.select_tier("donation", "x", 0.0)
+    trip(breaker.get_breaker(model_router.model_name(tier)))
+
+    # An explicit clock time keeps this off the fast path, so it would need the model.
+    response = client.post("/donation/parse", json={"text": "50 lbs of apples tomorrow at 3pm"})
+    assert response.status_code == 200
+    parsed = response.json()
+    assert parsed["degraded"] is True
+    assert parsed["food_type"] == "Fresh Produce"
+    assert parsed["quantity"] == {"amount": 50.0, "unit": "Pounds"}
+    assert parsed["pickup_window"]["startTime"].endswith("T08:00:00")
+    assert model.calls == 0
+
+    unparseable = client.post("/donation/parse", json={"text": "Some leftovers from our event, ask me for details"})
+    assert unparseable.status_code == 503
+    assert client.get("/metrics/breakers").json()["degraded_responses"]["donation"] >= 1
+
+@pytest.mark.parametrize("message,route", [
+    ("Could you take me to my profile and tell me what to do next?", {"page": "profile"}),
+    ("Which partner organizations need bread this week?", {"operation": "get_partners", "data": {}}),
+])
+def test_loose_intent_matching(message, route):
+    assert intent_router.match(message) is None
+    assert intent_router.match_loose(message).args == route
+
+def test_agent_dispatches_tools_directly_while_open(monkeypatch):
+    monkeypatch.setattr(settings, "INTENT_ROUTER_ENABLED", False)
+    model = FakeChatModel()
+    executor = create_react_agent(model, agent.tools, checkpointer=BoundedMemorySaver(10, 10))
+    monkeypatch.setattr(agent, "agent_executor", executor)
+    trip(breaker.get_breaker(model_router.model_name(model_router.task_tier("agent"))))
+    config = {"configurable": {"thread_id": "degraded", "checkpoint_ns": ""}}
+
+    response = client.post("/agent/send", json={"message": "Please go to the schedule page, I'm lost", "config": config})
+    assert response.json() == {"response": "Navigating to page: schedule"}
+    assert model.calls == 0
+    assert len(executor.get_state(config).values["messages"]) == 2
+    unanswerable = client.post("/agent/send", json={"message": "Write me a poem", "config": config})
+    assert unanswerable.status_code == 503
+
+def test_agent_breaker_times_model_calls_not_tool_work(monkeypatch):
+    monkeypatch.setattr(settings, "INTENT_ROUTER_ENABLED", False)
+    monkeypatch.setattr(settings, "BREAKER_SLOW_CALL_SECONDS", 0.1)
+
+    @tool
+    async def slow_lookup(query: str) -> str:
+        """A tool backed by a slow database."""
+        await asyncio.sleep(0.15)
+        return "found"
+
+    circuit = breaker.get_breaker(model_router.model_name(model_router.task_tier("agent")))
+    for i in range(3):
+        model = FakeChatModel(tool_keywords={"slow_lookup": ["look up"]})
+        monkeypatch.setattr(agent, "agent_executor", create_react_agent(model, [slow_lookup], checkpointer=BoundedMemorySaver(10, 10)))
+        config = {"configurable": {"thread_id": f"slow-{i}", "checkpoint_ns": ""}}
+        assert asyncio.run(agent.get_agent_response("please look up bread", config)) == "Done: found"
+    # Two model calls per turn, each fast; the slow tool time is not counted against the model.
+    stats = circuit.stats()
+    assert circuit.state == CLOSED and stats["window_calls"] == 6 and stats["failure_rate"] == 0.0
+
+    model = FakeChatModel(failure_rate=1.0)
+    monkeypatch.setattr(agent, "agent_executor", create_react_agent(model, [slow_lookup], checkpointer=BoundedMemorySaver(10, 10)))
+    for i in range(8):
+        with pytest.raises((FakeUpstreamError, CircuitOpen)):
+            asyncio.run(agent.get_agent_response("hello", {"configurable": {"thread_id": f"failing-{i}", "checkpoint_ns": ""}}))
+    assert circuit.state == OPEN and model.calls == 6
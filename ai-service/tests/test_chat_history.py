@@ -0,0 +1,49 @@
+# tests/test_chat_history.py
+from fastapi.testclient import TestClient
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from app.main import app
+from app.services import chat
+from app.services.history import MemoryHistoryStore, SQLiteHistoryStore, trim_to_budget
+
+client = TestClient(app)
+
+def test_sessions_are_isolated(monkeypatch):
+    model = FakeListChatModel(responses=["Hi Ann", "Hi Bob"])
+    monkeypatch.setattr(chat, "chat_models", {"small": model, "large": model})
+    monkeypatch.setattr(chat, "history_store", MemoryHistoryStore(max_sessions=10, ttl_seconds=60))
+    client.post("/chat/send", params={"session_id": "ann", "message": "I'm Ann"})
+    client.post("/chat/send", params={"session_id": "bob", "message": "I'm Bob"})
+    history = client.get("/chat/history", params={"session_id": "ann"}).json()["history"]
+    assert history == [{"role": "human", "content": "I'm Ann"}, {"role": "ai", "content": "Hi Ann"}]
+
+def test_memory_store_evicts_least_recently_used():
+    store = MemoryHistoryStore(max_sessions=2, ttl_seconds=60)
+    store.set("a", [HumanMessage(content="a")])
+    store.set("b", [HumanMessage(content="b")])
+    store.get("a")
+    store.set("c", [HumanMessage(content="c")])
+    assert len(store) == 2
+    assert store.get("b") == []
+    assert store.get("a")[0].content == "a"
+
+def test_memory_store_expires_idle_sessions():
+    store = MemoryHistoryStore(max_sessions=10, ttl_seconds=0)
+    store.set("a", [HumanMessage(content="a")])
+    assert store.get("a") == []
+
+def test_trim_keeps_prompt_within_budget():
+    messages = []
+    for i in range(50):
+        messages += [HumanMessage(content="question " * 20), AIMessage(content="answer " * 20)]
+    trimmed = trim_to_budget(messages, token_budget=200)
+    assert len(trimmed) < len(messages)
+    assert trimmed[0].type == "human"
+    assert trimmed[-1] is messages[-1]
+
+def test_sqlite_store_round_trip(tmp_path):
+    path = str(tmp_path / "history.db")
+    SQLiteHistoryStore(path, ttl_seconds=60).set("a", [HumanMessage(content="hello"), AIMessage(content="hi")])
+    messages = SQLiteHistoryStore(path, ttl_seconds=60).get("a")
+    assert [m.content for m in messages] == ["hello", "hi"]
+    assert isinstance(messages[1], AIMessage)
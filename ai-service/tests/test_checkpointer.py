@@ -0,0 +1,64 @@
+# tests/test_checkpointer.py
+import gc
+import tracemalloc
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import StateGraph, MessagesState, START, END
+from app.services.checkpointer import BoundedMemorySaver
+
+def build_graph(checkpointer):
+    # A single-node graph stands in for the ReAct agent; checkpointing is identical.
+    def reply(state: MessagesState):
+        return {"messages": [AIMessage(content=f"echo: {state['messages'][-1].content}")]}
+
+    graph = StateGraph(MessagesState)
+    graph.add_node("reply", reply)
+    graph.add_edge(START, "reply")
+    graph.add_edge("reply", END)
+    return graph.compile(checkpointer=checkpointer)
+
+def send(graph, thread_id, text):
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    return graph.invoke({"messages": [HumanMessage(content=text)]}, config=config)
+
+def test_retention_keeps_latest_state():
+    saver = BoundedMemorySaver(max_threads=10, max_checkpoints_per_thread=3)
+    graph = build_graph(saver)
+    for i in range(10):
+        result = send(graph, "t", f"message {i}")
+    assert len(result["messages"]) == 20
+    assert saver.stats()["checkpoints"] <= 3
+
+def test_soak_memory_stays_bounded():
+    saver = BoundedMemorySaver(max_threads=100, max_checkpoints_per_thread=3)
+    graph = build_graph(saver)
+    tracemalloc.start()
+    for i in range(500):
+        send(graph, f"thread-{i}", "hello " * 50)
+    gc.collect()
+    warm, _ = tracemalloc.get_traced_memory()
+    for i in range(500, 2000):
+        send(graph, f"thread-{i}", "hello " * 50)
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = saver.stats()
+    print("\n=== Checkpointer Soak Test ===")
+    print(f"traced memory after 500 threads: {warm / 1024:.0f} KiB, after 2000: {after / 1024:.0f} KiB")
+    print(stats)
+    assert stats["threads"] == 100
+    assert stats["evictions"] == 1900
+    assert stats["checkpoints"] <= 100 * 3
+    # 1500 more threads must not grow memory with the thread count.
+    assert after - warm < 1024 * 1024
+
+def test_sqlite_mode_survives_eviction_and_restart(tmp_path):
+    path = str(tmp_path / "checkpoints.db")
+    graph = build_graph(BoundedMemorySaver(max_threads=1, max_checkpoints_per_thread=3, sqlite_path=path))
+    send(graph, "a", "first")
+    send(graph, "b", "other thread evicts a")
+    assert len(send(graph, "a", "second")["messages"]) == 4
+
+    restarted = build_graph(BoundedMemorySaver(max_threads=1, max_checkpoints_per_thread=3, sqlite_path=path))
+    result = send(restarted, "a", "third")
+    assert [m.content for m in result["messages"]][-2:] == ["third", "echo: third"]
+    assert len(result["messages"]) == 6
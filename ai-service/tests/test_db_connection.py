@@ -1,4 +1,10 @@
 import sys, os
+import pytest
+from app.config import settings
+
+if settings.DB_BACKEND == "memory":
+    pytest.skip("needs a live Supabase project (DB_BACKEND=supabase)", allow_module_level=True)
+
 from app.db.connection import supabase
 
 def test_supabase_connection():
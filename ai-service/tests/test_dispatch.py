@@ -0,0 +1,185 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi.testclient import TestClient
+from app.db import connection
+from app.db.memory import MemorySupabase, seed_tables, seed_tickets
+from app.main import app
+from app.models.schemas import TicketsRow
+from app.services import dispatch, spatial
+from app.services.dispatch import DispatchEngine, DispatchQueue, InvalidTransition
+from app.services.spatial import SpatialEngine
+
+client = TestClient(app)
+NOW = datetime(2025, 3, 1, tzinfo=timezone.utc)
+HOUR = 3600.0
+
+def row(ticket_id, hours_ago, priority="Routine", status="Submitted", pickup=None, volunteer=None):
+    created = NOW - timedelta(hours=hours_ago)
+    return TicketsRow(
+        id=ticket_id, priority=priority, status=status, pickup_location_id=pickup, volunteer_id=volunteer,
+        created_at=created, updated_at=created,
+    )
+
+def ids(tickets):
+    return [ticket.id for ticket in tickets]
+
+def test_urgent_first_unless_routine_waited_longer_than_the_head_start():
+    queue = DispatchQueue(
+        [row("routine-new", 1), row("urgent-new", 0.5, "Urgent"), row("urgent-old", 2, "Urgent"),
+         row("routine-old", 7), row("scheduled", 9, status="Scheduled", volunteer="v")],
+        urgent_head_start=4 * HOUR,
+    )
+    assert ids(queue.peek(10)) == ["routine-old", "urgent-old", "urgent-new", "routine-new"]
+    assert ids(queue.peek(2)) == ["routine-old", "urgent-old"]
+
+def test_order_matches_a_sorted_scan():
+    rows = [TicketsRow.model_validate(r) for r in seed_tickets(3000, seed=3, now=NOW)]
+    queue = DispatchQueue(rows, urgent_head_start=2 * HOUR)
+    key = lambda r: (r.created_at.timestamp() - (2 * HOUR if r.priority == "Urgent" else 0), r.id)
+    assert ids(queue.peek(3000)) == [r.id for r in sorted(rows, key=key)]
+    scheduled = queue.assign([f"v{i}" for i in range(100)])
+    assert ids(scheduled) == [r.id for r in sorted(rows, key=key)[:100]]
+    # Assigned tickets were popped off their heaps, so they leave no stale entries behind.
+    assert queue.stale == {"Urgent": 0, "Routine": 0}
+    assert ids(queue.peek(5)) == [r.id for r in sorted(rows, key=key)[100:105]]
+
+def test_transitions_are_enforced():
+    queue = DispatchQueue([row("t", 1), row("u", 2), row("w", 3)], urgent_head_start=0)
+    with pytest.raises(InvalidTransition):
+        queue.transition("t", "InTransit")
+    # Rows replayed from the table are taken as they are.
+    queue.upsert(row("w", 3, status="Delivered", volunteer="v2"))
+    assert queue.tickets["w"].status == "Delivered"
+    with pytest.raises(InvalidTransition):
+        queue.transition("w", "InTransit")
+    with pytest.raises(ValueError):
+        queue.transition("t", "Scheduled")
+    queue.transition("u", "Scheduled", "v1")
+    assert ids(queue.peek(10)) == ["t"]
+    # The volunteer drops it: back in line at its original place.
+    queue.transition("u", "Submitted")
+    assert ids(queue.peek(10)) == ["u", "t"] and queue.tickets["u"].volunteer_id is None
+    for status in ("Scheduled", "InTransit", "Delivered", "Completed"):
+        queue.upsert(row("u", 2, status=status, volunteer="v1"))
+    assert "u" not in queue.tickets and ids(queue.peek(10)) == ["t"]
+
+    for i in range(200):
+        queue.upsert(row(f"churn-{i}", 0))
+        queue.transition(f"churn-{i}", "Scheduled", "v")
+    assert len(queue.heaps["Routine"]) < 100
+    assert queue.stats()["queued"] == {"Urgent": 0, "Routine": 1}
+
+def test_assign_prefers_the_nearest_free_volunteer():
+    queue = DispatchQueue(
+        [row("a", 3, pickup="north"), row("b", 2, pickup="south"), row("c", 1)], urgent_head_start=0,
+    )
+    locations = {"north": (31.0, -97.7), "south": (29.0, -97.7)}
+    volunteers = {"near-south": (29.1, -97.7), "near-north": (30.9, -97.7)}
+    scheduled = queue.assign(["far-away", "near-south", "near-north"], locations, volunteers)
+    assert [(t.id, t.volunteer_id) for t in scheduled] == [("a", "near-north"), ("b", "near-south"), ("c", "far-away")]
+    assert queue.peek(10) == [] and queue.assign(["v"]) == []
+
+def test_endpoints_write_assignments_and_apply_event_batches(monkeypatch):
+    tables = seed_tables(partners=5)
+    tables["tickets"] = [r.model_dump(mode="json") for r in (
+        row("routine", 3, pickup="location-4"), row("urgent", 1, "Urgent", pickup="location-0"),
+        row("taken", 2), row("done", 9, status="Completed"),
+    )]
+    tables["volunteers"] = [
+        {"id": f"volunteer-{i}", "phone": "555-0100", "location_id": f"location-{i}",
+         "created_at": NOW.isoformat(), "updated_at": NOW.isoformat()}
+        for i in (0, 4)
+    ]
+    db = MemorySupabase(tables)
+    monkeypatch.setattr(connection, "_async_supabase", db)
+    monkeypatch.setattr(dispatch, "engine", DispatchEngine())
+    monkeypatch.setattr(spatial, "engine", SpatialEngine())
+
+    body = client.get("/dispatch/next").json()
+    assert [t["id"] for t in body["tickets"]] == ["urgent", "routine", "taken"]
+    # Someone else schedules "taken" before the event reaches us.
+    db.tables["tickets"][2]["status"] = "Scheduled"
+
+    body = client.post("/dispatch/assign", json={"volunteer_ids": ["volunteer-4", "volunteer-0", "volunteer-9"]}).json()
+    assert [(t["id"], t["volunteer_id"]) for t in body["assignments"]] == [("urgent", "volunteer-0"), ("routine", "volunteer-4")]
+    assert body["conflicts"] == ["taken"]
+    stored = {t["id"]: t for t in db.tables["tickets"]}
+    assert stored["urgent"]["status"] == "Scheduled" and stored["urgent"]["volunteer_id"] == "volunteer-0"
+    # The conflicting ticket is resynced from the table, not put back in the queue.
+    assert client.get("/dispatch/next").json()["tickets"] == []
+    assert dispatch.engine.queue.tickets["taken"].status == "Scheduled"
+
+    # Committed changes, replayed in stream order; the table wins even when it skips a step.
+    stored["taken"]["volunteer_id"] = "volunteer-9"
+    stored["routine"]["status"] = "Completed"
+    stored["urgent"]["status"] = "InTransit"
+    db.tables["tickets"].append(row("new", 0, "Urgent").model_dump(mode="json"))
+    events = [
+        {"type": "UPDATE", "table": "tickets", "record": dict(stored["taken"])},
+        {"type": "UPDATE", "table": "tickets", "record": {**stored["urgent"], "status": "Delivered"}},
+        {"type": "UPDATE", "table": "tickets", "record": dict(stored["routine"])},
+        {"type": "INSERT", "table": "tickets", "record": db.tables["tickets"][-1]},
+        # Malformed: "urgent" is resynced from the table and so ends up InTransit, not Delivered.
+        {"type": "UPDATE", "table": "tickets", "record": {"id": "urgent"}},
+        {"type": "UPDATE", "table": "tickets", "record": {"priority": "Urgent"}},
+        {"type": "DELETE", "table": "donations", "old_record": {"id": "d"}},
+    ]
+    body = client.post("/dispatch/events", json=events).json()
+    assert body["applied"] == 4 and body["ignored"] == 1
+    assert [r["id"] for r in body["rejected"]] == ["urgent", None]
+    assert [t["id"] for t in client.get("/dispatch/next").json()["tickets"]] == ["new"]
+
+    stats = client.get("/dispatch/stats").json()
+    assert stats["loads"] == 1 and stats["events"] == 6 and stats["rejected"] == 2 and stats["assigned"] == 3
+    assert stats["resyncs"] == 2
+    assert stats["tickets"] == {"Submitted": 1, "Scheduled": 1, "InTransit": 1, "Delivered": 0}
+    assert client.post("/dispatch/assign", json={"volunteer_ids": []}).status_code == 422
+
+def test_failed_writes_are_resynced_from_the_table(monkeypatch):
+    tables = seed_tables(partners=2)
+    tables["tickets"] = [row("a", 2).model_dump(mode="json"), row("b", 1).model_dump(mode="json")]
+    monkeypatch.setattr(connection, "_async_supabase", MemorySupabase(tables))
+    monkeypatch.setattr(dispatch, "engine", DispatchEngine())
+    monkeypatch.setattr(spatial, "engine", SpatialEngine())
+
+    async def unreachable(*args, **kwargs):
+        raise ConnectionError("supabase unreachable")
+
+    monkeypatch.setattr(dispatch.queries, "update_ticket", unreachable)
+    body = client.post("/dispatch/assign", json={"volunteer_ids": ["v1"]}).json()
+    assert body == {"assignments": [], "conflicts": ["a"]}
+    # Still Submitted in the table, so still first in line.
+    assert [t["id"] for t in client.get("/dispatch/next").json()["tickets"]] == ["a", "b"]
+
+def test_status_changes_follow_the_lifecycle_and_write_conditionally(monkeypatch):
+    tables = seed_tables(partners=2)
+    tables["tickets"] = [row("a", 2).model_dump(mode="json"), row("b", 1, status="Scheduled", volunteer="v1").model_dump(mode="json")]
+    db = MemorySupabase(tables)
+    monkeypatch.setattr(connection, "_async_supabase", db)
+    monkeypatch.setattr(dispatch, "engine", DispatchEngine())
+    stored = {t["id"]: t for t in db.tables["tickets"]}
+
+    def move(ticket_id, status, volunteer_id=None):
+        return client.post(f"/dispatch/tickets/{ticket_id}/status", json={"status": status, "volunteer_id": volunteer_id})
+
+    assert move("b", "InTransit").json()["ticket"]["volunteer_id"] == "v1"
+    assert stored["b"]["status"] == "InTransit"
+    # Skipping a step, or scheduling without a volunteer, never reaches the table.
+    assert move("a", "Delivered").status_code == 409
+    assert move("a", "Scheduled").status_code == 400
+    assert stored["a"]["status"] == "Submitted"
+    assert move("missing", "Scheduled", "v2").status_code == 404
+
+    # The table moved on underneath us: the write is refused and the mirror resynced.
+    stored["b"]["status"] = "Delivered"
+    assert move("b", "Delivered").status_code == 409
+    assert dispatch.engine.queue.tickets["b"].status == "Delivered"
+    assert move("b", "Completed").status_code == 200
+    assert stored["b"]["status"] == "Completed" and "b" not in dispatch.engine.queue.tickets
+
+    # A dropped ticket goes back in line.
+    move("a", "Scheduled", "v2")
+    assert client.get("/dispatch/next").json()["tickets"] == []
+    move("a", "Submitted")
+    assert stored["a"]["volunteer_id"] is None
+    assert [t["id"] for t in client.get("/dispatch/next").json()["tickets"]] == ["a"]
@@ -0,0 +1,69 @@
+# tests/test_donation_batch.py
+import asyncio
+import time
+from fastapi.testclient import TestClient
+from langchain_core.runnables import RunnableLambda
+from app.config import settings
+from app.main import app
+from app.services import donation_parser
+from app.models.schemas import DonationDetails
+from app.services.cache import LRUCache, ResultCache
+
+client = TestClient(app)
+
+LATENCY = 0.05
+
+BREAD = DonationDetails(
+    food_type="Baked Goods",
+    quantity={"amount": 20, "unit": "Items"},
+    pickup_window={"startTime": "2025-01-02T08:00:00", "endTime": "2025-01-02T12:00:00"},
+    handling={"refrigeration": False, "freezing": False, "fragile": False, "heavyLifting": False},
+    notes="bread",
+)
+
+def use_fake_chain(monkeypatch, concurrency=10):
+    calls = []
+
+    async def fake_chain(inputs):
+        calls.append(inputs["text"])
+        if "explode" in inputs["text"]:
+            raise ValueError("model output failed validation")
+        await asyncio.sleep(5 if "stall" in inputs["text"] else LATENCY)
+        return BREAD
+
+    chain = RunnableLambda(fake_chain)
+    monkeypatch.setattr(donation_parser, "donation_chains", {"small": chain, "large": chain})
+    monkeypatch.setattr(donation_parser, "donation_cache", ResultCache(LRUCache(1000, 60)))
+    monkeypatch.setattr(settings, "DONATION_FAST_PATH_ENABLED", False)
+    monkeypatch.setattr(settings, "DONATION_BATCH_CONCURRENCY", concurrency)
+    monkeypatch.setattr(settings, "DONATION_BATCH_ITEM_TIMEOUT", 0.5)
+    # Throughput here is bounded by DONATION_BATCH_CONCURRENCY alone.
+    monkeypatch.setattr(settings, "LLM_RATE_LIMIT_ENABLED", False)
+    return calls
+
+def test_batch_throughput_is_concurrency_limited(monkeypatch):
+    use_fake_chain(monkeypatch, concurrency=10)
+    texts = [f"donation number {i}" for i in range(100)]
+    start = time.perf_counter()
+    response = client.post("/donation/parse/batch", json={"texts": texts})
+    elapsed = time.perf_counter() - start
+    ideal = len(texts) / 10 * LATENCY
+    print(f"\n=== Batch of 100: {elapsed:.2f}s (ideal {ideal:.2f}s, sequential {len(texts) * LATENCY:.2f}s) ===")
+    assert response.status_code == 200
+    assert all("result" in item for item in response.json()["results"])
+    assert elapsed < ideal * 3
+
+def test_batch_dedupes_and_isolates_failures(monkeypatch):
+    calls = use_fake_chain(monkeypatch)
+    texts = ["Bread from the bakery", "bread  from the BAKERY", "please explode", "stall forever"]
+    results = client.post("/donation/parse/batch", json={"texts": texts}).json()["results"]
+    assert len(calls) == 3
+    assert results[0]["result"] == results[1]["result"]
+    assert "validation" in results[2]["error"]
+    assert "Timed out" in results[3]["error"]
+    assert [item["text"] for item in results] == texts
+
+def test_batch_size_limit(monkeypatch):
+    monkeypatch.setattr(settings, "DONATION_BATCH_MAX_ITEMS", 2)
+    response = client.post("/donation/parse/batch", json={"texts": ["a", "b", "c"]})
+    assert response.status_code == 413
@@ -0,0 +1,58 @@
+# tests/test_donation_cache.py
+import asyncio
+import time
+from langchain_core.runnables import RunnableLambda
+from app.config import settings
+from app.models.schemas import DonationDetails
+from app.services import donation_parser
+from app.services.cache import LRUCache, ResultCache, SQLiteCache
+
+BREAD = DonationDetails(
+    food_type="Baked Goods",
+    quantity={"amount": 20, "unit": "Items"},
+    pickup_window={"startTime": "2025-01-02T08:00:00", "endTime": "2025-01-02T12:00:00"},
+    handling={"refrigeration": False, "freezing": False, "fragile": False, "heavyLifting": False},
+    notes="bread",
+)
+
+def use_fake_chain(monkeypatch, latency=0.05):
+    calls = []
+
+    async def fake_chain(inputs):
+        calls.append(inputs)
+        await asyncio.sleep(latency)
+        return BREAD
+
+    chain = RunnableLambda(fake_chain)
+    monkeypatch.setattr(donation_parser, "donation_chains", {"small": chain, "large": chain})
+    monkeypatch.setattr(settings, "DONATION_FAST_PATH_ENABLED", False)
+    monkeypatch.setattr(donation_parser, "donation_cache", ResultCache(LRUCache(100, 60)))
+    return calls
+
+def test_repeated_donations_hit_cache(monkeypatch):
+    calls = use_fake_chain(monkeypatch)
+    first = asyncio.run(donation_parser.parse_donation("20 loaves of bread, pick up tomorrow morning"))
+    start = time.perf_counter()
+    second = asyncio.run(donation_parser.parse_donation("  20 Loaves of bread,   pick up tomorrow morning "))
+    elapsed = time.perf_counter() - start
+    print(f"\n=== Donation cache hit latency: {elapsed * 1e6:.0f} us ===")
+    assert first == second
+    assert len(calls) == 1
+    assert donation_parser.get_cache_stats()["hits"] == 1
+
+def test_bypass_skips_cache(monkeypatch):
+    calls = use_fake_chain(monkeypatch, latency=0)
+    asyncio.run(donation_parser.parse_donation("5 pounds of apples"))
+    asyncio.run(donation_parser.parse_donation("5 pounds of apples", use_cache=False))
+    assert len(calls) == 2
+
+def test_keys_are_scoped_by_date():
+    assert donation_parser.cache_key("Bread", "2025-01-01") != donation_parser.cache_key("Bread", "2025-01-02")
+
+def test_shared_backend_is_visible_to_other_workers(tmp_path):
+    path = str(tmp_path / "cache.db")
+    worker_a = ResultCache(LRUCache(10, 60), SQLiteCache(path, 60))
+    worker_b = ResultCache(LRUCache(10, 60), SQLiteCache(path, 60))
+    worker_a.set("k", {"food_type": "Other"})
+    assert worker_b.get("k") == {"food_type": "Other"}
+    assert worker_b.stats()["shared_hits"] == 1
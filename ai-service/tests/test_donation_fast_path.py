@@ -0,0 +1,37 @@
+# tests/test_donation_fast_path.py
+import asyncio
+from langchain_core.runnables import RunnableLambda
+from app.services import donation_parser
+from app.services.donation_parser import extract_donation_fast
+
+def test_formulaic_donation_is_parsed_locally():
+    details = extract_donation_fast("20 loaves of bread, pick up tomorrow morning", "2025-01-01")
+    assert details.food_type == "Baked Goods"
+    assert details.quantity.amount == 20 and details.quantity.unit == "Items"
+    assert details.pickup_window.startTime == "2025-01-02T08:00:00"
+    assert details.pickup_window.endTime == "2025-01-02T12:00:00"
+    assert details.notes == "bread"
+
+def test_handling_keywords():
+    details = extract_donation_fast("30 servings of lasagna tonight, keep cold", "2025-01-01")
+    assert details.handling.refrigeration and not details.handling.freezing
+    assert details.quantity.unit == "Servings"
+
+def test_ambiguous_inputs_fall_back():
+    for text in [
+        "Some bread",
+        "50 pounds of apples tomorrow at 3pm",
+        "A few dozen pastries, not refrigerated, please come before noon",
+        "3 trays of sandwiches and 2 bags of apples tomorrow morning",
+    ]:
+        assert extract_donation_fast(text, "2025-01-01") is None
+
+def test_fast_path_skips_llm(monkeypatch):
+    async def fail(inputs):
+        raise AssertionError("LLM should not be called")
+
+    chain = RunnableLambda(fail)
+    monkeypatch.setattr(donation_parser, "donation_chains", {"small": chain, "large": chain})
+    parsed = asyncio.run(donation_parser.parse_donation("50 pounds of apples tomorrow morning"))
+    assert parsed["food_type"] == "Fresh Produce"
+    assert donation_parser.get_fast_path_stats()["hits"] >= 1
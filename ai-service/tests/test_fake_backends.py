@@ -0,0 +1,46 @@
+# tests/test_fake_backends.py
+import asyncio
+import time
+from langgraph.prebuilt import create_react_agent
+from app.db import connection, queries
+from app.db.memory import MemorySupabase
+from app.models.schemas import DonationDetails
+from app.services import agent
+from app.services.checkpointer import BoundedMemorySaver
+from app.services.fake_llm import FakeChatModel
+
+def test_fake_model_is_deterministic_and_streams():
+    model = FakeChatModel()
+    assert model.invoke("hello").content == "Echo: hello"
+    chunks = [c.content for c in model.stream("stream these words")]
+    assert len(chunks) == 4 and "".join(chunks) == "Echo: stream these words"
+
+def test_fake_model_injects_latency():
+    model = FakeChatModel(latency=0.05)
+    start = time.perf_counter()
+    asyncio.run(model.ainvoke("hi"))
+    assert time.perf_counter() - start >= 0.05
+
+def test_fake_model_supports_structured_output():
+    details = FakeChatModel().with_structured_output(DonationDetails).invoke("20 loaves of bread")
+    assert isinstance(details, DonationDetails)
+
+def test_fake_agent_calls_tools_against_memory_db(monkeypatch):
+    monkeypatch.setattr(connection, "_async_supabase", MemorySupabase())
+    executor = create_react_agent(FakeChatModel(), agent.tools, checkpointer=BoundedMemorySaver(10, 10))
+    monkeypatch.setattr(agent, "agent_executor", executor)
+    response = asyncio.run(agent.get_agent_response("List the partner organizations", {"configurable": {"thread_id": "f"}}))
+    assert "Partner Org 0" in response
+
+def test_memory_db_queries(monkeypatch):
+    monkeypatch.setattr(connection, "_async_supabase", MemorySupabase())
+
+    async def run():
+        await queries.update_user("user-1", {"display_name": "Renamed"})
+        updated = await queries.get_user("user-1")
+        await queries.delete_user("user-2")
+        return updated, await queries.get_user("user-2")
+
+    updated, deleted = asyncio.run(run())
+    assert updated[0]["display_name"] == "Renamed"
+    assert deleted == []
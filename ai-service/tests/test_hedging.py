@@ -0,0 +1,140 @@
+import asyncio
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.main import app
+from app.services import chat, hedging
+from app.services.fake_llm import FakeChatModel
+from app.services.hedging import DeadlineExceeded, LatencyTracker, hedged, with_deadline
+from app.services.history import MemoryHistoryStore
+
+client = TestClient(app)
+
+@pytest.fixture(autouse=True)
+def fresh_stats(monkeypatch):
+    monkeypatch.setattr(hedging, "trackers", {})
+    monkeypatch.setattr(hedging, "hedge_stats", {})
+    monkeypatch.setattr(settings, "HEDGING_ENABLED", True)
+    monkeypatch.setattr(settings, "HEDGE_MAX_RATE", 1.0)
+
+def prime(key: str, latency: float = 0.01, samples: int = 20):
+    tracker = hedging.trackers.setdefault(key, LatencyTracker())
+    for _ in range(samples):
+        tracker.record(latency)
+
+def test_slow_primary_is_hedged_and_cancelled():
+    prime("test")
+    delays = iter([1.0, 0.01])
+    cancelled = []
+
+    async def upstream():
+        delay = next(delays)
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(delay)
+            raise
+        return delay
+
+    async def run():
+        start = time.perf_counter()
+        result = await hedged("test", upstream)
+        await asyncio.sleep(0)
+        return result, time.perf_counter() - start
+
+    result, elapsed = asyncio.run(run())
+    assert result == 0.01
+    assert elapsed < 0.2
+    assert cancelled == [1.0]
+    assert hedging.get_hedge_stats()["test"]["hedged"] == 1
+    assert hedging.get_hedge_stats()["test"]["win_rate"] == 1.0
+
+def test_no_hedge_without_enough_samples_or_when_disabled(monkeypatch):
+    calls = []
+
+    async def upstream():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    assert asyncio.run(hedged("test", upstream)) == "ok"
+    prime("test", samples=20)
+    monkeypatch.setattr(settings, "HEDGING_ENABLED", False)
+    assert asyncio.run(hedged("test", upstream)) == "ok"
+    assert len(calls) == 2
+    assert hedging.get_hedge_stats()["test"]["hedged"] == 0
+
+def test_hedge_rate_is_capped(monkeypatch):
+    monkeypatch.setattr(settings, "HEDGE_MAX_RATE", 0.25)
+    prime("test", samples=200)
+
+    async def upstream():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def run():
+        for _ in range(8):
+            await hedged("test", upstream)
+
+    asyncio.run(run())
+    stats = hedging.get_hedge_stats()["test"]
+    assert stats["requests"] == 8
+    assert stats["hedged"] == 2
+
+def test_failed_primary_falls_back_to_hedge():
+    prime("test")
+    attempts = iter(["slow-failure", "ok"])
+
+    async def upstream():
+        attempt = next(attempts)
+        if attempt == "slow-failure":
+            await asyncio.sleep(0.1)
+            raise RuntimeError("upstream error")
+        await asyncio.sleep(0.2)
+        return attempt
+
+    assert asyncio.run(hedged("test", upstream)) == "ok"
+
+def test_deadline_is_enforced(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_DEADLINES", {"chat": 0.05})
+
+    async def run():
+        with pytest.raises(DeadlineExceeded, match="chat request exceeded its 0.05s deadline"):
+            await with_deadline("chat", asyncio.sleep(1))
+        # Tasks without a deadline are left alone.
+        return await with_deadline("other", asyncio.sleep(0.01, result="done"))
+
+    assert asyncio.run(run()) == "done"
+
+def test_chat_deadline_returns_504(monkeypatch):
+    model = FakeChatModel(latency=1.0)
+    monkeypatch.setattr(chat, "chat_models", {"small": model, "large": model})
+    monkeypatch.setattr(chat, "history_store", MemoryHistoryStore(max_sessions=10, ttl_seconds=60))
+    monkeypatch.setattr(settings, "LLM_DEADLINES", {"chat": 0.1})
+    response = client.post("/chat/send", params={"session_id": "s", "message": "hello"})
+    assert response.status_code == 504
+    assert "deadline" in response.json()["detail"]
+
+def test_hedging_cuts_tail_latency_of_a_long_tailed_model(monkeypatch):
+    # One call in ten takes 2s; hedges are launched after the p95 of recent latencies.
+    # (With this seed no hedge lands on a slow call as well.)
+    model = FakeChatModel(latency=0.01, tail_probability=0.1, tail_latency=2.0, seed=100)
+    monkeypatch.setattr(chat, "chat_models", {"small": model, "large": model})
+    monkeypatch.setattr(chat, "history_store", MemoryHistoryStore(max_sessions=100, ttl_seconds=60))
+    prime("chat:small", 0.01)
+
+    async def timed(i):
+        start = time.perf_counter()
+        await chat.get_chat_response(f"session-{i}", f"hello {i}")
+        return time.perf_counter() - start
+
+    async def run():
+        return [await timed(i) for i in range(40)]
+
+    latencies = asyncio.run(run())
+    stats = hedging.get_hedge_stats()["chat:small"]
+    assert max(latencies) < 1.0
+    assert stats["hedged"] > 0
+    assert stats["hedge_wins"] >= 4
+    assert client.get("/metrics/hedging").json()["chat:small"]["requests"] == 40
@@ -0,0 +1,58 @@
+import time
+import pytest
+from fastapi.testclient import TestClient
+from langgraph.prebuilt import create_react_agent
+from app.db import connection, reference
+from app.db.memory import MemorySupabase
+from app.main import app
+from app.services import agent, intent_router
+from app.services.checkpointer import BoundedMemorySaver
+from app.services.fake_llm import FakeChatModel
+
+client = TestClient(app)
+
+@pytest.mark.parametrize("message, page", [
+    ("Take me to the dashboard", "dashboard"),
+    ("please go to my profile page", "profile"),
+    ("Open the available pickups screen.", "pickups/available"),
+    ("navigate to inventory, please", "inventory"),
+])
+def test_navigation_requests_are_routed(message, page):
+    route = intent_router.match(message)
+    assert route is not None and route.tool == "navigation_tool" and route.args == {"page": page}
+
+@pytest.mark.parametrize("message", [
+    "Hello, how are you?",
+    "Take me to the moon",
+    "Take me to the dashboard and delete user John",
+    "Please delete user John",
+    "List partners near downtown",
+])
+def test_ambiguous_requests_fall_back_to_agent(message):
+    assert intent_router.match(message) is None
+
+def test_routed_requests_skip_the_llm_and_stay_on_the_thread(monkeypatch):
+    monkeypatch.setattr(connection, "_async_supabase", MemorySupabase())
+    reference.invalidate()
+    model = FakeChatModel()
+    executor = create_react_agent(model, agent.tools, checkpointer=BoundedMemorySaver(10, 10))
+    monkeypatch.setattr(agent, "agent_executor", executor)
+    config = {"configurable": {"thread_id": "routed", "checkpoint_ns": ""}}
+    before = intent_router.get_router_stats()
+
+    start = time.perf_counter()
+    navigation = client.post("/agent/send", json={"message": "Take me to the dashboard", "config": config})
+    partners = client.post("/agent/send", json={"message": "List partners", "config": config})
+    elapsed = time.perf_counter() - start
+    generic = client.post("/agent/send", json={"message": "Hello, how are you?", "config": config})
+
+    print("\n=== Intent Router ===")
+    print(f"two routed requests in {elapsed * 1000:.1f} ms")
+    assert navigation.json() == {"response": "Navigating to page: dashboard"}
+    assert partners.json()["response"].startswith("Partner organizations (20 rows):")
+    assert generic.json() == {"response": "Echo: Hello, how are you?"}
+    assert model.calls == 1
+    assert len(executor.get_state(config).values["messages"]) == 6
+    stats = client.get("/agent/router/stats").json()
+    assert stats["routed"]["navigate"] == before["routed"].get("navigate", 0) + 1
+    assert stats["fallback"] == before["fallback"] + 1
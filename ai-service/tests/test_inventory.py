@@ -0,0 +1,109 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from fastapi.testclient import TestClient
+from app.db import connection
+from app.db.memory import MemorySupabase, seed_inventory, seed_tables
+from app.main import app
+from app.models.schemas import InventoryRow
+from app.services import inventory
+from app.services.inventory import InventoryEngine, InventoryIndex
+from app.services.tools import inventory_func
+
+client = TestClient(app)
+NOW = datetime(2025, 3, 1, tzinfo=timezone.utc)
+
+def row(item_id, hours, partner="partner-1", food_type="food-type-1", status="Available"):
+    return InventoryRow(
+        id=item_id, partner_org_id=partner, food_type_id=food_type, quantity=10, unit="lbs", status=status,
+        expiration_date=NOW + timedelta(hours=hours) if hours is not None else None, created_at=NOW, updated_at=NOW,
+    )
+
+def ids(items):
+    return [item.id for item in items]
+
+def test_expiring_matches_a_sorted_scan():
+    rows = [InventoryRow.model_validate(r) for r in seed_inventory(3000, seed=2, now=NOW)]
+    index = InventoryIndex(rows)
+    now = NOW.timestamp()
+
+    def scan(hours, limit, partner=None, food_type=None, include_expired=False):
+        kept = [
+            r for r in rows
+            if r.status == "Available" and r.expiration_date.timestamp() <= now + hours * 3600
+            and (include_expired or r.expiration_date.timestamp() >= now)
+            and partner in (None, r.partner_org_id) and food_type in (None, r.food_type_id)
+        ]
+        return [r.id for r in sorted(kept, key=lambda r: r.expiration_date)][:limit]
+
+    assert ids(index.expiring(48, 25, now=now, include_expired=True)) == scan(48, 25, include_expired=True)
+    assert ids(index.expiring(48, 25, now=now)) == scan(48, 25)
+    assert any(r.expiration_date.timestamp() < now and r.status == "Available" for r in rows)
+    assert ids(index.expiring(24 * 30, 5000, now=now)) == scan(24 * 30, 5000)
+    assert ids(index.expiring(72, 10, "partner-3", now=now)) == scan(72, 10, "partner-3")
+    assert ids(index.expiring(96, 10, food_type_id="food-type-2", now=now)) == scan(96, 10, food_type="food-type-2")
+    assert ids(index.expiring(96, 10, "partner-3", "food-type-2", now=now)) == scan(96, 10, "partner-3", "food-type-2")
+
+def test_transitions_and_compaction():
+    index = InventoryIndex([row("soon", 2), row("later", 10), row("no-date", None)])
+    now = NOW.timestamp()
+    assert ids(index.expiring(24, 10, now=now)) == ["soon", "later"]
+    index.upsert(row("soon", 2, status="Reserved"))
+    assert ids(index.expiring(24, 10, now=now)) == ["later"]
+    index.upsert(row("soon", 2))  # reservation cancelled
+    index.upsert(row("later", 1))  # re-dated
+    index.upsert(row("moved", 3, partner="partner-2"))
+    assert ids(index.expiring(24, 10, now=now)) == ["later", "soon", "moved"]
+    index.upsert(row("soon", 2, status="Distributed"))
+    index.remove("moved")
+    assert ids(index.expiring(24, 10, now=now)) == ["later"]
+
+    for i in range(200):
+        index.upsert(row(f"churn-{i}", 5))
+        index.upsert(row(f"churn-{i}", 5, status="Distributed"))
+    bucket = index.buckets["partner-1"]["food-type-1"]
+    assert len(bucket.heap) < 100
+    assert index.stats()["indexed"] == 1
+
+def test_stale_expired_items_do_not_crowd_out_items_still_good():
+    stale = [row(f"stale-{i}", -24 * (i + 1)) for i in range(30)]
+    index = InventoryIndex(stale + [row("soon", 2), row("later", 10)])
+    now = NOW.timestamp()
+    assert ids(index.expiring(24, 5, now=now)) == ["soon", "later"]
+    assert ids(index.expiring(24, 3, now=now, include_expired=True)) == ["stale-29", "stale-28", "stale-27"]
+    # Expired items that are then distributed drop out of both views.
+    for i in range(30):
+        index.upsert(row(f"stale-{i}", -24 * (i + 1), status="Distributed"))
+    assert ids(index.expiring(24, 5, now=now, include_expired=True)) == ["soon", "later"]
+    assert ids(index.expiring(24, 5, now=now - 3 * 3600)) == ["soon", "later"]
+
+def test_endpoint_tool_and_webhook_changes(monkeypatch):
+    now = datetime.now(timezone.utc)
+    tables = seed_tables()
+    tables["inventory"] = [
+        row("bread", 5, food_type="food-type-0").model_dump(mode="json"),
+        row("apples", 30, partner="partner-2", food_type="food-type-1").model_dump(mode="json"),
+        row("milk", 100, food_type="food-type-1").model_dump(mode="json"),
+    ]
+    for item, hours in zip(tables["inventory"], (5, 30, 100)):
+        item["expiration_date"] = (now + timedelta(hours=hours)).isoformat()
+    monkeypatch.setattr(connection, "_async_supabase", MemorySupabase(tables))
+    monkeypatch.setattr(inventory, "engine", InventoryEngine())
+
+    body = client.get("/inventory/expiring", params={"hours": 48}).json()
+    assert [item["id"] for item in body["items"]] == ["bread", "apples"]
+    assert 4.5 < body["items"][0]["hours_left"] <= 5
+    fresh_produce = client.get("/inventory/expiring", params={"hours": 200, "food_type": "fresh produce"}).json()
+    assert [item["id"] for item in fresh_produce["items"]] == ["apples", "milk"]
+    assert client.get("/inventory/expiring", params={"food_type": "Caviar"}).status_code == 404
+
+    reserved = {**tables["inventory"][0], "status": "Reserved"}
+    assert client.post("/inventory/changes", json={"type": "UPDATE", "table": "inventory", "record": reserved}).json() == {"applied": True}
+    assert client.post("/inventory/changes", json={"type": "UPDATE", "table": "inventory", "record": {"id": "x"}}).status_code == 422
+    body = client.get("/inventory/expiring", params={"hours": 48}).json()
+    assert [item["id"] for item in body["items"]] == ["apples"]
+
+    text = asyncio.run(inventory_func({"hours": 200, "partner_id": "partner-1"}))
+    assert text.splitlines()[0] == "Available inventory expiring within 200 hours, soonest first (1 rows):"
+    assert "Fresh Produce" in text
+    stats = client.get("/inventory/stats").json()
+    assert stats["loads"] == 1 and stats["changes"] == 1 and stats["indexed"] == 2
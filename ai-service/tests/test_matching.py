@@ -0,0 +1,143 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi.testclient import TestClient
+from app.db import connection
+from app.db.memory import MemorySupabase, seed_tables, seed_volunteer_tables
+from app.main import app
+from app.models.schemas import VolunteerAvailabilityTimeRow, VolunteerAvailabilityZonesRow, VolunteerSkillsRow, VolunteersRow
+from app.services import matching
+from app.services.matching import MatchingEngine, MatchingIndex, MatchQuery
+from app.services.tools import matching_func
+
+client = TestClient(app)
+NOW = datetime(2025, 1, 1)
+# 2025-01-05 is a Sunday (day_of_week 0).
+SUNDAY = datetime(2025, 1, 5)
+
+def volunteer(vid, vehicle="car"):
+    return VolunteersRow(id=vid, phone="555-0100", vehicle_type=vehicle, created_at=NOW, updated_at=NOW)
+
+def slot(vid, day, start, end):
+    return VolunteerAvailabilityTimeRow(
+        id=f"{vid}-{day}-{start}", volunteer_id=vid, day_of_week=day, start_time=start, end_time=end,
+        created_at=NOW, updated_at=NOW,
+    )
+
+def zone(vid, name):
+    return VolunteerAvailabilityZonesRow(id=f"{vid}-{name}", volunteer_id=vid, zone=name, created_at=NOW, updated_at=NOW)
+
+def skill(vid, name):
+    return VolunteerSkillsRow(id=f"{vid}-{name}", volunteer_id=vid, skill=name, created_at=NOW, updated_at=NOW)
+
+@pytest.fixture
+def index():
+    return MatchingIndex(
+        [volunteer("a"), volunteer("b", "Refrigerated Van"), volunteer("c"), volunteer("d")],
+        [
+            slot("a", 1, "09:00", "12:00"),
+            slot("b", 1, "2025-01-06T08:00:00+00:00", "2025-01-06T10:00:00+00:00"),
+            slot("b", 1, "10:00", "13:00"),
+            slot("c", 6, "22:00", "02:00"),
+            slot("d", 1, "11:00", "17:00"),
+        ],
+        [zone("a", "Downtown"), zone("b", "downtown"), zone("d", "East")],
+        [skill("a", "Heavy_Lifting"), skill("d", "heavy lifting")],
+    )
+
+def window(day, start_hour, hours):
+    start = SUNDAY + timedelta(days=day, hours=start_hour)
+    return start, start + timedelta(hours=hours)
+
+def test_window_must_be_fully_covered(index):
+    assert index.eligible(MatchQuery(*window(1, 9, 2))) == ["a", "b"]
+    # b's back-to-back slots merge into 08:00-13:00.
+    assert index.eligible(MatchQuery(*window(1, 9, 4))) == ["b"]
+    assert index.eligible(MatchQuery(*window(1, 11, 1))) == ["a", "b", "d"]
+    assert index.eligible(MatchQuery(*window(2, 9, 1))) == []
+
+def test_overnight_slot_wraps_into_sunday(index):
+    assert index.eligible(MatchQuery(*window(6, 23, 2))) == ["c"]
+    # A window that starts on Sunday morning is still inside Saturday's overnight slot.
+    assert index.eligible(MatchQuery(*window(7, 0.5, 1))) == ["c"]
+    assert index.eligible(MatchQuery(*window(0, 0.5, 1))) == ["c"]
+    assert index.eligible(MatchQuery(*window(7, 1, 2))) == []
+
+def test_split_slots_merge_across_sunday_midnight():
+    index = MatchingIndex(
+        [volunteer("e"), volunteer("f")],
+        [slot("e", 6, "22:00", "23:59"), slot("e", 0, "00:00", "03:00"), slot("f", 0, "00:00", "03:00")],
+    )
+    assert index.eligible(MatchQuery(*window(6, 23, 2))) == ["e"]
+    assert index.eligible(MatchQuery(*window(0, 1, 1))) == ["e", "f"]
+    assert index.eligible(MatchQuery(*window(6, 21, 2))) == []
+
+def test_time_zones_are_normalized_to_utc():
+    # 18:00-20:00 at UTC-6 on Saturday is Sunday 00:00-02:00 UTC.
+    index = MatchingIndex([volunteer("g")], [slot("g", 6, "2025-01-04T18:00:00-06:00", "2025-01-04T20:00:00-06:00")])
+    start, end = window(7, 0.5, 1)
+    assert index.eligible(MatchQuery(start, end)) == ["g"]
+    assert index.eligible(MatchQuery(start.replace(tzinfo=timezone.utc), end.replace(tzinfo=timezone.utc))) == ["g"]
+    central = timezone(timedelta(hours=-6))
+    assert index.eligible(MatchQuery(datetime(2025, 1, 11, 18, 30, tzinfo=central), datetime(2025, 1, 11, 19, 30, tzinfo=central))) == ["g"]
+    with pytest.raises(ValueError):
+        index.eligible(MatchQuery(end, start))
+
+def test_zone_skill_and_handling_filters(index):
+    start, end = window(1, 11, 1)
+    assert index.eligible(MatchQuery(start, end, zone="DOWNTOWN")) == ["a", "b"]
+    assert index.eligible(MatchQuery(start, end, skills=["heavy lifting"])) == ["a", "d"]
+    assert index.eligible(MatchQuery(start, end, handling=["heavy_lifting"], zone="east")) == ["d"]
+    assert index.eligible(MatchQuery(start, end, handling=["refrigeration"])) == ["b"]
+    assert index.eligible(MatchQuery(start, end, zone="Nowhere")) == []
+
+def test_matches_brute_force_on_synthetic_data():
+    tables = seed_volunteer_tables(2000, seed=1)
+    models = [matching.queries.TABLE_MODELS[t] for t in matching.TABLES]
+    rows = [[model.model_validate(r) for r in tables[t]] for model, t in zip(models, matching.TABLES)]
+    index = MatchingIndex(*rows)
+    start, end = window(3, 10, 2)
+    zones = {r.volunteer_id for r in rows[2] if r.zone == "North"}
+    skills = {r.volunteer_id for r in rows[3] if r.skill in ("refrigeration", "cold chain")}
+    vehicles = {v.id for v in rows[0] if v.vehicle_type == "refrigerated van"}
+    available = {
+        r.volunteer_id for r in rows[1]
+        if r.day_of_week == 3 and matching.minute_of_day(r.start_time) <= 600 and matching.minute_of_day(r.end_time) >= 720
+    }
+    expected = sorted(available & zones & (skills | vehicles), key=index.positions.get)
+    assert expected
+    assert index.eligible(MatchQuery(start, end, zone="North", handling=["refrigeration"])) == expected
+
+def test_endpoint_and_tool_match_a_donation(monkeypatch):
+    db = MemorySupabase({**seed_tables(), **seed_volunteer_tables(500)})
+    start, end = window(2, 9, 1)
+    db.tables["donations"] = [{
+        "id": "donation-1", "created_at": NOW.isoformat(), "donated_at": NOW.isoformat(), "updated_at": NOW.isoformat(),
+        "pickup_window_start": start.isoformat(), "pickup_window_end": end.isoformat(), "quantity": 40.0, "unit": "Pounds",
+        "is_fragile": False, "requires_freezing": False, "requires_heavy_lifting": True, "requires_refrigeration": False,
+    }]
+    monkeypatch.setattr(connection, "_async_supabase", db)
+    monkeypatch.setattr(matching, "engine", MatchingEngine())
+
+    response = client.post("/matching/volunteers", json={"donation_id": "donation-1", "zone": "Central", "limit": 1})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["count"] > 1 and len(body["volunteers"]) == 1
+    explicit = client.post("/matching/volunteers", json={
+        "pickup_window_start": start.isoformat(), "pickup_window_end": end.isoformat(),
+        "zone": "Central", "handling": ["heavy_lifting"], "limit": 1,
+    })
+    assert explicit.json() == body
+    assert client.post("/matching/volunteers", json={"donation_id": "nope"}).status_code == 404
+    assert client.post("/matching/volunteers", json={"zone": "Central"}).status_code == 422
+    assert client.post("/matching/volunteers", json={"donation_id": "donation-1", "handling": ["x"]}).status_code == 422
+    inverted = {"pickup_window_start": end.isoformat(), "pickup_window_end": start.isoformat()}
+    assert client.post("/matching/volunteers", json=inverted).status_code == 400
+
+    text = asyncio.run(matching_func({"donation_id": "donation-1", "zone": "Central", "limit": 1}))
+    assert text.startswith(f"Eligible volunteers ({body['count']} in total) (1 rows):")
+    assert client.get("/matching/stats").json()["loads"] == 1
+
+    db.tables["volunteer_skills"].clear()
+    assert client.post("/reference/invalidate", json={"table": "volunteer_skills"}).json() == {"invalidated": ["volunteer_matching"]}
+    assert client.post("/matching/volunteers", json={"donation_id": "donation-1"}).json()["count"] == 0
@@ -0,0 +1,69 @@
+import asyncio
+from fastapi.testclient import TestClient
+from langchain_core.runnables import RunnableLambda
+from app.config import settings
+from app.main import app
+from app.models.schemas import DonationDetails
+from app.services import chat, donation_parser, model_router
+from app.services.cache import LRUCache, ResultCache
+from app.services.fake_llm import FakeChatModel
+from app.services.history import MemoryHistoryStore
+
+client = TestClient(app)
+
+BREAD = DonationDetails(
+    food_type="Baked Goods",
+    quantity={"amount": 20, "unit": "Items"},
+    pickup_window={"startTime": "2025-01-02T08:00:00", "endTime": "2025-01-02T12:00:00"},
+    handling={"refrigeration": False, "freezing": False, "fragile": False, "heavyLifting": False},
+    notes="bread",
+)
+
+def test_tier_selection():
+    routine = "20 loaves of bread tomorrow morning"
+    vague = "Leftover catering, maybe 40 meals or so, between 6 and 9pm"
+    assert model_router.select_tier("donation", routine, donation_parser.donation_confidence(routine)) == "small"
+    assert model_router.select_tier("donation", vague, donation_parser.donation_confidence(vague)) == "large"
+    assert model_router.select_tier("chat", "Hi there") == "small"
+    assert model_router.select_tier("chat", "word " * 400) == "large"
+    assert model_router.select_tier("agent", "Hi there") == "large"
+
+def test_routing_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_ROUTING_ENABLED", False)
+    assert model_router.select_tier("chat", "Hi there") == "large"
+
+def test_invalid_structured_output_escalates(monkeypatch):
+    calls = []
+
+    def chain(tier):
+        async def invoke(inputs):
+            calls.append(tier)
+            if tier == "small":
+                DonationDetails.model_validate({"food_type": "Baked Goods"})
+            return BREAD
+        return RunnableLambda(invoke)
+
+    monkeypatch.setattr(donation_parser, "donation_chains", {"small": chain("small"), "large": chain("large")})
+    monkeypatch.setattr(donation_parser, "donation_cache", ResultCache(LRUCache(10, 60)))
+    monkeypatch.setattr(settings, "DONATION_FAST_PATH_ENABLED", False)
+    before = model_router.get_tier_stats().get("donation", {}).get("small", {}).get("escalations", 0)
+    parsed = asyncio.run(donation_parser.parse_donation("20 loaves of bread tomorrow morning"))
+    assert parsed == BREAD.model_dump()
+    assert calls == ["small", "large"]
+    assert model_router.get_tier_stats()["donation"]["small"]["escalations"] == before + 1
+
+def test_per_tier_latency_and_cost_are_reported(monkeypatch):
+    monkeypatch.setattr(chat, "chat_models", {
+        "small": FakeChatModel(model_name="gpt-4o-mini", latency=0.01),
+        "large": FakeChatModel(model_name="gpt-4o", latency=0.01),
+    })
+    monkeypatch.setattr(chat, "history_store", MemoryHistoryStore(max_sessions=10, ttl_seconds=60))
+    client.post("/chat/send", params={"session_id": "tiers", "message": "Hello"})
+    client.post("/chat/send", params={"session_id": "tiers", "message": "Please explain " + "pickups " * 400})
+    stats = client.get("/metrics/models").json()["chat"]
+    print("\n=== Model tiers ===")
+    print(stats)
+    for tier, model in (("small", "gpt-4o-mini"), ("large", "gpt-4o")):
+        assert stats[tier]["model"] == model
+        assert stats[tier]["requests"] >= 1 and stats[tier]["prompt_tokens"] > 0
+        assert stats[tier]["mean_latency_ms"] > 0 and stats[tier]["cost_usd"] > 0
@@ -0,0 +1,56 @@
+import asyncio
+import pytest
+from app.db import connection, queries
+from app.db.memory import MemorySupabase, seed_tables
+from app.models.schemas import UsersRow
+from app.services.tools import crud_func
+
+def use_memory_db(monkeypatch, users=250):
+    db = MemorySupabase(seed_tables(users=users))
+    monkeypatch.setattr(connection, "_async_supabase", db)
+    return db
+
+def test_keyset_pages_cover_table_once(monkeypatch):
+    db = use_memory_db(monkeypatch)
+
+    async def run():
+        return [page async for page in queries.iter_pages("users", page_size=40)]
+
+    pages = asyncio.run(run())
+    ids = [row.id for page in pages for row in page.rows]
+    assert len(pages) == 7 and all(len(p.rows) <= 40 for p in pages)
+    assert ids == sorted(row["id"] for row in db.tables["users"])
+    assert all(isinstance(row, UsersRow) for page in pages for row in page.rows)
+
+def test_projection_and_filters(monkeypatch):
+    use_memory_db(monkeypatch)
+
+    async def run():
+        rows = [row async for row in queries.iter_rows("users", columns=["id", "role"], filters={"role": "Donor"}, page_size=16)]
+        page = await queries.fetch_page("users", ["display_name"], [("display_name", "ilike", "USER 1%")], limit=5)
+        return rows, page
+
+    rows, page = asyncio.run(run())
+    assert rows and all(row.role == "Donor" for row in rows)
+    assert set(type(rows[0]).model_fields) == {"id", "role"}
+    assert len(page.rows) == 5 and page.next_cursor is not None
+    assert all(row.display_name.startswith("User 1") for row in page.rows)
+
+def test_invalid_requests_are_rejected(monkeypatch):
+    use_memory_db(monkeypatch)
+    with pytest.raises(ValueError):
+        asyncio.run(queries.fetch_page("users", ["password_hash"]))
+    with pytest.raises(ValueError):
+        asyncio.run(queries.fetch_page("users", filters=[("id", "drop", 1)]))
+
+def test_crud_tool_lists_users_page_by_page(monkeypatch):
+    use_memory_db(monkeypatch, users=12)
+
+    async def run():
+        first = await crud_func({"operation": "list_users", "data": {"columns": ["id"], "limit": 10}})
+        last = await crud_func({"operation": "list_users", "data": {"columns": ["id"], "limit": 10, "after": "user-7"}})
+        return first, last
+
+    first, last = asyncio.run(run())
+    assert first.endswith("(next cursor: user-7)") and "display_name" not in first
+    assert "user-9" in last and last.endswith("(next cursor: None)")
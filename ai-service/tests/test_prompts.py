@@ -0,0 +1,71 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import HumanMessage, SystemMessage
+from app.config import settings
+from app.main import app
+from app.models.schemas import DonationDetails
+from app.services import chat, donation_parser, prompts
+from app.services.cache import LRUCache, ResultCache
+from app.services.fake_llm import FakeChatModel
+from app.services.history import MemoryHistoryStore
+
+client = TestClient(app)
+
+def test_donation_prompt_starts_with_an_invariant_prefix():
+    first = donation_parser.prompt.format(text="20 loaves of bread", current_date="2025-01-01")
+    second = donation_parser.prompt.format(text="a crate of apples", current_date="2025-06-30")
+    static = donation_parser.prompt_layout.static
+    assert first.startswith(static) and second.startswith(static)
+    assert first.index("2025-01-01") > len(static)
+    assert donation_parser.prompt.input_variables == ["current_date", "text"]
+
+def test_static_prefix_cannot_hold_template_variables():
+    with pytest.raises(ValueError, match="current_date"):
+        prompts.PromptLayout(static="Assume today is {current_date}. ", dynamic="{text}")
+
+def test_stable_prefix_is_served_from_the_prefix_cache():
+    model = FakeChatModel(prefix_cache_min_tokens=64, prefix_cache_block_tokens=16)
+
+    def cached(prompt_text):
+        return model._cached_tokens([HumanMessage(content=prompt_text)], None)
+
+    old_layout = "Assume today is {current_date}. " + donation_parser.prompt_layout.static + "{text}"
+    cached(old_layout.format(current_date="2025-01-01", text="bread"))
+    assert cached(old_layout.format(current_date="2025-01-02", text="apples")) == 0
+
+    cached(donation_parser.prompt.format(current_date="2025-01-01", text="bread"))
+    assert cached(donation_parser.prompt.format(current_date="2025-01-02", text="apples")) >= 400
+
+def test_donation_cached_tokens_are_reported(monkeypatch):
+    model = FakeChatModel(prefix_cache_min_tokens=64, prefix_cache_block_tokens=16)
+    chain = donation_parser.prompt | model.with_structured_output(DonationDetails)
+    monkeypatch.setattr(donation_parser, "donation_chains", {"small": chain, "large": chain})
+    monkeypatch.setattr(donation_parser, "donation_cache", ResultCache(LRUCache(10, 60)))
+    monkeypatch.setattr(settings, "DONATION_FAST_PATH_ENABLED", False)
+    before = prompts.get_prompt_stats().get("donation", {"requests": 0, "cached_prompt_tokens": 0})
+
+    async def run():
+        await donation_parser.parse_donation("20 loaves of bread")
+        await donation_parser.parse_donation("a crate of apples")
+
+    asyncio.run(run())
+    stats = client.get("/metrics/prompts").json()["donation"]
+    assert stats["requests"] == before["requests"] + 2
+    assert stats["static_prefix_ratio"] > 0.9
+    assert stats["cached_prompt_tokens"] - before["cached_prompt_tokens"] >= 400
+    assert stats["uncached_prompt_tokens"] == stats["prompt_tokens"] - stats["cached_prompt_tokens"]
+
+def test_chat_turns_share_the_system_prompt_prefix(monkeypatch):
+    model = FakeChatModel(prefix_cache_min_tokens=16, prefix_cache_block_tokens=16)
+    monkeypatch.setattr(chat, "chat_models", {"small": model, "large": model})
+    monkeypatch.setattr(chat, "history_store", MemoryHistoryStore(max_sessions=10, ttl_seconds=60))
+    messages = chat._messages([HumanMessage(content="hello")])
+    assert isinstance(messages[0], SystemMessage) and messages[0].content == prompts.CHAT_SYSTEM_PROMPT
+    before = prompts.get_prompt_stats().get("chat", {"cached_prompt_tokens": 0})
+    client.post("/chat/send", params={"session_id": "a", "message": "hello"})
+    client.post("/chat/send", params={"session_id": "b", "message": "how do I donate?"})
+    stats = client.get("/metrics/prompts").json()["chat"]
+    assert stats["cached_prompt_tokens"] > before["cached_prompt_tokens"]
+    # The stored history holds only the conversation, not the system prompt.
+    assert [m["role"] for m in chat.get_history("a")] == ["human", "ai"]
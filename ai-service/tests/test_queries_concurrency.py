@@ -0,0 +1,51 @@
+# tests/test_queries_concurrency.py
+import asyncio
+import time
+import httpx
+from supabase import AsyncClient, AsyncClientOptions
+from app.db import connection
+from app.services.tools import crud_tool
+
+DB_LATENCY = 0.2
+CONCURRENCY = 10
+
+async def slow_postgrest(request: httpx.Request) -> httpx.Response:
+    # Simulate a slow PostgREST round-trip without touching the network.
+    await asyncio.sleep(DB_LATENCY)
+    return httpx.Response(200, json=[{"id": "p1", "name": "Food Bank"}])
+
+def use_fake_supabase():
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(slow_postgrest))
+    options = AsyncClientOptions(httpx_client=http_client)
+    connection._async_supabase = AsyncClient("http://localhost:54321", "offline-key", options)
+
+def test_concurrent_tool_calls_do_not_serialize():
+    use_fake_supabase()
+
+    async def run():
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        beat = asyncio.create_task(heartbeat())
+        start = time.perf_counter()
+        results = await asyncio.gather(*[
+            crud_tool.ainvoke({"operation": "get_user", "data": {"user_id": "p1"}}) for _ in range(CONCURRENCY)
+        ])
+        elapsed = time.perf_counter() - start
+        beat.cancel()
+        await connection.close_async_supabase()
+        return results, elapsed, ticks
+
+    results, elapsed, ticks = asyncio.run(run())
+    print("\n=== Concurrent DB Load Test ===")
+    print(f"{CONCURRENCY} tool calls, {DB_LATENCY}s each, finished in {elapsed:.3f}s ({ticks} loop ticks)")
+    assert all("Food Bank" in r for r in results)
+    # Serialized calls would take CONCURRENCY * DB_LATENCY seconds.
+    assert elapsed < CONCURRENCY * DB_LATENCY / 2
+    # The event loop kept running while the queries were in flight.
+    assert ticks >= int(DB_LATENCY / 0.01) // 2
@@ -0,0 +1,75 @@
+import asyncio
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.db import connection, reference
+from app.db.memory import MemorySupabase
+from app.main import app
+from app.services.tools import crud_func
+
+def _fresh_cache(monkeypatch):
+    db = MemorySupabase()
+    monkeypatch.setattr(connection, "_async_supabase", db)
+    for name, ref in reference.tables.items():
+        monkeypatch.setattr(reference, name, type(ref)(ref.table, ref.model, ref.name_field))
+    monkeypatch.setattr(reference, "tables", {n: getattr(reference, n) for n in reference.tables})
+    return db
+
+def test_lookups_are_served_from_memory(monkeypatch):
+    db = _fresh_cache(monkeypatch)
+
+    async def run():
+        assert (await reference.partners.get("partner-3")).name == "Partner Org 3"
+        assert (await reference.partners.get_by_name("partner org 4")).id == "partner-4"
+        assert await reference.resolve_food_type_id("baked goods") == "food-type-0"
+        assert await reference.resolve_food_type_id("Caviar") is None
+        assert len(await reference.locations.all()) == len(db.tables["locations"])
+        assert "Partner Org 0" in await crud_func({"operation": "get_partners", "data": {}})
+
+    asyncio.run(run())
+    stats = reference.stats()
+    assert stats["partners"]["loads"] == 1
+    assert stats["partners"]["hits"] == 2
+    assert stats["food_types"]["loads"] == 1
+
+def test_invalidation_and_ttl_reload(monkeypatch):
+    db = _fresh_cache(monkeypatch)
+
+    async def run():
+        await reference.partners.all()
+        db.tables["partners"][0]["name"] = "Renamed Org"
+        assert (await reference.partners.get("partner-0")).name == "Partner Org 0"
+        reference.invalidate("partners")
+        assert (await reference.partners.get("partner-0")).name == "Renamed Org"
+        monkeypatch.setattr(settings, "REFERENCE_CACHE_TTL_SECONDS", 0)
+        await reference.partners.all()
+
+    asyncio.run(run())
+    assert reference.partners.loads == 3
+
+def test_tables_larger_than_a_page_load_completely(monkeypatch):
+    db = _fresh_cache(monkeypatch)
+    monkeypatch.setattr(settings, "QUERY_PAGE_SIZE", 3)
+
+    async def run():
+        return await reference.locations.all()
+
+    assert sorted(row.id for row in asyncio.run(run())) == sorted(row["id"] for row in db.tables["locations"])
+    assert len(db.tables["locations"]) > 3
+
+def test_concurrent_cold_lookups_load_once(monkeypatch):
+    _fresh_cache(monkeypatch)
+
+    async def run():
+        await asyncio.gather(*(reference.food_types.get("food-type-1") for _ in range(50)))
+
+    asyncio.run(run())
+    assert reference.food_types.loads == 1
+
+def test_invalidate_endpoint(monkeypatch):
+    _fresh_cache(monkeypatch)
+    client = TestClient(app)
+    response = client.post("/reference/invalidate", json={"table": "partners", "type": "UPDATE"})
+    assert response.status_code == 200
+    assert response.json() == {"invalidated": ["partners"]}
+    assert client.post("/reference/invalidate", json={"table": "users"}).status_code == 404
+    assert set(client.get("/reference/stats").json()) == {"partners", "food_types", "locations"}
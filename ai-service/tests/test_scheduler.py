@@ -0,0 +1,105 @@
+import asyncio
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.main import app
+from app.services import scheduler
+from app.services.scheduler import BATCH, INTERACTIVE, LLMScheduler, Overloaded
+
+client = TestClient(app)
+
+class RateLimitError(Exception):
+    status_code = 429
+
+def drained(rpm=600, tpm=1_000_000, max_queue=100) -> LLMScheduler:
+    limiter = LLMScheduler(rpm, tpm, max_queue)
+    limiter.requests.drain()
+    return limiter
+
+def test_requests_per_minute_are_enforced():
+    limiter = drained(rpm=600)
+
+    async def run():
+        start = time.perf_counter()
+        await asyncio.gather(*(limiter.acquire(INTERACTIVE, 10) for _ in range(5)))
+        return time.perf_counter() - start
+
+    elapsed = asyncio.run(run())
+    # 600/min refills one request every 0.1s.
+    assert 0.4 < elapsed < 1.0
+
+def test_tokens_per_minute_are_enforced():
+    limiter = LLMScheduler(10_000, 6000, 100)
+    limiter.tokens.drain()
+
+    async def run():
+        start = time.perf_counter()
+        await limiter.acquire(INTERACTIVE, 20)
+        return time.perf_counter() - start
+
+    # 6000/min refills 100 tokens per second.
+    assert 0.15 < asyncio.run(run()) < 0.5
+
+def test_interactive_requests_jump_the_batch_queue():
+    limiter = drained(rpm=1200)
+    order = []
+
+    async def request(priority, name):
+        await limiter.acquire(priority, 1)
+        order.append(name)
+
+    async def run():
+        batch = [asyncio.create_task(request(BATCH, f"batch-{i}")) for i in range(4)]
+        await asyncio.sleep(0.01)
+        chat = asyncio.create_task(request(INTERACTIVE, "chat"))
+        await asyncio.gather(*batch, chat)
+
+    asyncio.run(run())
+    assert order.index("chat") <= 1
+
+def test_cancelled_waiters_leave_the_queue():
+    limiter = drained(rpm=60)
+
+    async def run():
+        waiters = [asyncio.create_task(limiter.acquire(BATCH, 1)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        assert limiter.stats()["queued"] == 3
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        return limiter.stats()["queued"]
+
+    assert asyncio.run(run()) == 0
+
+def test_upstream_rate_limits_are_retried_with_backoff(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_RETRY_BASE_DELAY", 0.01)
+    limiter = LLMScheduler(100_000, 10_000_000, 100)
+    attempts = []
+
+    async def flaky():
+        attempts.append(time.perf_counter())
+        if len(attempts) < 3:
+            raise RateLimitError("slow down")
+        return "ok"
+
+    assert asyncio.run(limiter.run(INTERACTIVE, 10, flaky)) == "ok"
+    assert len(attempts) == 3
+
+    async def always_limited():
+        raise RateLimitError("slow down")
+
+    monkeypatch.setattr(settings, "LLM_MAX_RETRIES", 1)
+    with pytest.raises(RateLimitError):
+        asyncio.run(limiter.run(INTERACTIVE, 10, always_limited))
+
+def test_full_queue_returns_429_with_retry_after(monkeypatch):
+    monkeypatch.setattr(scheduler, "scheduler", LLMScheduler(600, 100_000, max_queue=0))
+    response = client.post("/chat/send", params={"session_id": "busy", "message": "Hi"})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert client.post("/donation/parse", json={"text": "mystery box", "bypass_cache": True}).status_code == 429
+    assert client.post("/chat/stream", params={"session_id": "busy", "message": "Hi"}).status_code == 429
+    with pytest.raises(Overloaded):
+        scheduler.check_admission()
+    assert "helphut_llm_rejections_total" in client.get("/metrics").text
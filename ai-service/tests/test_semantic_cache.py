@@ -0,0 +1,191 @@
+import asyncio
+import time
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage
+from langgraph.prebuilt import create_react_agent
+from app.config import settings
+from app.db import connection
+from app.db.memory import MemorySupabase
+from app.main import app
+from app.services import agent, auth, chat, semantic_cache
+from app.services.checkpointer import BoundedMemorySaver
+from app.services.fake_llm import FakeChatModel
+from app.services.history import MemoryHistoryStore
+from app.services.semantic_cache import HashingEmbedder, SemanticCache, VectorIndex
+
+client = TestClient(app)
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(settings, "SEMANTIC_CACHE_ENABLED", True)
+    monkeypatch.setattr(semantic_cache, "semantic_cache", SemanticCache(256, 1000))
+
+@pytest.fixture(autouse=True)
+def sessions(monkeypatch):
+    users = [{"id": f"u-{role}", "role": role} for role in ("Donor", "Volunteer", "Partner")]
+    db = MemorySupabase({"users": users}, sessions={f"token-{u['role']}": u["id"] for u in users})
+    monkeypatch.setattr(connection, "_async_supabase", db)
+    monkeypatch.setattr(auth, "_roles", None)
+    return db
+
+def bearer(role):
+    return {"Authorization": f"Bearer token-{role}"}
+
+def similarity(a, b):
+    embedder = HashingEmbedder(256)
+    return float(embedder.embed(a) @ embedder.embed(b))
+
+def test_paraphrases_score_above_the_threshold_and_other_questions_below():
+    threshold = settings.SEMANTIC_CACHE_THRESHOLD
+    assert similarity("How do I schedule a pickup?", "hi, how can I schedule a pickup please") >= threshold
+    assert similarity("How do I schedule a pickup?", "how to schedule pickups") >= threshold
+    assert similarity("How do I schedule a pickup?", "How do I cancel a pickup?") < threshold
+    assert similarity("What are the donation guidelines?", "What are the volunteer guidelines?") < threshold
+
+def test_approximate_search_finds_the_exact_nearest_neighbour(monkeypatch):
+    monkeypatch.setattr(settings, "SEMANTIC_CACHE_APPROX_MIN_ENTRIES", 500)
+    monkeypatch.setattr(settings, "SEMANTIC_CACHE_NLIST", 16)
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((2000, 32)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    index = VectorIndex(32, 5000)
+    for i, vector in enumerate(vectors):
+        index.add(vector, "chat:anonymous", i, ttl=60)
+    assert index.centroids is not None and index.trained_at == 2000
+    found = [index.search(vectors[i], "chat:anonymous")[1] for i in range(0, 2000, 50)]
+    assert found == list(range(0, 2000, 50))
+    assert index.search(vectors[7], "chat:anonymous", approximate=False) == pytest.approx((1.0, 7))
+
+def test_entries_expire_and_are_scoped(monkeypatch):
+    index = VectorIndex(4, 100)
+    vector = np.array([1, 0, 0, 0], dtype=np.float32)
+    index.add(vector, "chat:Donor", "answer", ttl=10, now=0)
+    assert index.search(vector, "chat:Donor", now=5) == (1.0, "answer")
+    assert index.search(vector, "chat:Volunteer", now=5) == (0.0, None)
+    assert index.search(vector, "chat:Donor", now=11) == (0.0, None)
+
+def test_full_index_drops_expired_then_oldest_entries():
+    index = VectorIndex(4, 10)
+    vector = np.array([0, 1, 0, 0], dtype=np.float32)
+    for i in range(10):
+        index.add(vector, "s", i, ttl=5 if i < 3 else 100, now=0)
+    index.add(vector, "s", 10, ttl=100, now=10)
+    assert index.payloads == list(range(3, 11))
+    for i in range(11, 13):
+        index.add(vector, "s", i, ttl=100, now=10)
+    assert index.size == 10 and index.payloads[0] == 3
+    index.add(vector, "s", 13, ttl=100, now=10)
+    assert index.size == 10 and index.payloads[0] == 4
+
+def test_chat_paraphrase_is_answered_from_the_cache(monkeypatch):
+    model = FakeChatModel()
+    monkeypatch.setattr(chat, "chat_models", {"small": model, "large": model})
+    monkeypatch.setattr(chat, "history_store", MemoryHistoryStore(max_sessions=10, ttl_seconds=60))
+    first = client.post("/chat/send", params={"session_id": "a", "message": "How do I schedule a pickup?"}, headers=bearer("Donor"))
+    second = client.post("/chat/send", params={"session_id": "b", "message": "how can I schedule pickups"}, headers=bearer("Donor"))
+    assert second.json() == first.json()
+    assert model.calls == 1
+    assert [m["role"] for m in chat.get_history("b")] == ["human", "ai"]
+    # Another role, or a follow-up turn, goes to the model.
+    client.post("/chat/send", params={"session_id": "c", "message": "How do I schedule a pickup?"}, headers=bearer("Volunteer"))
+    client.post("/chat/send", params={"session_id": "a", "message": "How do I schedule a pickup?"}, headers=bearer("Donor"))
+    assert model.calls == 3
+    stats = client.get("/metrics/semantic-cache").json()
+    assert stats["hits"] == 1 and stats["misses"] == 2 and stats["entries"] == 2
+    assert stats["index_bytes"] > 0 and stats["lookup_p99_ms"] > 0
+
+def test_chat_cache_is_off_by_default(monkeypatch):
+    monkeypatch.setattr(settings, "SEMANTIC_CACHE_ENABLED", False)
+    model = FakeChatModel()
+    monkeypatch.setattr(chat, "chat_models", {"small": model, "large": model})
+    monkeypatch.setattr(chat, "history_store", MemoryHistoryStore(max_sessions=10, ttl_seconds=60))
+    for session in ("a", "b"):
+        client.post("/chat/send", params={"session_id": session, "message": "How do I schedule a pickup?"})
+    assert model.calls == 2 and semantic_cache.get_semantic_cache_stats()["entries"] == 0
+
+def test_agent_caches_answers_that_used_no_tools(monkeypatch):
+    monkeypatch.setattr(settings, "INTENT_ROUTER_ENABLED", False)
+    model = FakeChatModel()
+    executor = create_react_agent(model, agent.tools, checkpointer=BoundedMemorySaver(10, 10))
+    monkeypatch.setattr(agent, "agent_executor", executor)
+
+    def send(thread, message):
+        config = {"configurable": {"thread_id": thread, "checkpoint_ns": ""}}
+        return client.post("/agent/send", json={"message": message, "config": config}, headers=bearer("Partner")).json()
+
+    first = send("t1", "What does HelpHut do?")
+    assert send("t2", "so what does HelpHut do") == first
+    assert model.calls == 1
+    state = executor.get_state({"configurable": {"thread_id": "t2", "checkpoint_ns": ""}})
+    assert [type(m) for m in state.values["messages"]][-1] is AIMessage
+
+    asyncio.run(agent._store_answer(
+        "list partners", [AIMessage(content="", tool_calls=[]), agent.ToolMessage(content="[]", tool_call_id="x")], "Partner"
+    ))
+    assert semantic_cache.get_semantic_cache_stats()["entries"] == 1
+
+def test_scope_comes_from_the_verified_token_not_the_request(monkeypatch, sessions):
+    model = FakeChatModel()
+    monkeypatch.setattr(chat, "chat_models", {"small": model, "large": model})
+    monkeypatch.setattr(chat, "history_store", MemoryHistoryStore(max_sessions=10, ttl_seconds=60))
+    ask = "How do I schedule a pickup?"
+    client.post("/chat/send", params={"session_id": "a", "message": ask}, headers=bearer("Donor"))
+    # A claimed role does not select the scope: without a token the caller is anonymous.
+    client.post("/chat/send", params={"session_id": "b", "message": ask, "role": "Donor"})
+    assert model.calls == 2
+    # Tokens that do not verify, or whose user has no row, share the anonymous scope too.
+    sessions.auth.sessions["token-orphan"] = "u-missing"
+    for session, headers in (("c", {"Authorization": "Bearer forged"}), ("d", bearer("orphan"))):
+        response = client.post("/chat/send", params={"session_id": session, "message": ask}, headers=headers)
+        assert response.status_code == 200
+    assert model.calls == 2
+
+def test_roles_are_only_resolved_for_cacheable_turns(monkeypatch):
+    async def resolve_role(token):
+        raise AssertionError("role looked up")
+
+    monkeypatch.setattr(auth, "resolve_role", resolve_role)
+    monkeypatch.setattr(settings, "SEMANTIC_CACHE_ENABLED", False)
+    model = FakeChatModel()
+    monkeypatch.setattr(chat, "chat_models", {"small": model, "large": model})
+    monkeypatch.setattr(chat, "history_store", MemoryHistoryStore(max_sessions=10, ttl_seconds=60))
+    response = client.post("/chat/send", params={"session_id": "a", "message": "hi"}, headers=bearer("Donor"))
+    assert response.status_code == 200 and model.calls == 1
+
+def test_embedding_failures_are_misses(monkeypatch):
+    class FailingEmbedder:
+        async def aembed(self, text):
+            raise ConnectionError("embedding API down")
+
+    cache = SemanticCache(256, 100, FailingEmbedder())
+    asyncio.run(cache.store("chat", None, "How do I schedule a pickup?", "answer"))
+    assert asyncio.run(cache.lookup("chat", None, "How do I schedule a pickup?")) is None
+    assert cache.index.size == 0 and cache.misses == 1
+
+def test_slow_embeddings_are_misses(monkeypatch):
+    monkeypatch.setattr(settings, "SEMANTIC_CACHE_EMBED_TIMEOUT_SECONDS", 0.01)
+
+    class SlowEmbedder(HashingEmbedder):
+        async def aembed(self, text):
+            await asyncio.sleep(1)
+            return self.embed(text)
+
+    cache = SemanticCache(256, 100)
+    asyncio.run(cache.store("chat", None, "How do I schedule a pickup?", "answer"))
+    cache.embedder = SlowEmbedder(256)
+    start = time.perf_counter()
+    assert asyncio.run(cache.lookup("chat", None, "How do I schedule a pickup?")) is None
+    assert time.perf_counter() - start < 0.5
+
+def test_hashing_embedder_is_the_default_and_used_with_the_fake_backend(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_BACKEND", "openai")
+    assert isinstance(semantic_cache.get_embedder(64), HashingEmbedder)
+    monkeypatch.setattr(settings, "LLM_BACKEND", "fake")
+    monkeypatch.setattr(settings, "SEMANTIC_CACHE_EMBEDDER", "openai")
+    assert isinstance(semantic_cache.get_embedder(64), HashingEmbedder)
+    monkeypatch.setattr(settings, "LLM_BACKEND", "openai")
+    monkeypatch.setattr(settings, "SEMANTIC_CACHE_EMBEDDER", "word2vec")
+    with pytest.raises(ValueError):
+        semantic_cache.get_embedder(64)
@@ -0,0 +1,126 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.runnables import RunnableLambda
+from app.config import settings
+from app.main import app
+from app.models.schemas import DonationDetails
+from app.services import chat, donation_parser
+from app.services.cache import LRUCache, ResultCache
+from app.services.fake_llm import FakeChatModel
+from app.services.history import MemoryHistoryStore
+from app.services.singleflight import SingleFlight
+
+BREAD = DonationDetails(
+    food_type="Baked Goods",
+    quantity={"amount": 20, "unit": "Items"},
+    pickup_window={"startTime": "2025-01-02T08:00:00", "endTime": "2025-01-02T12:00:00"},
+    handling={"refrigeration": False, "freezing": False, "fragile": False, "heavyLifting": False},
+    notes="bread",
+)
+
+def test_concurrent_identical_calls_share_one_upstream_call():
+    flights = SingleFlight("test")
+    calls = []
+
+    async def upstream(value):
+        calls.append(value)
+        await asyncio.sleep(0.05)
+        return value * 2
+
+    async def run():
+        return await asyncio.gather(
+            *(flights.do("a", lambda: upstream(1)) for _ in range(10)),
+            flights.do("b", lambda: upstream(5)),
+        )
+
+    assert asyncio.run(run()) == [2] * 10 + [10]
+    assert calls == [1, 5]
+    assert flights.stats() == {"in_flight": 0, "leaders": 2, "coalesced": 9, "coalesced_rate": 9 / 11}
+
+def test_cancelled_leader_does_not_cancel_followers():
+    flights = SingleFlight("test")
+    calls = []
+
+    async def upstream():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        leader = asyncio.create_task(flights.do("k", upstream))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flights.do("k", upstream))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(run()) == "done"
+    assert calls == [1]
+
+def test_call_is_cancelled_when_every_waiter_leaves():
+    flights = SingleFlight("test")
+    finished = []
+
+    async def upstream():
+        await asyncio.sleep(1)
+        finished.append(1)
+
+    async def run():
+        waiter = asyncio.create_task(flights.do("k", upstream))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        await asyncio.sleep(0.01)
+        return flights.stats()["in_flight"]
+
+    assert asyncio.run(run()) == 0
+    assert finished == []
+
+def test_errors_reach_every_waiter():
+    flights = SingleFlight("test")
+
+    async def upstream():
+        await asyncio.sleep(0.01)
+        raise ValueError("bad output")
+
+    async def run():
+        return await asyncio.gather(*(flights.do("k", upstream) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(r, ValueError) for r in asyncio.run(run()))
+
+def test_double_submitted_donations_are_coalesced(monkeypatch):
+    calls = []
+
+    async def fake_chain(inputs):
+        calls.append(inputs["text"])
+        await asyncio.sleep(0.05)
+        return BREAD
+
+    chain = RunnableLambda(fake_chain)
+    monkeypatch.setattr(donation_parser, "donation_chains", {"small": chain, "large": chain})
+    monkeypatch.setattr(donation_parser, "donation_cache", ResultCache(LRUCache(10, 60)))
+    monkeypatch.setattr(donation_parser, "donation_flights", SingleFlight("donation"))
+    monkeypatch.setattr(settings, "DONATION_FAST_PATH_ENABLED", False)
+
+    async def run():
+        texts = ["20 loaves of bread, pick up tomorrow", " 20 Loaves of bread,  pick up tomorrow"] * 3
+        return await asyncio.gather(*(donation_parser.parse_donation(t) for t in texts))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1 and all(r == BREAD.model_dump() for r in results)
+    assert donation_parser.donation_flights.stats()["coalesced"] == 5
+
+def test_retried_chat_sends_are_coalesced(monkeypatch):
+    model = FakeChatModel(latency=0.05)
+    monkeypatch.setattr(chat, "chat_models", {"small": model, "large": model})
+    monkeypatch.setattr(chat, "history_store", MemoryHistoryStore(max_sessions=10, ttl_seconds=60))
+    monkeypatch.setattr(chat, "chat_flights", SingleFlight("chat"))
+
+    async def run():
+        return await asyncio.gather(*(chat.get_chat_response("retry", "Hello?") for _ in range(4)))
+
+    assert asyncio.run(run()) == ["Echo: Hello?"] * 4
+    assert model.calls == 1
+    assert TestClient(app).get("/metrics").text.count('helphut_singleflight_calls_total{group="chat",role="follower"}') == 1
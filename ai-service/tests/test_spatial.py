@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from app.db import connection
+from app.db.memory import MemorySupabase, seed_tables
+from app.main import app
+from app.services import spatial
+from app.services.spatial import SpatialEngine, SpatialIndex, haversine_km
+
+client = TestClient(app)
+
+def random_points(n, seed=0):
+    rng = np.random.default_rng(seed)
+    lats = rng.uniform(30.0, 30.6, n)
+    lons = rng.uniform(-98.0, -97.4, n)
+    values = rng.integers(0, 100, n).astype(float)
+    return [(f"p{i}", lats[i], lons[i], values[i]) for i in range(n)]
+
+def brute_force(points, lat, lon, min_value=None):
+    kept = [p for p in points if min_value is None or p[3] >= min_value]
+    distances = haversine_km(lat, lon, np.array([p[1] for p in kept]), np.array([p[2] for p in kept]))
+    return [(kept[i][0], distances[i]) for i in np.argsort(distances, kind="stable")]
+
+def test_haversine_distance():
+    # Austin to Dallas.
+    assert haversine_km(30.2672, -97.7431, np.array([32.7767]), np.array([-96.7970]))[0] == pytest.approx(292, abs=2)
+
+@pytest.mark.parametrize("lat,lon,min_value", [(30.3, -97.7, None), (30.01, -97.99, 90.0), (31.5, -96.0, None)])
+def test_nearest_and_within_match_a_brute_force_scan(lat, lon, min_value):
+    points = random_points(5000)
+    index = SpatialIndex.build(points)
+    expected = brute_force(points, lat, lon, min_value)
+    assert [r["id"] for r in index.nearest(lat, lon, 15, min_value)] == [pid for pid, _ in expected[:15]]
+    radius = expected[40][1]
+    within = index.within(lat, lon, radius, min_value)
+    assert [r["id"] for r in within] == [pid for pid, d in expected if d <= radius]
+
+def test_incremental_updates():
+    index = SpatialIndex.build(random_points(200))
+    index.upsert("new", 30.3, -97.7, 5.0)
+    assert index.nearest(30.3, -97.7, 1)[0]["id"] == "new"
+    index.upsert("new", 45.0, -120.0, 5.0)
+    assert index.nearest(45.0, -120.0, 1)[0]["id"] == "new"
+    assert index.nearest(30.3, -97.7, 1)[0]["id"] != "new"
+    index.remove("new")
+    assert "new" not in {r["id"] for r in index.nearest(45.0, -120.0, 5)}
+    assert len(index) == 200
+
+def test_endpoints_join_partner_capacity_and_apply_webhook_changes(monkeypatch):
+    tables = seed_tables(partners=20)
+    tables["donors"] = [{"id": "donor-1", "location_id": "location-2", "organization_name": "Bakery", "phone": "555-0100",
+                         "created_at": "2025-01-01T00:00:00+00:00", "updated_at": "2025-01-01T00:00:00+00:00"}]
+    tables["donations"] = [{"id": "donation-1", "donor_id": "donor-1"}]
+    monkeypatch.setattr(connection, "_async_supabase", MemorySupabase(tables))
+    monkeypatch.setattr(spatial, "engine", SpatialEngine())
+
+    # Partner i sits at location i with capacity 10*i of 500.
+    body = client.post("/spatial/nearest", json={"donation_id": "donation-1", "k": 3}).json()
+    assert [r["id"] for r in body["results"]] == ["partner-2", "partner-3", "partner-1"]
+    assert body["results"][0]["spare_capacity"] == 480.0
+    roomy = client.post("/spatial/nearest", json={"latitude": 30.25, "longitude": -97.75, "k": 2, "min_spare_capacity": 400}).json()
+    assert [r["id"] for r in roomy["results"]] == ["partner-0", "partner-1"]
+    within = client.post("/spatial/within", json={"latitude": 30.25, "longitude": -97.75, "radius_km": 3.5}).json()
+    assert [r["id"] for r in within["results"]] == ["partner-0", "partner-1", "partner-2"]
+
+    changes = [
+        {"type": "UPDATE", "table": "partners", "record": {**tables["partners"][0], "capacity": 450.0}},
+        {"type": "UPDATE", "table": "locations", "record": {"id": "location-1", "latitude": 40.0, "longitude": -100.0}},
+        {"type": "DELETE", "table": "partners", "old_record": {"id": "partner-2"}},
+    ]
+    for change in changes:
+        assert client.post("/spatial/changes", json=change).json() == {"applied": True}
+    assert client.post("/spatial/changes", json={"type": "DELETE", "table": "tickets", "old_record": {"id": "t"}}).json() == {"applied": False}
+    roomy = client.post("/spatial/nearest", json={"latitude": 30.25, "longitude": -97.75, "k": 2, "min_spare_capacity": 400}).json()
+    assert [r["id"] for r in roomy["results"]] == ["partner-3", "partner-4"]
+    moved = client.post("/spatial/nearest", json={"latitude": 40.0, "longitude": -100.0, "k": 1}).json()
+    assert moved["results"][0]["id"] == "partner-1" and moved["results"][0]["distance_km"] == 0.0
+
+    stats = client.get("/spatial/stats").json()
+    assert stats["loads"] == 1 and stats["changes"] == 3 and stats["indexed"]["partners"] == 19
+    assert client.post("/spatial/nearest", json={"k": 1}).status_code == 422
+    assert client.post("/spatial/nearest", json={"donation_id": "missing"}).status_code == 404
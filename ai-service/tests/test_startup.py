@@ -0,0 +1,19 @@
+# tests/test_startup.py
+import os
+import subprocess
+import sys
+from app import clients
+
+def test_import_needs_no_secrets_and_builds_no_clients():
+    env = {k: v for k, v in os.environ.items() if not k.startswith(("OPENAI_", "SUPABASE_"))}
+    code = (
+        "import app.main, app.clients, app.db.connection, app.services.chat as chat; "
+        "assert not app.clients._chat_models and app.clients._openai_http_clients is None; "
+        "assert app.db.connection._supabase is None and not chat.chat_models"
+    )
+    result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True,
+                            cwd=os.path.join(os.path.dirname(__file__), ".."))
+    assert result.returncode == 0, result.stderr
+
+def test_chat_model_is_shared():
+    assert clients.get_chat_model() is clients.get_chat_model()
@@ -0,0 +1,51 @@
+# tests/test_streaming.py
+import json
+from fastapi.testclient import TestClient
+from langchain_core.language_models.fake_chat_models import FakeListChatModel, FakeMessagesListChatModel
+from langchain_core.messages import AIMessage
+from langgraph.prebuilt import create_react_agent
+from app.main import app
+from app.services import agent, chat
+from app.services.checkpointer import BoundedMemorySaver
+from app.services.history import MemoryHistoryStore
+
+client = TestClient(app)
+
+class ToolCallingFakeModel(FakeMessagesListChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+def parse_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+def test_chat_stream_forwards_tokens_and_records_history(monkeypatch):
+    model = FakeListChatModel(responses=["Hello there"])
+    monkeypatch.setattr(chat, "chat_models", {"small": model, "large": model})
+    monkeypatch.setattr(chat, "history_store", MemoryHistoryStore(max_sessions=10, ttl_seconds=60))
+    response = client.post("/chat/stream", params={"session_id": "s", "message": "Hi"})
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_events(response.text)
+    tokens = [data for event, data in events if event == "token"]
+    assert len(tokens) > 1 and "".join(tokens) == "Hello there"
+    assert events[-1][0] == "done"
+    history = client.get("/chat/history", params={"session_id": "s"}).json()["history"]
+    assert history[-1] == {"role": "ai", "content": "Hello there"}
+
+def test_agent_stream_reports_tool_progress(monkeypatch):
+    model = ToolCallingFakeModel(responses=[
+        AIMessage(content="", tool_calls=[{"name": "navigation_tool", "args": {"page": "dashboard"}, "id": "call_1"}]),
+        AIMessage(content="Opening the dashboard"),
+    ])
+    executor = create_react_agent(model, agent.tools, checkpointer=BoundedMemorySaver(10, 10))
+    monkeypatch.setattr(agent, "agent_executor", executor)
+    config = {"configurable": {"thread_id": "stream", "checkpoint_ns": ""}}
+    response = client.post("/agent/stream", json={"message": "Where do I find my dashboard?", "config": config})
+    events = parse_events(response.text)
+    kinds = [event for event, _ in events]
+    assert kinds.index("tool_start") < kinds.index("tool_end") < kinds.index("done")
+    assert events[-1] == ("done", "Opening the dashboard")
+    assert len(executor.get_state(config).values["messages"]) == 4
@@ -0,0 +1,58 @@
+# tests/test_telemetry.py
+import json
+import logging
+from fastapi.testclient import TestClient
+from langgraph.prebuilt import create_react_agent
+from app.config import settings
+from app.db import connection, reference
+from app.db.memory import MemorySupabase
+from app import telemetry
+from app.main import app
+from app.services import agent, chat
+from app.services.checkpointer import BoundedMemorySaver
+from app.services.fake_llm import FakeChatModel
+from app.services.history import MemoryHistoryStore
+
+client = TestClient(app)
+
+def test_agent_trace_covers_endpoint_llm_tool_and_db(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "TRACE_LOG_ENABLED", True)
+    monkeypatch.setattr(settings, "INTENT_ROUTER_ENABLED", False)
+    monkeypatch.setattr(connection, "_async_supabase", MemorySupabase())
+    reference.invalidate()
+    executor = create_react_agent(FakeChatModel(), agent.tools, checkpointer=BoundedMemorySaver(10, 10))
+    monkeypatch.setattr(agent, "agent_executor", executor)
+    config = {"configurable": {"thread_id": "traced", "checkpoint_ns": ""}}
+    with caplog.at_level(logging.INFO, logger="app.trace"):
+        response = client.post("/agent/send", json={"message": "List partner organizations", "config": config})
+    assert response.status_code == 200
+    trace = json.loads(caplog.records[-1].getMessage())
+    names = [span["name"] for span in trace["spans"]]
+    assert names.count("llm") == 2
+    assert "tool" in names and "db.query" in names and names[-1] == "endpoint"
+    llm_span = next(span for span in trace["spans"] if span["name"] == "llm")
+    assert llm_span["prompt_tokens"] > 0
+
+def test_trace_log_is_written_when_logging_is_left_unconfigured(monkeypatch, capsys):
+    # As under uvicorn's LOGGING_CONFIG: root at WARNING with no handlers, nothing set for "app".
+    logger = logging.getLogger("app.trace.unconfigured")
+    monkeypatch.setattr(logger, "handlers", [])
+    monkeypatch.setattr(logger, "level", logging.NOTSET)
+    monkeypatch.setattr(logging.root, "handlers", [])
+    monkeypatch.setattr(logging.root, "level", logging.WARNING)
+    monkeypatch.setattr(telemetry, "trace_logger", logger)
+    monkeypatch.setattr(settings, "TRACE_LOG_ENABLED", True)
+    with telemetry.trace("http", path="/chat/send"):
+        pass
+    assert json.loads(capsys.readouterr().err)["path"] == "/chat/send"
+
+def test_metrics_endpoint_is_prometheus_text(monkeypatch):
+    model = FakeChatModel()
+    monkeypatch.setattr(chat, "chat_models", {"small": model, "large": model})
+    monkeypatch.setattr(chat, "history_store", MemoryHistoryStore(max_sessions=10, ttl_seconds=60))
+    client.post("/chat/send", params={"session_id": "m", "message": "hello"})
+    body = client.get("/metrics").text
+    assert 'helphut_http_requests_total{method="POST",route="/chat/send",status="200"}' in body
+    assert 'helphut_span_duration_seconds_count{span="llm"}' in body
+    assert 'helphut_span_duration_seconds_count{span="prompt.assemble"}' in body
+    assert "helphut_agent_threads" in body
@@ -0,0 +1,36 @@
+from app.config import settings
+from app.services import tool_output
+from app.services.tool_output import format_rows, format_value
+
+ROWS = [{"id": f"partner-{i}", "name": f"Partner Org {i}", "capacity": 10.0 * i, "notes": "a|b\nc",
+         "created_at": "2025-01-01T00:00:00+00:00"} for i in range(200)]
+
+def test_rows_render_as_compact_table():
+    text = format_rows("crud_tool", "Partners", ROWS[:2])
+    assert text.splitlines() == [
+        "Partners (2 rows):",
+        "id|name|capacity|notes",
+        "partner-0|Partner Org 0|0.0|a/b c",
+        "partner-1|Partner Org 1|10.0|a/b c",
+    ]
+
+def test_budget_truncates_with_summary_and_counts_savings(monkeypatch):
+    monkeypatch.setattr(settings, "TOOL_OUTPUT_TOKEN_BUDGETS", {"crud_tool": 100})
+    before = sum(tool_output.tool_tokens_saved.values.values())
+    text = format_rows("crud_tool", "Partners", ROWS, ["id", "name"], more_hint="ask for fewer")
+    assert len(text) // 4 <= 100
+    assert text.endswith("more rows not shown; ask for fewer")
+    shown = len(text.splitlines()) - 3
+    assert f"... {200 - shown} more rows" in text
+    saved = sum(tool_output.tool_tokens_saved.values.values()) - before
+    assert saved > len(str(ROWS)) // 4 - 100
+
+def test_values_are_truncated_at_budget(monkeypatch):
+    monkeypatch.setattr(settings, "TOOL_OUTPUT_TOKEN_BUDGET", 50)
+    text = format_value("synthesis_tool", "Synthesized data from", {"rows": ROWS})
+    assert text.startswith('Synthesized data from: {"rows":[{"id":"partner-0"')
+    assert "(truncated, ~" in text and len(text) < 50 * 4 + 40
+
+def test_compaction_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(settings, "TOOL_OUTPUT_COMPACTION_ENABLED", False)
+    assert format_rows("crud_tool", "Partners", ROWS[:1]) == f"Partners: {ROWS[:1]}"